@@ -0,0 +1,232 @@
+import argparse
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from deck_pool import load_deck_pool
+from matchup import load_matchup_matrix
+from series import PICK_COUNT, PickTable
+from solver import EPS
+
+# --- 同时 B/P 的 CFR+ 求解 ---
+# 正式比赛中双方同时 (互不可见) 各 Ban 对方 1 套, 公布后再同时各选 3 套出战。
+# 公布 Ban 之后每个 (x, y) 分支都是独立的 Pick 矩阵博弈, 因此按分支分解:
+#   1. 各 Pick 子博弈分别用 CFR+ (遗憾匹配+、交替更新、按轮次线性加权平均) 迭代求解, 子博弈之间互不依赖,
+#      可以分给多个进程;
+#   2. 以子博弈的平均策略值为收益, Ban 阶段再用 CFR+ 求解。
+# 收敛程度用可被利用度衡量: 双方各自被最优反制时相对均衡的损失的平均 (单位: 系列赛胜率),
+# 整体可被利用度直接对组合后的完整策略精确计算。
+
+DEFAULT_ITERATIONS = 2000
+DEFAULT_TARGET = 1e-4
+CHECK_INTERVAL = 50  # 每隔多少轮计算一次可被利用度
+
+
+def _regret_matching(regrets):
+    total = sum(regrets)
+    if total > EPS:
+        return [r / total for r in regrets]
+    return [1.0 / len(regrets)] * len(regrets)
+
+
+def _normalize(weights):
+    total = sum(weights)
+    return [w / total for w in weights]
+
+
+def matrix_exploitability(payoff, row_strategy, col_strategy):
+    """矩阵博弈 (行玩家最大化) 中一对策略的可被利用度: (行方最优反制值 - 列方最优反制值) / 2"""
+    cols = list(zip(*payoff))
+    best_row = max(sum(a * q for a, q in zip(row, col_strategy)) for row in payoff)
+    best_col = min(sum(a * p for a, p in zip(col, row_strategy)) for col in cols)
+    return (best_row - best_col) / 2.0
+
+
+def cfr_plus(payoff, iterations=DEFAULT_ITERATIONS, target=DEFAULT_TARGET):
+    """
+    CFR+ 求解零和矩阵博弈 (行玩家最大化)。
+    返回 (行方平均策略, 列方平均策略, 平均策略的博弈值, 可被利用度, 迭代轮数)。
+    每轮对全部行/列的遗憾一次性更新; 每 CHECK_INTERVAL 轮检查一次, 可被利用度低于 target 时提前结束。
+    """
+    if iterations < 1:
+        raise ValueError("迭代轮数至少为 1")
+    m = len(payoff)
+    n = len(payoff[0])
+    cols = [list(col) for col in zip(*payoff)]
+    row_regrets = [0.0] * m
+    col_regrets = [0.0] * n
+    row_sum = [0.0] * m
+    col_sum = [0.0] * n
+    exploitability = float("inf")
+    t = 0
+    while t < iterations:
+        t += 1
+        p = _regret_matching(row_regrets)
+        col_values = [sum(a * w for a, w in zip(col, p)) for col in cols]
+        q = _regret_matching(col_regrets)
+        ev = sum(v * w for v, w in zip(col_values, q))
+        col_regrets = [max(r + ev - v, 0.0) for r, v in zip(col_regrets, col_values)]  # 列方最小化
+
+        q = _regret_matching(col_regrets)
+        row_values = [sum(a * w for a, w in zip(row, q)) for row in payoff]
+        ev = sum(v * w for v, w in zip(row_values, p))
+        row_regrets = [max(r + v - ev, 0.0) for r, v in zip(row_regrets, row_values)]
+
+        row_sum = [s + t * w for s, w in zip(row_sum, p)]
+        col_sum = [s + t * w for s, w in zip(col_sum, q)]
+        if t % CHECK_INTERVAL == 0 or t == iterations:
+            exploitability = matrix_exploitability(payoff, _normalize(row_sum), _normalize(col_sum))
+            if exploitability <= target:
+                break
+
+    row_strategy = _normalize(row_sum)
+    col_strategy = _normalize(col_sum)
+    if exploitability == float("inf"):
+        exploitability = matrix_exploitability(payoff, row_strategy, col_strategy)
+    value = sum(p * sum(a * q for a, q in zip(row, col_strategy)) for row, p in zip(payoff, row_strategy))
+    return row_strategy, col_strategy, value, exploitability, t
+
+
+def solve_pick_subgames(payoffs, iterations=DEFAULT_ITERATIONS, target=DEFAULT_TARGET):
+    """工作进程入口: 依次求解多个 Pick 子博弈"""
+    return [cfr_plus(payoff, iterations, target) for payoff in payoffs]
+
+
+class SimultaneousSolution:
+    """
+    同时 B/P 的求解结果, 卡组用阵容内的位置表示 (x 为我方 Ban 的对方位置, y 为对方 Ban 的我方位置)。
+    ban_strategy / opp_ban_strategy: 双方 Ban 的混合策略
+    pick_values[x][y] 与 pick_strategies[(x, y)] 的含义与 solver.BPSolution 相同。
+    """
+
+    def __init__(self, table, ban_strategy, opp_ban_strategy, pick_values, pick_strategies, value, exploitability,
+                 iterations):
+        self.table = table
+        self.ban_strategy = ban_strategy
+        self.opp_ban_strategy = opp_ban_strategy
+        self.pick_values = pick_values
+        self.pick_strategies = pick_strategies
+        self.value = value
+        self.exploitability = exploitability
+        self.iterations = iterations  # 各子博弈与 Ban 阶段的迭代轮数之和
+
+    def summary(self):
+        lines = [f"胜率 {self.value:.2%}, 可被利用度 {self.exploitability:.4%}, 共迭代 {self.iterations} 轮",
+                 "我方 Ban: " + ", ".join(f"{x}:{p:.1%}" for x, p in enumerate(self.ban_strategy) if p > 1e-3),
+                 "对方 Ban: " + ", ".join(f"{y}:{p:.1%}" for y, p in enumerate(self.opp_ban_strategy) if p > 1e-3)]
+        return "\n".join(lines)
+
+
+def simultaneous_exploitability(table, ban_strategy, opp_ban_strategy, pick_strategies):
+    """
+    完整策略 (同时 Ban + 公布后同时 Pick) 的精确可被利用度。
+    pick_strategies[(x, y)] = (我方各行概率, 对方各列概率), 行/列为 table.rows_without(y) / cols_without(x)。
+    """
+    against_me = []  # 对方每种 Ban 下, 对我方策略的最优反制值
+    for y in range(table.my_size):
+        rows = table.rows_without(y)
+        total = 0.0
+        for x, bx in enumerate(ban_strategy):
+            if bx <= 0.0:
+                continue
+            p = pick_strategies[(x, y)][0]
+            total += bx * min(sum(table.values[i][j] * w for i, w in zip(rows, p)) for j in table.cols_without(x))
+        against_me.append(total)
+    against_opp = []
+    for x in range(table.opp_size):
+        cols = table.cols_without(x)
+        total = 0.0
+        for y, by in enumerate(opp_ban_strategy):
+            if by <= 0.0:
+                continue
+            q = pick_strategies[(x, y)][1]
+            total += by * max(sum(table.values[i][j] * w for j, w in zip(cols, q)) for i in table.rows_without(y))
+        against_opp.append(total)
+    return (max(against_opp) - min(against_me)) / 2.0
+
+
+def solve_simultaneous(local, iterations=DEFAULT_ITERATIONS, target=DEFAULT_TARGET, workers=1, job=None):
+    """
+    求解同时 B/P; local 为阵容间单局胜率子矩阵 (行为我方)。
+    workers > 1 时各 Pick 子博弈分给进程池并行迭代; job 为 jobs.Job 时汇报进度。
+    """
+    table = PickTable(local)
+    if min(table.my_size, table.opp_size) <= PICK_COUNT:
+        raise ValueError(f"双方阵容都至少需要 {PICK_COUNT + 1} 套卡组")
+    if iterations < 1:
+        raise ValueError("迭代轮数至少为 1")
+    branches = [(x, y) for x in range(table.opp_size) for y in range(table.my_size)]
+    payoffs = [table.submatrix(table.rows_without(y), table.cols_without(x)) for x, y in branches]
+    # 子博弈的目标精度取得比整体更严, 组合后的可被利用度才能达到 target
+    sub_target = target / 2.0
+
+    if workers > 1:
+        # 各子博弈收敛所需轮数差别很大, 交错分组使各进程负担接近
+        groups = [list(range(i, len(payoffs), workers)) for i in range(workers)]
+        results = [None] * len(payoffs)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(solve_pick_subgames, [payoffs[i] for i in group], iterations, sub_target): group
+                       for group in groups if group}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    for i, result in zip(futures[future], future.result()):
+                        results[i] = result
+                    if job is not None:
+                        job.check_cancelled()
+                        job.report_progress(done, len(futures) + 1, "求解 Pick 子博弈")
+            finally:
+                for future in futures:
+                    future.cancel()
+    else:
+        results = []
+        for done, payoff in enumerate(payoffs, 1):
+            results.append(cfr_plus(payoff, iterations, sub_target))
+            if job is not None:
+                job.check_cancelled()
+                job.report_progress(done, len(payoffs) + 1, "求解 Pick 子博弈")
+
+    pick_values = [[0.0] * table.my_size for _ in range(table.opp_size)]
+    pick_strategies = {}
+    total_iterations = 0
+    for (x, y), (p, q, value, _, t) in zip(branches, results):
+        pick_values[x][y] = value
+        pick_strategies[(x, y)] = (p, q)
+        total_iterations += t
+
+    ban_strategy, opp_ban_strategy, value, _, t = cfr_plus(pick_values, iterations, target / 2.0)
+    total_iterations += t
+    exploitability = simultaneous_exploitability(table, ban_strategy, opp_ban_strategy, pick_strategies)
+    if job is not None:
+        job.report_progress(len(branches) + 1, len(branches) + 1, "求解 Ban 阶段")
+
+    supports = {}
+    for (x, y), (p, q) in pick_strategies.items():
+        supports[(x, y)] = ([(table.my_triples[i], w) for i, w in zip(table.rows_without(y), p) if w > EPS],
+                            [(table.opp_triples[j], w) for j, w in zip(table.cols_without(x), q) if w > EPS])
+    return SimultaneousSolution(table, ban_strategy, opp_ban_strategy, pick_values, supports, value, exploitability,
+                                total_iterations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="同时 B/P 的 CFR+ 求解")
+    parser.add_argument("--my", nargs="+", required=True, help="我方阵容 (卡组名称)")
+    parser.add_argument("--opp", nargs="+", required=True, help="对方阵容 (卡组名称)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET, help="目标可被利用度")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = load_deck_pool("deck_pool.json", check_icons=False)
+        matrix = load_matchup_matrix(args.matrix, [d["name"] for d in pool])
+        solution = solve_simultaneous(matrix.local(args.my, args.opp), args.iterations, args.target, args.workers)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(solution.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import json
+import marshal
+import os
+
+# --- 配置快照缓存 ---
+# 解析并校验后的 JSON 配置以 marshal 二进制快照保存, 按源文件 mtime/大小 失效。
+
+CACHE_DIR = ".bp_cache"
+SNAPSHOT_VERSION = 1
+
+
+def _snapshot_path(filepath, tag):
+    base = os.path.basename(filepath)
+    if tag:
+        base = f"{base}.{tag}"
+    return os.path.join(CACHE_DIR, base + ".snap")
+
+
+def _source_stamp(filepath, tag):
+    st = os.stat(filepath)
+    return (SNAPSHOT_VERSION, os.path.abspath(filepath), st.st_mtime_ns, st.st_size, tag)
+
+
+def atomic_write_bytes(path, payload):
+    """写入临时文件后 rename, 避免读到半截文件"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def atomic_write_json(path, data, indent=4):
+    """原子地写入 JSON 文件 (写临时文件 + rename)"""
+    payload = json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8')
+    atomic_write_bytes(path, payload)
+
+
+def read_snapshot(filepath, tag=""):
+    """读取仍然有效的快照, 失效或损坏时返回 None"""
+    try:
+        stamp = _source_stamp(filepath, tag)
+        with open(_snapshot_path(filepath, tag), 'rb') as f:
+            cached_stamp, data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cached_stamp != stamp:
+        return None
+    return data
+
+
+def write_snapshot(filepath, data, tag=""):
+    """写入快照; 缓存目录不可写时静默跳过"""
+    try:
+        payload = marshal.dumps((_source_stamp(filepath, tag), data))
+        atomic_write_bytes(_snapshot_path(filepath, tag), payload)
+    except (OSError, ValueError):
+        pass
+
+
+def load_json_cached(filepath, validate=None, tag=""):
+    """
+    读取 JSON 配置, 优先使用二进制快照。
+    validate(data) 可对解析结果做校验/规整, 其返回值 (仅限 marshal 支持的类型) 会被缓存。
+    错误与 json.load 一致: FileNotFoundError / ValueError (含 JSONDecodeError)。
+    """
+    data = read_snapshot(filepath, tag)
+    if data is not None:
+        return data
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if validate is not None:
+        data = validate(data)
+
+    write_snapshot(filepath, data, tag)
+    return data
+
+
+def validate_deck_list(data):
+    """基础校验: 必须是包含 name / icon_path 字段的字典列表"""
+    if not isinstance(data, list):
+        raise ValueError("配置应为卡组列表")
+    for i, deck in enumerate(data):
+        if not isinstance(deck, dict) or not isinstance(deck.get("name"), str) \
+                or not isinstance(deck.get("icon_path"), str):
+            raise ValueError(f"第 {i + 1} 个卡组缺少 name / icon_path")
+    return data
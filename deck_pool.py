@@ -0,0 +1,133 @@
+import os
+from collections.abc import Sequence
+
+from config_cache import load_json_cached
+
+# --- 卡组资源池: 校验 + 索引 ---
+
+
+def normalize_deck_entries(data):
+    """
+    校验原始 JSON, 返回 (合法条目列表, 非法条目列表[(序号, 原因)])。
+    顶层结构错误时抛出 ValueError。结果只含基础类型, 可被配置快照缓存。
+    """
+    if not isinstance(data, list):
+        raise ValueError("卡组资源池应为卡组列表")
+
+    decks = []
+    invalid = []
+    for i, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            invalid.append((i, "不是对象"))
+            continue
+        name = entry.get("name")
+        icon_path = entry.get("icon_path")
+        if not isinstance(name, str) or not name.strip():
+            invalid.append((i, "缺少 name"))
+            continue
+        if not isinstance(icon_path, str) or not icon_path:
+            invalid.append((i, f"'{name}' 缺少 icon_path"))
+            continue
+        decks.append(entry)
+    return decks, invalid
+
+
+class PoolDiagnostics:
+    """卡组池检查结果 (一次遍历得到)"""
+
+    def __init__(self, invalid=None):
+        self.invalid = list(invalid or [])  # [(序号, 原因)]
+        self.duplicate_names = {}  # name -> [index, ...]
+        self.shared_icons = {}  # icon_path -> [index, ...]
+        self.missing_icons = {}  # icon_path -> [index, ...]
+
+    def __bool__(self):
+        return bool(self.invalid or self.duplicate_names or self.shared_icons or self.missing_icons)
+
+    def summary(self):
+        return (f"非法条目 {len(self.invalid)} / 重名 {len(self.duplicate_names)} / "
+                f"共用图标 {len(self.shared_icons)} / 缺失图标 {len(self.missing_icons)}")
+
+    def report(self, decks):
+        """生成可读的检查报告"""
+        lines = [f"卡组池检查: {self.summary()}"]
+        for i, reason in self.invalid:
+            lines.append(f"  [非法] 第 {i + 1} 个条目: {reason}")
+        for name, indices in self.duplicate_names.items():
+            lines.append(f"  [重名] '{name}' 出现 {len(indices)} 次")
+        for path, indices in self.shared_icons.items():
+            names = "、".join(decks[i]["name"] for i in indices)
+            lines.append(f"  [共用图标] {path}: {names}")
+        for path, indices in self.missing_icons.items():
+            names = "、".join(decks[i]["name"] for i in indices)
+            lines.append(f"  [缺失图标] {path}: {names}")
+        return "\n".join(lines)
+
+
+class _DirListing:
+    """按目录缓存文件名集合, 使图标检查为每个目录一次 listdir"""
+
+    def __init__(self):
+        self.listings = {}
+
+    def exists(self, path):
+        directory, filename = os.path.split(path)
+        directory = directory or "."
+        names = self.listings.get(directory)
+        if names is None:
+            try:
+                names = set(os.listdir(directory))
+            except OSError:
+                names = set()
+            self.listings[directory] = names
+        return filename in names
+
+
+class DeckPool(Sequence):
+    """经过校验并建立 name->序号、icon->序号列表 索引的卡组资源池, 可当作列表使用"""
+
+    def __init__(self, decks, invalid=None, check_icons=True):
+        self.decks = list(decks)
+        self.diagnostics = PoolDiagnostics(invalid)
+        self.name_index = {}
+        self.icon_index = {}
+
+        listing = _DirListing() if check_icons else None
+        for i, deck in enumerate(self.decks):
+            name = deck["name"]
+            if name in self.name_index:
+                self.diagnostics.duplicate_names.setdefault(name, [self.name_index[name]]).append(i)
+            else:
+                self.name_index[name] = i
+
+            icon_path = deck["icon_path"]
+            indices = self.icon_index.setdefault(icon_path, [])
+            indices.append(i)
+            if len(indices) == 1:
+                if listing is not None and not listing.exists(icon_path):
+                    self.diagnostics.missing_icons[icon_path] = indices
+            elif len(indices) == 2:
+                self.diagnostics.shared_icons[icon_path] = indices
+
+    def __getitem__(self, i):
+        return self.decks[i]
+
+    def __len__(self):
+        return len(self.decks)
+
+    def index_of(self, name):
+        """按名称查找卡组序号, 不存在时返回 None"""
+        return self.name_index.get(name)
+
+    def indices_for_icon(self, icon_path):
+        return self.icon_index.get(icon_path, [])
+
+    def unknown_decks(self, decks):
+        """返回不在资源池中的卡组名称 (用于检查我方卡组)"""
+        return [d["name"] for d in decks if d["name"] not in self.name_index]
+
+
+def load_deck_pool(filepath, check_icons=True):
+    """读取并校验卡组池; 错误与 load_json_cached 一致"""
+    decks, invalid = load_json_cached(filepath, normalize_deck_entries, tag="pool")
+    return DeckPool(decks, invalid, check_icons=check_icons)
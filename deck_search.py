@@ -0,0 +1,102 @@
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+# --- 卡组名称搜索索引 (前缀 / 子串 / 拼音首字母) ---
+
+# GB2312 一级汉字按拼音排序, 可由编码区间直接得到声母
+_GB2312_INITIALS = [
+    (0xB0A1, "a"), (0xB0C5, "b"), (0xB2C1, "c"), (0xB4EE, "d"), (0xB6EA, "e"), (0xB7A2, "f"),
+    (0xB8C1, "g"), (0xB9FE, "h"), (0xBBF7, "j"), (0xBFA6, "k"), (0xC0AC, "l"), (0xC2E8, "m"),
+    (0xC4C3, "n"), (0xC5B6, "o"), (0xC5BE, "p"), (0xC6DA, "q"), (0xC8BB, "r"), (0xC8F6, "s"),
+    (0xCBFA, "t"), (0xCDDA, "w"), (0xCEF4, "x"), (0xD1B9, "y"), (0xD4D1, "z"),
+]
+_GB2312_LEVEL1_END = 0xD7FA
+
+
+def _char_initial(ch):
+    if ch.isascii():
+        return ch.lower() if ch.isalnum() else ""
+    try:
+        code = int.from_bytes(ch.encode("gb2312"), "big")
+    except UnicodeEncodeError:
+        return ""
+    if not (_GB2312_INITIALS[0][0] <= code < _GB2312_LEVEL1_END):
+        return ""  # 二级汉字按部首排序, 无法由编码得到拼音
+    initial = ""
+    for start, letter in _GB2312_INITIALS:
+        if code < start:
+            break
+        initial = letter
+    return initial
+
+
+def pinyin_initials(text):
+    """返回拼音首字母串, 如 '密勒顿（雪道）' -> 'mldxd'; 安装了 pypinyin 时使用其结果"""
+    if lazy_pinyin is not None:
+        parts = lazy_pinyin(text, style=Style.FIRST_LETTER, errors=lambda s: list(s))
+        return "".join(p.lower() for p in parts if p.isalnum())
+    return "".join(_char_initial(ch) for ch in text)
+
+
+class DeckSearchIndex:
+    """
+    对卡组名称建立一次索引, 之后每次按键的过滤只做位运算和少量候选校验。
+    每个字符对应一个位图 (第 i 位表示第 i 个卡组的名称或拼音首字母含有该字符),
+    查询先按字符求位图交集得到候选, 再校验子串。
+    """
+
+    def __init__(self, decks):
+        self.names = [d["name"] for d in decks]
+        self.keys = [name.casefold() for name in self.names]
+        self.initials = [pinyin_initials(name) for name in self.names]
+        self.all_mask = (1 << len(self.names)) - 1
+
+        self.char_masks = {}
+        for i, (key, initials) in enumerate(zip(self.keys, self.initials)):
+            bit = 1 << i
+            for ch in set(key) | set(initials):
+                self.char_masks[ch] = self.char_masks.get(ch, 0) | bit
+
+        self._last_query = ""
+        self._last_mask = self.all_mask
+
+    def _candidate_mask(self, query):
+        # 输入是在上一次查询后追加字符时, 只需在上次结果中继续过滤
+        if self._last_query and query.startswith(self._last_query):
+            mask = self._last_mask
+        else:
+            mask = self.all_mask
+        for ch in set(query):
+            mask &= self.char_masks.get(ch, 0)
+            if not mask:
+                break
+        return mask
+
+    def search(self, query):
+        """返回匹配的卡组序号: 名称/首字母前缀匹配在前, 其余子串匹配在后, 各自保持原顺序"""
+        query = query.strip().casefold()
+        if not query:
+            self._last_query, self._last_mask = "", self.all_mask
+            return list(range(len(self.names)))
+
+        mask = self._candidate_mask(query)
+        prefix, others = [], []
+        result_mask = 0
+        while mask:
+            low = mask & -mask
+            i = low.bit_length() - 1
+            mask ^= low
+
+            key, initials = self.keys[i], self.initials[i]
+            if key.startswith(query) or initials.startswith(query):
+                prefix.append(i)
+            elif query in key or query in initials:
+                others.append(i)
+            else:
+                continue
+            result_mask |= low
+
+        self._last_query, self._last_mask = query, result_mask
+        return prefix + others
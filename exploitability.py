@@ -0,0 +1,268 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from deck_pool import load_deck_pool
+from matchup import load_matchup_matrix
+from series import PICK_COUNT, PickTable
+from stats import RunningStats
+from strategies import STRATEGIES, StateBatch, create_strategy, enemy_view
+from symmetry import solve_bp_symmetric
+
+# --- 可被利用度 (最优反制) ---
+# 对局树与界面/联赛一致: 先手 Ban 后手 1 套, 后手看到后回 Ban, 之后双方同时 Pick, 随机配对三局两胜。
+# 固定被评估策略的行为分布后, 对手的最优反制可以逐信息集精确求出:
+#   Pick 阶段对手只需对策略的混合出战分布取最优的一个组合; Ban 阶段再对各分支取最优。
+# 策略分别坐先手/后手两个位置各评估一次, 与均衡值相比的损失即该位置的可被利用度, 两者平均作为总体指标
+# (单位: 系列赛胜率; 均衡策略为 0, 越大越容易被针对)。
+# 同一策略的所有信息集 (以及扫描时整块阵容) 合成一个 StateBatch, 每个阶段只调用一次策略。
+
+DEFAULT_SAMPLES = 256  # 策略未提供 *_policy 时, 每个信息集的采样次数
+
+
+def _repeat(batch, samples):
+    """把批次中每个状态重复 samples 次 (相邻排列)"""
+    def rep(values):
+        return [v for v in values for _ in range(samples)]
+    return StateBatch(rep(batch.locals), rep(batch.own_available), rep(batch.enemy_available), rep(batch.keys))
+
+
+def _sampled_policy(decide, batch, samples):
+    decisions = decide(_repeat(batch, samples))
+    policies = []
+    for k in range(len(batch)):
+        counts = {}
+        for d in decisions[k * samples:(k + 1) * samples]:
+            counts[d] = counts.get(d, 0) + 1
+        policies.append({d: c / samples for d, c in counts.items()})
+    return policies
+
+
+def ban_policies(strategy, batch, rng, samples=DEFAULT_SAMPLES):
+    """每个状态的 Ban 分布; 第二个返回值表示是否为采样估计"""
+    if hasattr(strategy, "ban_policy"):
+        return strategy.ban_policy(batch), False
+    return _sampled_policy(lambda b: strategy.ban(rng, b), batch, samples), True
+
+
+def pick_policies(strategy, batch, rng, samples=DEFAULT_SAMPLES):
+    if hasattr(strategy, "pick_policy"):
+        return strategy.pick_policy(batch), False
+    return _sampled_policy(lambda b: strategy.pick(rng, b), batch, samples), True
+
+
+class ExploitabilityReport:
+    """
+    一组对局上某个策略的评估结果 (胜率均为该策略一方的系列赛胜率):
+    first_value / second_value: 策略坐先手 / 后手、对手采取最优反制时的胜率
+    first_loss / second_loss: 与均衡值相比的损失; exploitability 为两者平均
+    """
+
+    def __init__(self, name, value, first_value, second_value, estimated=False):
+        self.name = name
+        self.value = value  # 先手方的均衡胜率
+        self.first_value = first_value
+        self.second_value = second_value
+        self.estimated = estimated
+
+    @property
+    def first_loss(self):
+        return max(0.0, self.value - self.first_value)
+
+    @property
+    def second_loss(self):
+        return max(0.0, (1.0 - self.value) - self.second_value)
+
+    @property
+    def exploitability(self):
+        return (self.first_loss + self.second_loss) / 2.0
+
+    def summary(self):
+        note = " (采样估计)" if self.estimated else ""
+        return (f"{self.name}: 可被利用度 {self.exploitability:.2%}{note}  "
+                f"先手 {self.first_value:.2%} / 均衡 {self.value:.2%}, "
+                f"后手 {self.second_value:.2%} / 均衡 {1.0 - self.value:.2%}")
+
+
+def _mix_indices(policy, index_of):
+    return [(index_of[mask], p) for mask, p in policy.items() if p > 0.0]
+
+
+def evaluate_batch(strategy, locals, keys=None, rng=None, samples=DEFAULT_SAMPLES, name=None):
+    """
+    对一批对局 (locals[k] 为先手方视角的胜率子矩阵) 精确计算 strategy 的最优反制, 返回 ExploitabilityReport 列表。
+    每个阶段对所有对局、所有信息集只调用一次策略。
+    """
+    rng = rng or random.Random(0)
+    name = name or getattr(strategy, "name", type(strategy).__name__)
+    keys = keys if keys is not None else [tuple(map(tuple, local)) for local in locals]
+    keys_b = [("enemy", key) for key in keys]
+    locals_b = [enemy_view(local) for local in locals]
+    tables = [PickTable(local) for local in locals]
+    values = [solve_bp_symmetric(local, strategies=False).value for local in locals]
+
+    # 所有信息集的状态 (对局 k, 先手 Ban 的后手卡组 x, 后手 Ban 的先手卡组 y)
+    nodes = [(k, x, y) for k, t in enumerate(tables) for x in range(t.opp_size) for y in range(t.my_size)]
+    full_a = [(1 << t.my_size) - 1 for t in tables]
+    full_b = [(1 << t.opp_size) - 1 for t in tables]
+
+    def pick_batch(as_first):
+        if as_first:
+            return StateBatch([locals[k] for k, _, _ in nodes], [full_a[k] & ~(1 << y) for k, _, y in nodes],
+                              [full_b[k] & ~(1 << x) for k, x, _ in nodes], [keys[k] for k, _, _ in nodes])
+        return StateBatch([locals_b[k] for k, _, _ in nodes], [full_b[k] & ~(1 << x) for k, x, _ in nodes],
+                          [full_a[k] & ~(1 << y) for k, _, y in nodes], [keys_b[k] for k, _, _ in nodes])
+
+    # 策略坐先手: 后手逐分支取最小
+    first_bans, est1 = ban_policies(strategy, StateBatch(locals, full_a, full_b, keys), rng, samples)
+    first_picks, est2 = pick_policies(strategy, pick_batch(True), rng, samples)
+    # 策略坐后手: 每个先手 Ban 都是一个信息集
+    ban_nodes = [(k, x) for k, t in enumerate(tables) for x in range(t.opp_size)]
+    second_bans, est3 = ban_policies(strategy, StateBatch(
+        [locals_b[k] for k, _ in ban_nodes], [full_b[k] & ~(1 << x) for k, x in ban_nodes],
+        [full_a[k] for k, _ in ban_nodes], [keys_b[k] for k, _ in ban_nodes]), rng, samples)
+    second_bans = dict(zip(ban_nodes, second_bans))
+    second_picks, est4 = pick_policies(strategy, pick_batch(False), rng, samples)
+
+    row_index = [{m: i for i, m in enumerate(t.my_masks)} for t in tables]
+    col_index = [{m: j for j, m in enumerate(t.opp_masks)} for t in tables]
+
+    # 各 Pick 信息集上, 对手对策略混合出战分布的最优回应 (以先手方胜率表示)
+    first_pick_value = {}
+    second_pick_value = {}
+    for node, mine, theirs in zip(nodes, first_picks, second_picks):
+        k, x, y = node
+        t = tables[k]
+        rows = _mix_indices(mine, row_index[k])
+        first_pick_value[node] = min(sum(t.values[i][j] * p for i, p in rows) for j in t.cols_without(x))
+        cols = _mix_indices(theirs, col_index[k])
+        second_pick_value[node] = max(sum(t.values[i][j] * p for j, p in cols) for i in t.rows_without(y))
+
+    reports = []
+    for k, t in enumerate(tables):
+        first_value = sum(p * min(first_pick_value[(k, x, y)] for y in range(t.my_size))
+                          for x, p in first_bans[k].items())
+        best_reply = max(sum(p * second_pick_value[(k, x, y)] for y, p in second_bans[(k, x)].items())
+                         for x in range(t.opp_size))
+        reports.append(ExploitabilityReport(name, values[k], first_value, 1.0 - best_reply,
+                                            est1 or est2 or est3 or est4))
+    return reports
+
+
+def evaluate(strategy, local, rng=None, samples=DEFAULT_SAMPLES):
+    """单组对局 (local 为先手方视角的胜率子矩阵) 的评估结果"""
+    return evaluate_batch(strategy, [local], rng=rng, samples=samples)[0]
+
+
+def evaluate_lineups(matrix, strategy_names, my_names, opp_names, samples=DEFAULT_SAMPLES, seed=0):
+    """界面/命令行入口: 我方阵容坐先手时, 各策略在这组对局上的评估结果"""
+    if min(len(my_names), len(opp_names)) <= PICK_COUNT:
+        raise ValueError(f"双方阵容都至少需要 {PICK_COUNT + 1} 套卡组")
+    local = matrix.local(my_names, opp_names)
+    rng = random.Random(seed)
+    return [evaluate(create_strategy(n), local, rng, samples) for n in strategy_names]
+
+
+# --- 卡组池扫描 ---
+
+def run_sweep_chunk(matrix, pool_names, lineup_size, strategy_names, seed, chunk_index, count, samples):
+    """工作进程入口: 随机抽取 count 组对局, 返回 {策略: [可被利用度统计, 先手损失统计, 后手损失统计]} (字典形式)"""
+    rng = random.Random(f"{seed}:{chunk_index}")
+    lineups = [(rng.sample(pool_names, lineup_size), rng.sample(pool_names, lineup_size)) for _ in range(count)]
+    locals = [matrix.local(a, b) for a, b in lineups]
+    keys = [(tuple(a), tuple(b)) for a, b in lineups]
+    results = {}
+    for n in strategy_names:
+        stats = [RunningStats(), RunningStats(), RunningStats()]
+        for report in evaluate_batch(create_strategy(n), locals, keys, rng, samples):
+            stats[0].add(report.exploitability)
+            stats[1].add(report.first_loss)
+            stats[2].add(report.second_loss)
+        results[n] = [s.to_dict() for s in stats]
+    return results
+
+
+class SweepResult:
+    def __init__(self, names):
+        self.names = names
+        self.stats = {n: [RunningStats(), RunningStats(), RunningStats()] for n in names}
+
+    def merge_chunk(self, data):
+        for n, dicts in data.items():
+            for s, d in zip(self.stats[n], dicts):
+                s.merge(RunningStats.from_dict(d))
+
+    def summary(self):
+        lines = []
+        for n in sorted(self.names, key=lambda n: self.stats[n][0].mean):
+            total, first, second = self.stats[n]
+            lines.append(f"{n:>10}: 可被利用度 {total.mean:6.2%} ± {1.96 * total.stderr:5.2%} (最大 {total.max:6.2%})  "
+                         f"先手损失 {first.mean:6.2%}  后手损失 {second.mean:6.2%}  n={total.count}")
+        return "\n".join(lines)
+
+
+def sweep_exploitability(matrix, pool_names, strategy_names=None, lineups=1000, lineup_size=6, seed=0,
+                         workers=None, chunk=100, samples=DEFAULT_SAMPLES, job=None):
+    """在卡组池中随机抽取 lineups 组对局, 统计各策略的可被利用度, 分块在进程池中并行"""
+    names = list(strategy_names or STRATEGIES)
+    for n in names:
+        create_strategy(n)  # 提前检查策略名称
+    tasks = [(index, min(chunk, lineups - start)) for index, start in enumerate(range(0, lineups, chunk))]
+    result = SweepResult(names)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for done, (index, count) in enumerate(tasks, 1):
+            result.merge_chunk(run_sweep_chunk(matrix, pool_names, lineup_size, names, seed, index, count, samples))
+            if job is not None:
+                job.report_progress(done, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(run_sweep_chunk, matrix, pool_names, lineup_size, names, seed, index, count,
+                                   samples) for index, count in tasks]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    result.merge_chunk(future.result())
+                    if job is not None:
+                        job.report_progress(done, len(tasks))
+            finally:
+                for future in futures:
+                    future.cancel()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI 策略可被利用度评估")
+    parser.add_argument("--strategies", nargs="*", default=None, help=f"评估的策略 (默认全部: {', '.join(STRATEGIES)})")
+    parser.add_argument("--my", nargs="*", default=None, help="先手方阵容 (卡组名称); 与 --opp 同时给出时只评估这组对局")
+    parser.add_argument("--opp", nargs="*", default=None, help="后手方阵容 (卡组名称)")
+    parser.add_argument("--lineups", type=int, default=1000, help="卡组池扫描时抽取的对局数")
+    parser.add_argument("--lineup-size", type=int, default=6)
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = load_deck_pool("deck_pool.json", check_icons=False)
+        matrix = load_matchup_matrix(args.matrix)
+        names = list(args.strategies or STRATEGIES)
+        if args.my and args.opp:
+            for report in evaluate_lineups(matrix, names, args.my, args.opp, args.samples, args.seed):
+                print(report.summary())
+            return 0
+        result = sweep_exploitability(matrix, [d["name"] for d in pool], names, args.lineups, args.lineup_size,
+                                      args.seed, args.workers, samples=args.samples)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+import threading
+import time
+
+# --- 配置文件监视 (inotify, 不可用时退回轮询) ---
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _load_libc():
+    if platform.system() != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ConfigWatcher:
+    """
+    监视若干配置文件的变化。
+    Linux 下在后台线程中读取 inotify 事件 (监视所在目录, 兼容编辑器的"写临时文件+rename");
+    其他平台退回按 mtime/大小 轮询。变更经过去抖后由 poll() 在调用者线程 (GUI线程) 取出。
+    """
+
+    def __init__(self, paths, debounce=0.2, use_inotify=True):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.debounce = debounce
+        self.signatures = {p: _file_signature(p) for p in self.paths}
+        self.backend = "polling"
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._stop = threading.Event()
+        self._fd = None
+        self._thread = None
+
+        if use_inotify:
+            self._start_inotify()
+
+    # --- inotify 后端 ---
+    def _start_inotify(self):
+        libc = _load_libc()
+        if libc is None:
+            return
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        self._watch_names = {}
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            wd = libc.inotify_add_watch(fd, directory.encode(), mask)
+            if wd < 0:
+                os.close(fd)
+                return
+            self._watch_names[wd] = directory
+
+        self._fd = fd
+        self.backend = "inotify"
+        self._thread = threading.Thread(target=self._inotify_loop, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def _inotify_loop(self):
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._fd], [], [], 0.5)
+                if not ready:
+                    continue
+                buf = os.read(self._fd, 64 * 1024)
+            except (OSError, ValueError):
+                return
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+
+                path = os.path.join(self._watch_names.get(wd, ""), name)
+                if path in self.signatures:
+                    with self._lock:
+                        self._pending[path] = time.monotonic()
+
+    # --- 轮询后端 ---
+    def _scan(self):
+        now = time.monotonic()
+        for path, old_sig in self.signatures.items():
+            if _file_signature(path) != old_sig and path not in self._pending:
+                self._pending[path] = now
+
+    def poll(self):
+        """返回 (在去抖时间内稳定下来的) 已变化文件路径列表"""
+        now = time.monotonic()
+        changed = []
+        with self._lock:
+            if self.backend == "polling":
+                self._scan()
+            for path, stamp in list(self._pending.items()):
+                if now - stamp < self.debounce:
+                    continue
+                del self._pending[path]
+                new_sig = _file_signature(path)
+                if new_sig != self.signatures[path]:
+                    self.signatures[path] = new_sig
+                    changed.append(path)
+        return changed
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# --- 卡组池差异 ---
+
+class PoolDiff:
+    """按卡组名称 (卡组身份) 比较新旧卡组列表的结果"""
+
+    def __init__(self, added, removed, changed):
+        self.added = added  # name -> 新 deck_info
+        self.removed = removed  # name -> 旧 deck_info
+        self.changed = changed  # name -> 新 deck_info (字段有变化)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self):
+        return f"新增 {len(self.added)} / 删除 {len(self.removed)} / 修改 {len(self.changed)}"
+
+
+def diff_decks(old_decks, new_decks):
+    """线性时间比较两个卡组列表"""
+    old_by_name = {d["name"]: d for d in old_decks}
+    new_by_name = {d["name"]: d for d in new_decks}
+
+    added = {}
+    changed = {}
+    for name, deck in new_by_name.items():
+        old = old_by_name.get(name)
+        if old is None:
+            added[name] = deck
+        elif old != deck:
+            changed[name] = deck
+
+    removed = {name: deck for name, deck in old_by_name.items() if name not in new_by_name}
+    return PoolDiff(added, removed, changed)
@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+# --- 后台任务执行器 (GUI 共用) ---
+# 任务在线程池/进程池中运行, 完成、出错和进度事件放入队列,
+# 由 GUI 线程定时调用 poll() 取出并回调 (Tk 用 after, Qt 用 QTimer), 回调中可以安全地操作界面。
+
+
+class JobCancelled(Exception):
+    """任务已被取消 (在任务函数中由 check_cancelled / report_progress 抛出)"""
+
+
+class Job:
+    """后台任务句柄: 进度汇报与取消"""
+
+    def __init__(self, runner, key, on_done, on_progress, on_error):
+        self.runner = runner
+        self.key = key
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report_progress(self, done, total, message=""):
+        """在任务线程中调用; 任务已取消时抛出 JobCancelled"""
+        self.check_cancelled()
+        self.runner.events.put(("progress", self, (done, total, message)))
+
+
+class JobRunner:
+    """
+    线程池 + (按需创建的) 进程池。
+    同一个 key 的新任务会取代旧任务 (旧任务被取消, 结果不再回调);
+    同一任务在两次 poll 之间的多条进度只回调最新的一条。
+    """
+
+    def __init__(self, max_workers=None, process_workers=None):
+        self.thread_pool = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                              thread_name_prefix="bp-job")
+        self.process_workers = process_workers or os.cpu_count() or 1
+        self._process_pool = None
+        self.events = queue.Queue()
+        self.active = {}  # key -> Job
+
+    @property
+    def process_pool(self):
+        if self._process_pool is None:
+            # spawn: 不复制 GUI 进程的状态
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+        return self._process_pool
+
+    def _new_job(self, key, on_done, on_progress, on_error):
+        if key is None:
+            key = object()  # 没有 key 的任务不会被取代, 但同样可被 cancel_all 取消
+        elif key in self.active:
+            self.active.pop(key).cancel()
+        job = Job(self, key, on_done, on_progress, on_error)
+        self.active[key] = job
+        return job
+
+    def submit(self, fn, *args, key=None, on_done=None, on_progress=None, on_error=None):
+        """在线程池中运行 fn(job, *args)"""
+        job = self._new_job(key, on_done, on_progress, on_error)
+        job.future = self.thread_pool.submit(self._run, job, fn, args)
+        return job
+
+    def submit_map(self, fn, items, reduce, initial, key=None, chunksize=1,
+                   on_done=None, on_progress=None, on_error=None):
+        """
+        把 items 按 chunksize 分块, 在进程池中执行 fn(chunk) (fn 须为模块级函数)。
+        每完成一块汇报一次进度, 块结果按完成顺序用 reduce(acc, result) 合并。
+        """
+        chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+        job = self._new_job(key, on_done, on_progress, on_error)
+        job.future = self.thread_pool.submit(self._run, job, self._map_chunks, (fn, chunks, reduce, initial))
+        return job
+
+    def _map_chunks(self, job, fn, chunks, reduce, initial):
+        futures = [self.process_pool.submit(fn, chunk) for chunk in chunks]
+        acc = initial
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                acc = reduce(acc, future.result())
+                job.report_progress(done, len(chunks))
+        finally:
+            for future in futures:
+                future.cancel()
+        return acc
+
+    def _run(self, job, fn, args):
+        try:
+            result = fn(job, *args)
+        except JobCancelled:
+            return
+        except Exception as e:
+            self.events.put(("error", job, e))
+        else:
+            self.events.put(("done", job, result))
+
+    def poll(self):
+        """在GUI线程中调用: 分发完成/出错/进度回调"""
+        latest_progress = {}
+        finished = []
+        while True:
+            try:
+                kind, job, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest_progress[job] = payload
+            else:
+                finished.append((kind, job, payload))
+
+        for job, progress in latest_progress.items():
+            if not job.cancelled and job.on_progress:
+                job.on_progress(*progress)
+
+        for kind, job, payload in finished:
+            if job.cancelled:
+                continue
+            if self.active.get(job.key) is job:
+                del self.active[job.key]
+            callback = job.on_done if kind == "done" else job.on_error
+            if callback:
+                callback(payload)
+
+    def cancel(self, key):
+        job = self.active.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self, keep=()):
+        """取消所有任务; keep 中的 key 不受影响"""
+        for key in [k for k in self.active if k not in keep]:
+            self.active.pop(key).cancel()
+
+    def attach_tk(self, widget, interval_ms=30):
+        """用 Tk 的 after 定时分发事件"""
+        def tick():
+            self.poll()
+            widget.after(interval_ms, tick)
+
+        widget.after(interval_ms, tick)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
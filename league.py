@@ -0,0 +1,191 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from deck_pool import load_deck_pool
+from matchup import load_matchup_matrix
+from series import PICK_COUNT
+from strategies import STRATEGIES, StateBatch, create_strategy, enemy_view, mask_positions
+
+# --- AI 策略联赛 ---
+# 每对策略在随机抽取的双方阵容上互打 (先后手各一半), 系列赛胜负汇总后拟合 Bradley–Terry 强度,
+# 以 Elo 分制 (平均 1500, 400 分差 = 10:1 胜负比) 报告, 并给出近似 95% 置信区间。
+
+ELO_BASE = 1500.0
+ELO_SCALE = 400.0 / math.log(10.0)
+
+
+def play_tables(matrix, lineups_a, lineups_b, strategy_a, strategy_b, rng):
+    """
+    一批对局: A 先手 Ban、B 看到后 Ban, 双方同时 Pick, 随机配对三局两胜。
+    每个阶段对每个策略只调用一次 (整批状态); 返回每桌 A 是否获胜的列表。
+    """
+    locals_a = [matrix.local(a, b) for a, b in zip(lineups_a, lineups_b)]
+    locals_b = [enemy_view(local) for local in locals_a]
+    keys_a = [(tuple(a), tuple(b)) for a, b in zip(lineups_a, lineups_b)]
+    keys_b = [(b, a) for a, b in keys_a]
+    full_a = [(1 << len(a)) - 1 for a in lineups_a]
+    full_b = [(1 << len(b)) - 1 for b in lineups_b]
+
+    bans_by_a = strategy_a.ban(rng, StateBatch(locals_a, full_a, full_b, keys_a))  # lineup_b 中的位置
+    left_b = [m & ~(1 << x) for m, x in zip(full_b, bans_by_a)]
+    bans_by_b = strategy_b.ban(rng, StateBatch(locals_b, left_b, full_a, keys_b))  # lineup_a 中的位置
+    left_a = [m & ~(1 << y) for m, y in zip(full_a, bans_by_b)]
+
+    picks_a = strategy_a.pick(rng, StateBatch(locals_a, left_a, left_b, keys_a))
+    picks_b = strategy_b.pick(rng, StateBatch(locals_b, left_b, left_a, keys_b))
+
+    results = []
+    for local, mask_a, mask_b in zip(locals_a, picks_a, picks_b):
+        order_b = mask_positions(mask_b)
+        rng.shuffle(order_b)
+        wins = sum(rng.random() < local[i][j] for i, j in zip(mask_positions(mask_a), order_b))
+        results.append(wins * 2 > PICK_COUNT)
+    return results
+
+
+def play_matches(matrix, lineups_a, lineups_b, strategy_a, strategy_b, rng):
+    """同 play_tables, 返回 A 的胜场数"""
+    return sum(play_tables(matrix, lineups_a, lineups_b, strategy_a, strategy_b, rng))
+
+
+def run_pairing_chunk(matrix, pool_names, lineup_size, name_a, name_b, seed, chunk_index, count):
+    """工作进程入口: A 先手对 B 打 count 局 (一个批次), 返回 (A, B, A 胜场, 局数)"""
+    rng = random.Random(f"{seed}:{name_a}:{name_b}:{chunk_index}")
+    lineups_a = [rng.sample(pool_names, lineup_size) for _ in range(count)]
+    lineups_b = [rng.sample(pool_names, lineup_size) for _ in range(count)]
+    wins = play_matches(matrix, lineups_a, lineups_b, create_strategy(name_a), create_strategy(name_b), rng)
+    return name_a, name_b, wins, count
+
+
+def bradley_terry(names, wins, iterations=1000, tol=1e-10):
+    """
+    wins[(a, b)]: a 胜 b 的次数。MM 算法拟合强度 (几何平均归一化为 1),
+    返回 {名称: (Elo, 标准误)}, 标准误取自 Fisher 信息矩阵对角线 (近似)。
+    """
+    strength = {n: 1.0 for n in names}
+    games = {}
+    total_wins = {n: 0.0 for n in names}
+    for (a, b), w in wins.items():
+        games[(a, b)] = games.get((a, b), 0) + w + wins.get((b, a), 0)
+        total_wins[a] += w
+
+    pairs = [(a, b) for a, b in itertools.combinations(names, 2) if games.get((a, b), 0) + games.get((b, a), 0)]
+    for _ in range(iterations):
+        new = {}
+        for n in names:
+            denom = 0.0
+            for a, b in pairs:
+                if n in (a, b):
+                    other = b if n == a else a
+                    denom += games.get((a, b), 0) / (strength[n] + strength[other])
+            # 与强度为 1 的虚拟对手加赛 1 局 (记半场胜), 避免全胜/全负时强度发散
+            new[n] = (total_wins[n] + 0.5) / (denom + 1.0 / (strength[n] + 1.0)) if denom else strength[n]
+        log_mean = sum(math.log(v) for v in new.values()) / len(new)
+        new = {n: v / math.exp(log_mean) for n, v in new.items()}
+        change = max(abs(math.log(new[n] / strength[n])) for n in names)
+        strength = new
+        if change < tol:
+            break
+
+    ratings = {}
+    for n in names:
+        info = 0.0
+        for a, b in pairs:
+            if n in (a, b):
+                p = strength[a] / (strength[a] + strength[b])
+                info += games.get((a, b), 0) * p * (1.0 - p)
+        se = ELO_SCALE / math.sqrt(info) if info else math.inf
+        ratings[n] = (ELO_BASE + ELO_SCALE * math.log(strength[n]), se)
+    return ratings
+
+
+class LeagueResult:
+    def __init__(self, names, wins, games):
+        self.names = names
+        self.wins = wins  # (A, B) -> A 先手时的胜场
+        self.games = games  # (A, B) -> A 先手时的局数
+        combined = {}
+        for (a, b), w in wins.items():
+            combined[(a, b)] = combined.get((a, b), 0) + w
+            combined[(b, a)] = combined.get((b, a), 0) + games[(a, b)] - w
+        self.head_to_head = combined
+        self.ratings = bradley_terry(names, combined)
+
+    def summary(self):
+        lines = []
+        for n in sorted(self.names, key=lambda n: -self.ratings[n][0]):
+            elo, se = self.ratings[n]
+            lines.append(f"{n:>10}: {elo:7.1f} ± {1.96 * se:5.1f}")
+        return "\n".join(lines)
+
+
+def run_league(matrix, pool_names, strategy_names=None, series_per_pair=2000, lineup_size=6, seed=0,
+               workers=None, chunk=250, job=None):
+    """所有策略两两对战 (每对先后手各 series_per_pair 局), 分块在进程池中并行"""
+    names = list(strategy_names or STRATEGIES)
+    for n in names:
+        create_strategy(n)  # 提前检查策略名称
+    tasks = []
+    for a, b in itertools.permutations(names, 2):
+        for index, start in enumerate(range(0, series_per_pair, chunk)):
+            tasks.append((a, b, index, min(chunk, series_per_pair - start)))
+
+    wins = {}
+    games = {}
+
+    def collect(name_a, name_b, w, n):
+        wins[(name_a, name_b)] = wins.get((name_a, name_b), 0) + w
+        games[(name_a, name_b)] = games.get((name_a, name_b), 0) + n
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for done, (a, b, index, count) in enumerate(tasks, 1):
+            collect(*run_pairing_chunk(matrix, pool_names, lineup_size, a, b, seed, index, count))
+            if job is not None:
+                job.report_progress(done, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(run_pairing_chunk, matrix, pool_names, lineup_size, a, b, seed, index, count)
+                       for a, b, index, count in tasks]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    collect(*future.result())
+                    if job is not None:
+                        job.report_progress(done, len(tasks))
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    return LeagueResult(names, wins, games)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI 策略循环联赛")
+    parser.add_argument("--strategies", nargs="*", default=None, help=f"参赛策略 (默认全部: {', '.join(STRATEGIES)})")
+    parser.add_argument("--series", type=int, default=2000, help="每对策略每个先后手的系列赛数")
+    parser.add_argument("--lineup-size", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = load_deck_pool("deck_pool.json", check_icons=False)
+        matrix = load_matchup_matrix(args.matrix)
+        result = run_league(matrix, [d["name"] for d in pool], args.strategies, args.series, args.lineup_size,
+                            args.seed, args.workers)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
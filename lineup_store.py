@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+from config_cache import atomic_write_json
+
+# --- 多套命名阵容方案存储 ---
+# lineups/index.json 只保存方案名 -> 文件名/元数据 的索引, 每套阵容单独一个文件。
+# 保存某套阵容时只重写它自己的文件 (写临时文件+rename), 索引只在增删方案或元数据变化时重写。
+
+DEFAULT_ROOT = "lineups"
+INDEX_VERSION = 1
+
+
+def _profile_filename(name):
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+    return f"p_{digest}.json"
+
+
+class LineupStore:
+    """保存多套命名阵容 (可按选手/赛事区分), 通过内存索引 O(1) 切换"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.profiles = {}  # name -> {"file", "player", "event"}
+        self.active = None
+        self._decks_cache = {}
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            index = None
+
+        if not isinstance(index, dict) or not isinstance(index.get("profiles"), dict):
+            self._rebuild_index()
+            return
+        self.profiles = index["profiles"]
+        self.active = index.get("active")
+
+    def _rebuild_index(self):
+        """索引损坏时, 根据各方案文件重建索引"""
+        self.profiles = {}
+        for filename in sorted(os.listdir(self.root)):
+            if not (filename.startswith("p_") and filename.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.root, filename), 'r', encoding='utf-8') as f:
+                    profile = json.load(f)
+                self.profiles[profile["name"]] = {
+                    "file": filename,
+                    "player": profile.get("player", ""),
+                    "event": profile.get("event", ""),
+                }
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        self._write_index()
+
+    def _write_index(self):
+        atomic_write_json(self.index_path, {
+            "version": INDEX_VERSION,
+            "active": self.active,
+            "profiles": self.profiles,
+        })
+
+    def __contains__(self, name):
+        return name in self.profiles
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def names(self, player=None, event=None):
+        """方案名列表, 可按选手/赛事筛选"""
+        return [name for name, meta in self.profiles.items()
+                if (player is None or meta.get("player") == player)
+                and (event is None or meta.get("event") == event)]
+
+    def get(self, name):
+        """读取某套阵容 (每个文件只读一次)"""
+        if name in self._decks_cache:
+            return list(self._decks_cache[name])
+        meta = self.profiles[name]
+        with open(os.path.join(self.root, meta["file"]), 'r', encoding='utf-8') as f:
+            decks = json.load(f)["decks"]
+        self._decks_cache[name] = decks
+        return list(decks)
+
+    def switch(self, name):
+        """切换当前方案并返回其阵容"""
+        decks = self.get(name)
+        if self.active != name:
+            self.active = name
+            self._write_index()
+        return decks
+
+    def save(self, name, decks, player=None, event=None):
+        """保存 (新建或覆盖) 一套阵容, 只重写该方案的文件"""
+        meta = self.profiles.get(name)
+        new_meta = {
+            "file": meta["file"] if meta else _profile_filename(name),
+            "player": player if player is not None else (meta or {}).get("player", ""),
+            "event": event if event is not None else (meta or {}).get("event", ""),
+        }
+
+        atomic_write_json(os.path.join(self.root, new_meta["file"]), {
+            "name": name,
+            "player": new_meta["player"],
+            "event": new_meta["event"],
+            "decks": list(decks),
+        })
+        self._decks_cache[name] = list(decks)
+
+        if meta != new_meta:
+            self.profiles[name] = new_meta
+            self._write_index()
+
+    def delete(self, name):
+        meta = self.profiles.pop(name)
+        self._decks_cache.pop(name, None)
+        if self.active == name:
+            self.active = None
+        self._write_index()
+        try:
+            os.remove(os.path.join(self.root, meta["file"]))
+        except FileNotFoundError:
+            pass
@@ -1,30 +1,57 @@
+from startup import StartupTimer, LazyModule
+
+STARTUP_TIMER = StartupTimer()
+
 import tkinter as tk
 from tkinter import ttk
 from tkinter import font as tkfont
 from tkinter import simpledialog, messagebox
-import json
 import random
 import os
 import platform
+import itertools
 
 try:
     import ctypes
 except ImportError:
     ctypes = None
 
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+from config_cache import load_json_cached, validate_deck_list, atomic_write_json
+from file_watcher import ConfigWatcher, diff_decks
+from deck_pool import load_deck_pool
+from deck_search import DeckSearchIndex
+from lineup_store import LineupStore
+from speculation import SpeculativeAI
+from jobs import JobRunner
+from matchup import load_matchup_matrix, MatchupMatrix
+from subgame_cache import SubgameCache
+from strategies import STRATEGIES, StateBatch, create_strategy, enemy_view, positions_mask, mask_positions
+from pick_heatmap import PickHeatmap, uniform_strategy, heat_color
+from matchup_posterior import load_matchup_posterior, pairing_intervals
+
+# PIL 仅在首次加载图标时导入, 缩短启动时间
+Image = LazyModule("PIL.Image")
+ImageTk = LazyModule("PIL.ImageTk")
+ImageDraw = LazyModule("PIL.ImageDraw")
+ImageFont = LazyModule("PIL.ImageFont")
+
+STARTUP_TIMER.mark("导入模块")
 
 # --- 常量 (全局非缩放) ---
 PLACEHOLDER_COLOR = "#a0a0a0"
 BG_COLOR = "#f0f0f0"
+CONFIG_POLL_MS = 500  # 配置文件热更新检查间隔
+MATCHUP_FILE = "matchup_matrix.json"  # 可选的对战胜率矩阵, 缺失时胜率均按50%计
+DEFAULT_AI_STRATEGY = "random"
 
 
 # --- 新增: 卡组选择器弹出窗口 ---
 class DeckSelector(simpledialog.Dialog):
     """一个用于从卡组池中选择卡组的弹出对话框"""
 
-    def __init__(self, parent, title, deck_pool, min_select, max_select, icon_size, font):
+    def __init__(self, parent, title, deck_pool, min_select, max_select, icon_size, font, search_index=None):
         self.deck_pool = deck_pool
+        self.search_index = search_index or DeckSearchIndex(deck_pool)
         self.min_select = min_select
         self.max_select = max_select
         self.icon_size = icon_size
@@ -32,6 +59,8 @@ class DeckSelector(simpledialog.Dialog):
         self.selected_decks_info = []
         self.selected_widgets = []
         self.widgets = {}
+        self.widget_list = []  # 与 deck_pool 顺序一致, 用于搜索过滤
+        self.visible_indices = None
         self.ok_button = None
 
         # 修复PIL在Toplevel中的ImageTk.PhotoImage问题
@@ -47,6 +76,15 @@ class DeckSelector(simpledialog.Dialog):
         self.status_label = tk.Label(master, text=self.get_status_text(), font=self.font, bg=BG_COLOR)
         self.status_label.pack(pady=5)
 
+        # 搜索框 (名称 / 拼音首字母), 过滤时只隐藏和重新排列组件
+        self.search_var = tk.StringVar()
+        search_frame = tk.Frame(master, bg=BG_COLOR)
+        tk.Label(search_frame, text="搜索:", font=self.font, bg=BG_COLOR).pack(side="left")
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=self.font)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        search_frame.pack(fill="x", padx=10)
+        self.search_var.trace_add("write", lambda *args: self.apply_filter())
+
         # 可滚动的Canvas
         canvas_frame = tk.Frame(master, bd=1, relief="sunken")
 
@@ -84,6 +122,7 @@ class DeckSelector(simpledialog.Dialog):
             widget.grid(row=row, column=col_count, padx=5, pady=5)
 
             self.widgets[widget] = deck
+            self.widget_list.append(widget)
 
             handler = lambda e, w=widget: self.toggle_select(w)
             widget.bind("<Button-1>", handler)
@@ -95,7 +134,23 @@ class DeckSelector(simpledialog.Dialog):
                 col_count = 0
                 row += 1
 
-        return scrollable_frame
+        self.visible_indices = list(range(len(self.widget_list)))
+        return self.search_entry
+
+    def apply_filter(self):
+        """按搜索框内容过滤卡组, 不重建组件"""
+        indices = self.search_index.search(self.search_var.get())
+        if indices == self.visible_indices:
+            return
+
+        visible = set(indices)
+        for i, widget in enumerate(self.widget_list):
+            if i not in visible:
+                widget.grid_remove()
+        for pos, i in enumerate(indices):
+            self.widget_list[i].grid(row=pos // self.max_cols_per_row, column=pos % self.max_cols_per_row,
+                                     padx=5, pady=5)
+        self.visible_indices = indices
 
     def buttonbox(self):
         box = tk.Frame(self, bg=BG_COLOR)
@@ -210,6 +265,7 @@ class DeckBPSimulator(tk.Tk):
         self.font_size_group = int(5 * self.scaling)  # 6 -> 5
         self.font_size_ban_x = int(15 * self.scaling)  # 18 -> 15
 
+        self._font_cache = {}
         self.DEFAULT_FONT = self.check_font((self.FONT_NAME, self.font_size_default),
                                             (self.FONT_FALLBACK, self.font_size_default))
         self.OVERLAY_FONT = self.check_font((self.FONT_NAME, self.font_size_overlay, "bold"),
@@ -218,29 +274,46 @@ class DeckBPSimulator(tk.Tk):
                                            (self.FONT_FALLBACK, self.font_size_status, "bold"))
         self.GROUP_FONT = self.check_font((self.FONT_NAME, self.font_size_group, "bold"),
                                           (self.FONT_FALLBACK, self.font_size_group, "bold"))
+        self.BAN_FONT = self.check_font((self.FONT_NAME, self.font_size_ban_x, "bold"),
+                                        (self.FONT_FALLBACK, self.font_size_ban_x, "bold"))
+        STARTUP_TIMER.mark("缩放与字体")
 
         self.title("卡组B/P对局模拟器 (v2.2)")  # 版本更新
         self.geometry(f"{int(1300 * self.scaling)}x{int(900 * self.scaling)}")
         self.configure(bg=BG_COLOR)
 
         # 1. 加载配置
-        self.deck_pool = self.load_json("deck_pool.json", "卡组资源池")
+        self.deck_pool = self.load_pool("deck_pool.json")
         self.my_fixed_decks_info_from_file = self.load_json("my_decks.json", "我方卡组")
 
         if not self.deck_pool or not self.my_fixed_decks_info_from_file:
             self.quit();
             return
+        unknown = self.deck_pool.unknown_decks(self.my_fixed_decks_info_from_file)
+        if unknown:
+            print(f"警告: 以下我方卡组不在卡组资源池中: {'、'.join(unknown)}")
+        self.matchup = self.load_matchup()
+        STARTUP_TIMER.mark("加载配置")
 
         # 2. 初始化状态变量
         self.matchup_icon_cache = []
+        self.icon_cache = {}  # (path, size) -> PhotoImage
+        self.config_watcher = ConfigWatcher(["deck_pool.json", "my_decks.json", MATCHUP_FILE])
+        self.deck_search_index = DeckSearchIndex(self.deck_pool)
+        self.lineup_store = LineupStore()
 
         self.opponent_deck_mode = tk.StringVar(value="random")
         self.my_deck_mode = tk.StringVar(value="file")
         self.custom_opponent_ban = tk.BooleanVar(value=False)
         self.custom_opponent_pick = tk.BooleanVar(value=False)
         self.my_decks_changed = tk.BooleanVar(value=False)
+        self.ai_strategy_var = tk.StringVar(value=DEFAULT_AI_STRATEGY)
+        self.ai_strategy = create_strategy(DEFAULT_AI_STRATEGY)
 
         self.game_state = "SETUP"
+        self.game_id = 0
+        self.jobs = JobRunner()
+        self.ai_speculator = SpeculativeAI(executor=self.jobs.thread_pool)
         self.my_decks_widgets = []
         self.opponent_decks_widgets = []
         self.my_decks_data_current = []
@@ -250,32 +323,85 @@ class DeckBPSimulator(tk.Tk):
         self.my_picked_widgets = []
         self.opponent_picked_widgets = []
         self.opponent_picked_decks_data = []
+        self.bp_solution = None
+        self.pick_heatmap = None
+        self.subgame_cache = SubgameCache()
 
-        # 3. 创建UI
+        # 3. 创建UI (卡组图标在首次绘制之后再加载)
         self.create_widgets()
+        STARTUP_TIMER.mark("创建界面")
+        self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """窗口显示后再加载卡组图标, 并输出启动耗时报告"""
+        STARTUP_TIMER.mark("首次绘制")
         self.reset_game()
+        self.restore_active_profile()
+        if self.deck_pool.diagnostics:
+            self.status_label.config(text=f"卡组池检查: {self.deck_pool.diagnostics.summary()} (详见控制台)",
+                                     fg="#E67E22")
+        STARTUP_TIMER.finish("加载卡组图标")
+        self.after(CONFIG_POLL_MS, self.poll_config_changes)
+        self.jobs.attach_tk(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        """关闭窗口前停止后台任务和文件监视"""
+        self.ai_speculator.cancel_all()
+        self.jobs.shutdown()
+        self.config_watcher.stop()
+        self.destroy()
 
     def check_font(self, preferred_font, fallback_font):
+        key = (preferred_font, fallback_font)
+        if key in self._font_cache:
+            return self._font_cache[key]
+
         try:
             f = tkfont.Font(font=preferred_font)
             if f.actual()["family"].lower() in preferred_font[0].lower():
-                return preferred_font
+                result = preferred_font
             else:
-                return fallback_font
+                result = fallback_font
         except:
-            return fallback_font
+            result = fallback_font
+
+        self._font_cache[key] = result
+        return result
+
+    def load_pool(self, filepath):
+        """读取并校验卡组资源池, 问题清单输出到控制台"""
+        try:
+            pool = load_deck_pool(filepath)
+        except FileNotFoundError:
+            self.show_error(f"错误: 未找到配置文件 '{filepath}'。")
+            return None
+        except ValueError:
+            self.show_error(f"错误: 配置文件 '{filepath}' 格式错误。")
+            return None
+
+        if pool.diagnostics:
+            print(pool.diagnostics.report(pool))
+        return pool
 
     def load_json(self, filepath, name):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_json_cached(filepath, validate_deck_list)
         except FileNotFoundError:
             self.show_error(f"错误: 未找到配置文件 '{filepath}'。")
             return None
-        except json.JSONDecodeError:
+        except ValueError:
             self.show_error(f"错误: 配置文件 '{filepath}' 格式错误。")
             return None
 
+    def load_matchup(self):
+        """读取对战胜率矩阵; 文件有误时退回全 50% 矩阵"""
+        try:
+            return load_matchup_matrix(MATCHUP_FILE)
+        except ValueError as e:
+            print(f"警告: 对战矩阵 {MATCHUP_FILE} 无效, 胜率均按50%计: {e}")
+            return MatchupMatrix.uniform([])
+
     def show_error(self, message):
         try:
             if self.status_label:
@@ -315,6 +441,13 @@ class DeckBPSimulator(tk.Tk):
         self.count_slider.config(variable=self.opponent_count_var)
         self.count_slider.pack(side="left", padx=5)
 
+        tk.Label(opp_frame, text="AI:", font=self.DEFAULT_FONT, bg=BG_COLOR).pack(side="left")
+        self.ai_strategy_combo = ttk.Combobox(opp_frame, textvariable=self.ai_strategy_var, state="readonly", width=8,
+                                              values=list(STRATEGIES), font=self.DEFAULT_FONT)
+        self.ai_strategy_combo.bind("<<ComboboxSelected>>",
+                                    lambda e: setattr(self, "ai_strategy", create_strategy(self.ai_strategy_var.get())))
+        self.ai_strategy_combo.pack(side="left", padx=5)
+
         opp_frame.pack(side="left")
 
         # 我方卡组选择
@@ -329,6 +462,18 @@ class DeckBPSimulator(tk.Tk):
                                               command=self.save_my_decks, state="disabled")
         self.save_my_decks_button.pack(side="left", padx=10)
 
+        # 阵容方案 (多套命名阵容)
+        tk.Label(my_frame, text="方案:", font=self.DEFAULT_FONT, bg=BG_COLOR).pack(side="left")
+        self.profile_var = tk.StringVar(value="")
+        self.profile_combo = ttk.Combobox(my_frame, textvariable=self.profile_var, state="readonly", width=14,
+                                          values=self.lineup_store.names(), font=self.DEFAULT_FONT)
+        self.profile_combo.bind("<<ComboboxSelected>>", lambda e: self.switch_lineup_profile())
+        self.profile_combo.pack(side="left", padx=5)
+
+        self.save_profile_button = tk.Button(my_frame, text="另存为方案", font=self.DEFAULT_FONT,
+                                             command=self.save_lineup_profile)
+        self.save_profile_button.pack(side="left", padx=5)
+
         my_frame.pack(side="left", padx=20)
 
         # 游戏控制
@@ -350,6 +495,10 @@ class DeckBPSimulator(tk.Tk):
         self.status_label = tk.Label(self, text="请设置卡组，然后点击'生成对局'", font=self.STATUS_FONT, bg=BG_COLOR)
         self.status_label.pack(pady=int(10 * self.scaling))
 
+        # 后台任务进度
+        self.job_label = tk.Label(self, text="", font=self.DEFAULT_FONT, fg="gray", bg=BG_COLOR)
+        self.job_label.pack()
+
         # 卡组显示区
         decks_frame = tk.Frame(self, bg=BG_COLOR)
         decks_frame.pack(fill="both", expand=True, padx=int(20 * self.scaling))
@@ -367,6 +516,10 @@ class DeckBPSimulator(tk.Tk):
         self.opponent_decks_container = tk.Frame(self.opponent_frame, bg=BG_COLOR)
         self.opponent_decks_container.pack(pady=int(15 * self.scaling))
 
+        # Ban参考: Ban掉每套对方卡组后的预期系列赛胜率
+        self.ban_advice_frame = tk.Frame(self.opponent_frame, bg=BG_COLOR)
+        self.ban_advice_frame.pack(pady=(0, int(10 * self.scaling)))
+
         # 我方卡组
         self.my_frame = tk.LabelFrame(decks_frame, text="我方卡组", font=self.GROUP_FONT, bg=BG_COLOR, bd=2,
                                       relief="groove")
@@ -402,6 +555,7 @@ class DeckBPSimulator(tk.Tk):
             self.my_decks_data_current = list(self.my_fixed_decks_info_from_file)
             self.my_decks_changed.set(False)
             self.save_my_decks_button.config(state="disabled")
+            self.profile_var.set("")
             self.reload_my_decks_ui()
             self.status_label.config(text="我方卡组已重置为 [默认]")
         else:  # custom
@@ -425,8 +579,7 @@ class DeckBPSimulator(tk.Tk):
             return
 
         try:
-            with open("my_decks.json", 'w', encoding='utf-8') as f:
-                json.dump(self.my_decks_data_current, f, indent=4, ensure_ascii=False)
+            atomic_write_json("my_decks.json", self.my_decks_data_current)
 
             self.my_fixed_decks_info_from_file = list(self.my_decks_data_current)
             self.my_decks_changed.set(False)
@@ -435,6 +588,210 @@ class DeckBPSimulator(tk.Tk):
         except Exception as e:
             self.show_error(f"保存失败: {e}")
 
+    # --- 后台任务 ---
+    def run_job(self, fn, *args, key=None, on_done=None, message="后台计算中"):
+        """在后台运行 fn(job, *args), 进度显示在状态栏下方, 完成后在GUI线程回调 on_done"""
+        def done(result):
+            self.clear_job_progress()
+            if on_done:
+                on_done(result)
+
+        def error(exc):
+            self.clear_job_progress()
+            self.show_error(f"{message}失败: {exc}")
+
+        def progress(done_count, total, note):
+            self.job_label.config(text=f"{message}... {done_count}/{total} {note}")
+
+        self.job_label.config(text=f"{message}...")
+        return self.jobs.submit(fn, *args, key=key, on_done=done, on_progress=progress, on_error=error)
+
+    def clear_job_progress(self):
+        self.job_label.config(text="")
+
+    # --- 配置热更新 ---
+    def poll_config_changes(self):
+        """定时取出配置文件变化, 在GUI线程中处理"""
+        for path in self.config_watcher.poll():
+            self.on_config_file_changed(path)
+        self.after(CONFIG_POLL_MS, self.poll_config_changes)
+
+    def on_config_file_changed(self, path):
+        """重新读取变化的配置, 只更新受影响的卡组组件"""
+        filename = os.path.basename(path)
+        if filename == "deck_pool.json":
+            new_pool = self.load_pool("deck_pool.json")
+            if not new_pool:
+                return
+            diff = diff_decks(self.deck_pool, new_pool)
+            reordered = [d["name"] for d in self.deck_pool or ()] != [d["name"] for d in new_pool]
+            self.deck_pool = new_pool
+            if diff or reordered:
+                # 搜索索引按位置记录卡组, 仅调整顺序时 diff 为空, 也需要重建
+                self.deck_search_index = DeckSearchIndex(self.deck_pool)
+            if diff:
+                self.patch_deck_widgets(diff.changed)
+                self.status_label.config(text=f"卡组资源池已更新 ({diff.summary()})", fg="green")
+
+        elif filename == "my_decks.json":
+            new_decks = self.load_json("my_decks.json", "我方卡组")
+            if not new_decks:
+                return
+            old_decks = self.my_fixed_decks_info_from_file
+            self.my_fixed_decks_info_from_file = new_decks
+            if new_decks == old_decks:
+                return
+            if self.game_state == "SETUP" and self.my_deck_mode.get() == "file":
+                self.patch_my_decks(old_decks, new_decks)
+            self.status_label.config(text="[我方卡组] 配置已更新", fg="green")
+
+        elif filename == MATCHUP_FILE:
+            self.matchup = self.load_matchup()
+            if self.opponent_decks_widgets and self.game_state != "SETUP":
+                self.start_ban_analysis()
+            self.status_label.config(text="[对战矩阵] 已更新", fg="green")
+
+    def patch_deck_widgets(self, changed):
+        """按卡组名称更新界面上已显示的卡组 (changed: name -> 新 deck_info)"""
+        for widget in self.my_decks_widgets + self.opponent_decks_widgets:
+            new_info = changed.get(widget.deck_info["name"])
+            if new_info is not None:
+                widget.deck_info = dict(new_info)  # 换成新字典: 旧字典与资源池、我方卡组列表共享
+                self.refresh_deck_widget(widget)
+
+    def patch_my_decks(self, old_decks, new_decks):
+        """按位置比较, 只重建变化了的我方卡组组件"""
+        self.my_decks_data_current = list(new_decks)
+        if len(old_decks) != len(new_decks) or len(self.my_decks_widgets) != len(new_decks):
+            self.reload_my_decks_ui()
+            return
+
+        for widget, old, new in zip(self.my_decks_widgets, old_decks, new_decks):
+            if old != new:
+                widget.deck_info = new
+                self.refresh_deck_widget(widget)
+
+    def refresh_deck_widget(self, widget):
+        """根据 widget.deck_info 重新加载图标和名称"""
+        deck_info = widget.deck_info
+        self.forget_icon(deck_info["icon_path"])
+        icon_img = self.load_deck_icon(deck_info["icon_path"], self.ICON_SIZE)
+        widget.icon_label.config(image=icon_img)
+        widget.icon_label.image = icon_img
+        widget.name_label.config(text=deck_info["name"])
+
+    def forget_icon(self, path):
+        """使某个图标路径的所有尺寸缓存失效"""
+        for key in [k for k in self.icon_cache if k[0] == path]:
+            del self.icon_cache[key]
+
+    # --- Ban参考 ---
+    def lineup_names(self):
+        return ([w.deck_info["name"] for w in self.my_decks_widgets],
+                [w.deck_info["name"] for w in self.opponent_decks_widgets])
+
+    def lineup_local_matrix(self):
+        """当前双方阵容之间的单局胜率子矩阵 (行为我方)"""
+        return self.matchup.local(*self.lineup_names())
+
+    def start_ban_analysis(self):
+        """对方阵容生成后, 一次求解所有Ban选择的预期胜率 (同一阵容与矩阵版本的结果取自磁盘缓存)"""
+        self.bp_solution = None
+        if len(self.my_decks_widgets) < 4 or len(self.opponent_decks_widgets) < 4:
+            return
+        my_names, opp_names = self.lineup_names()
+        self.run_job(lambda job, matrix: self.subgame_cache.solve_bp(matrix, my_names, opp_names), self.matchup,
+                     key="ban_advice", on_done=self.show_ban_advice, message="计算Ban参考")
+
+    def show_ban_advice(self, solution):
+        self.bp_solution = solution
+        self.clear_frame(self.ban_advice_frame)
+        tk.Label(self.ban_advice_frame, text="Ban后预期胜率:", bg=BG_COLOR, font=self.DEFAULT_FONT).pack(side="left")
+        for pos, widget in enumerate(self.opponent_decks_widgets):
+            best = pos == solution.best_ban
+            tk.Label(self.ban_advice_frame, text=f"{widget.deck_info['name']} {solution.ban_values[pos]:.1%}",
+                     bg=BG_COLOR, fg="#27AE60" if best else "black",
+                     font=self.OVERLAY_FONT if best else self.DEFAULT_FONT).pack(side="left", padx=int(6 * self.scaling))
+        if self.matchup.is_default:
+            tk.Label(self.ban_advice_frame, text="(未加载对战数据, 胜率均按50%计)", bg=BG_COLOR, fg=PLACEHOLDER_COLOR,
+                     font=self.DEFAULT_FONT).pack(side="left")
+        if self.game_state == "PICK":
+            self.start_pick_heatmap()  # 用均衡策略替换均匀分布的预测
+
+    # --- Pick阶段热力图 ---
+    def start_pick_heatmap(self):
+        """按当前双方Ban和预测的对方出战分布, 计算我方各出战组合的期望胜率"""
+        opp_ban = self.opponent_decks_widgets.index(self.opponent_banned_widget)
+        my_ban = self.my_decks_widgets.index(self.my_banned_widget) if self.my_banned_widget else None
+        my_available = [i for i in range(len(self.my_decks_widgets)) if i != my_ban]
+        opp_available = [i for i in range(len(self.opponent_decks_widgets)) if i != opp_ban]
+
+        strategies = self.bp_solution.pick_strategies if self.bp_solution else {}
+        if (opp_ban, my_ban) in strategies:
+            opp_strategy = strategies[(opp_ban, my_ban)][1]
+        else:
+            opp_strategy = uniform_strategy(opp_available)
+        self.pick_heatmap = PickHeatmap(self.lineup_local_matrix(), my_available, opp_strategy)
+        self.update_pick_heatmap()
+
+    def update_pick_heatmap(self):
+        """在我方未选卡组上显示边际贡献; 离开Pick阶段时隐藏"""
+        contributions = {}
+        if self.game_state == "PICK" and self.pick_heatmap is not None:
+            picked = [self.my_decks_widgets.index(w) for w in self.my_picked_widgets]
+            contributions = self.pick_heatmap.contributions(picked)
+
+        for pos, widget in enumerate(self.my_decks_widgets):
+            if pos in contributions:
+                _, delta = contributions[pos]
+                widget.heat_overlay.config(text=f"{delta:+.1%}", bg=heat_color(delta))
+                widget.heat_overlay.place(relx=0.5, rely=0.0, anchor="n", y=int(5 * self.scaling))
+            else:
+                widget.heat_overlay.place_forget()
+
+    # --- 阵容方案 ---
+    def restore_active_profile(self):
+        """启动时恢复上次使用的阵容方案"""
+        name = self.lineup_store.active
+        if name in self.lineup_store:
+            self.profile_var.set(name)
+            self.switch_lineup_profile()
+
+    def switch_lineup_profile(self):
+        """切换到选中的阵容方案"""
+        name = self.profile_var.get()
+        if not name:
+            return
+        try:
+            decks = self.lineup_store.switch(name)
+        except (OSError, ValueError, KeyError) as e:
+            self.show_error(f"读取方案失败: {e}")
+            return
+
+        self.my_decks_data_current = decks
+        self.my_deck_mode.set("custom")
+        self.my_decks_changed.set(True)  # 可通过"保存卡组"设为默认阵容
+        self.save_my_decks_button.config(state="normal")
+        self.reload_my_decks_ui()
+        self.status_label.config(text=f"我方卡组已切换为方案 [{name}]", fg="black")
+
+    def save_lineup_profile(self):
+        """将当前我方卡组另存为命名方案"""
+        name = simpledialog.askstring("另存为方案", "方案名称 (如 选手-赛事):", parent=self,
+                                      initialvalue=self.profile_var.get())
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        try:
+            self.lineup_store.save(name, self.my_decks_data_current)
+        except (OSError, ValueError) as e:
+            self.show_error(f"保存方案失败: {e}")
+            return
+
+        self.profile_combo.config(values=self.lineup_store.names())
+        self.profile_var.set(name)
+        self.status_label.config(text=f"成功保存方案 [{name}]", fg="green")
+
     def open_deck_selector(self, team, title, min_sel, max_sel):
         """打开模态对话框"""
         dialog = DeckSelector(self,
@@ -442,13 +799,18 @@ class DeckBPSimulator(tk.Tk):
                               self.deck_pool,
                               min_sel, max_sel,
                               self.ICON_SIZE,
-                              self.DEFAULT_FONT)
+                              self.DEFAULT_FONT,
+                              self.deck_search_index)
 
         return dialog.selected_decks_info
 
     # --- 卡组图标加载 ---
     def load_deck_icon(self, path, size):
         """加载卡组图标，如果失败则创建占位符"""
+        key = (path, size)
+        if key in self.icon_cache:
+            return self.icon_cache[key]
+
         try:
             img = Image.open(path).resize(size, Image.Resampling.LANCZOS)
         except Exception:
@@ -464,7 +826,9 @@ class DeckBPSimulator(tk.Tk):
                     font = ImageFont.load_default()
             draw.text((size[0] / 2, size[1] / 2), "图标缺失", fill="white", anchor="mm", font=font)
 
-        return ImageTk.PhotoImage(img)
+        img_tk = ImageTk.PhotoImage(img)
+        self.icon_cache[key] = img_tk
+        return img_tk
 
     def create_deck_widget(self, parent_frame, deck_info):
         """创建单个卡组的可视化组件 (图标+名称)"""
@@ -483,9 +847,8 @@ class DeckBPSimulator(tk.Tk):
                            padx=int(5 * self.scaling))
         name_bg.place(relx=0.5, rely=1.0, anchor="s", y=int(-5 * self.scaling))
 
-        ban_font = self.check_font((self.FONT_NAME, self.font_size_ban_x, "bold"),
-                                   (self.FONT_FALLBACK, self.font_size_ban_x, "bold"))
-        widget.ban_overlay = tk.Label(widget, text="❌", fg="#E74C3C", bg=BG_COLOR, font=ban_font)
+        widget.ban_overlay = tk.Label(widget, text="❌", fg="#E74C3C", bg=BG_COLOR, font=self.BAN_FONT)
+        widget.heat_overlay = tk.Label(widget, fg="white", font=self.OVERLAY_FONT, padx=int(4 * self.scaling))
 
         widget.pack(side="left", padx=int(10 * self.scaling))
 
@@ -514,6 +877,9 @@ class DeckBPSimulator(tk.Tk):
     def reset_game(self):
         """重置整个游戏状态和UI"""
         self.game_state = "SETUP"
+        self.ai_speculator.cancel_all()
+        self.jobs.cancel_all()
+        self.clear_job_progress()
         self.status_label.config(text="请设置卡组，然后点击'生成对局'", fg="black")
 
         self.my_banned_widget = None
@@ -528,6 +894,9 @@ class DeckBPSimulator(tk.Tk):
         self.clear_frame(self.opponent_decks_container)
         self.clear_frame(self.my_decks_container)
         self.clear_frame(self.matchup_container)
+        self.clear_frame(self.ban_advice_frame)
+        self.bp_solution = None
+        self.pick_heatmap = None
 
         self.opponent_decks_container.pack(pady=int(15 * self.scaling))
         self.my_decks_container.pack(pady=int(15 * self.scaling))
@@ -546,6 +915,9 @@ class DeckBPSimulator(tk.Tk):
         self.generate_button.config(state="normal")
         self.save_my_decks_button.config(state="disabled")
         self.undo_button.config(state="disabled")  # 【撤回】
+        self.profile_var.set("")
+        self.profile_combo.config(state="readonly")
+        self.save_profile_button.config(state="normal")
 
         self.generate_matchup_button.pack_forget()
 
@@ -564,6 +936,9 @@ class DeckBPSimulator(tk.Tk):
         self.count_slider.config(state="disabled" if locked or self.opponent_deck_mode.get() == "custom" else "normal")
         self.generate_button.config(state=state)
         self.save_my_decks_button.config(state="disabled" if locked or not self.my_decks_changed.get() else "normal")
+        self.profile_combo.config(state="disabled" if locked else "readonly")
+        self.save_profile_button.config(state=state)
+        self.ai_strategy_combo.config(state="disabled" if locked else "readonly")
 
         # 【撤回】: 撤回按钮在锁定时也禁用
         if locked:
@@ -585,13 +960,21 @@ class DeckBPSimulator(tk.Tk):
         self.set_controls_locked(True)
 
         self.game_state = "BAN"
+        self.game_id += 1
+        self.ai_speculator.cancel_all()
+        self.jobs.cancel_all()
+        self.clear_job_progress()
         self.clear_frame(self.opponent_decks_container)
         self.clear_frame(self.matchup_container)
+        self.clear_frame(self.ban_advice_frame)
+        self.bp_solution = None
+        self.pick_heatmap = None
         self.generate_matchup_button.pack_forget()
 
         for widget in self.my_decks_widgets:
             self.set_widget_visual(widget, "normal")
             self.unbind_widget_clicks(widget)
+            widget.heat_overlay.place_forget()
 
         self.my_banned_widget = None
         self.opponent_banned_widget = None
@@ -629,6 +1012,8 @@ class DeckBPSimulator(tk.Tk):
             self.bind_widget_clicks(widget, handler)
 
         self.status_label.config(text="[Ban阶段] 请点击一套 [对方卡组] 进行Ban (1/1)", fg="blue")
+        self.speculate_ai_ban()
+        self.start_ban_analysis()
 
     def bind_widget_clicks(self, widget, handler):
         """绑定点击事件到卡组的所有子组件"""
@@ -637,6 +1022,8 @@ class DeckBPSimulator(tk.Tk):
         widget.name_label.bind("<Button-1>", handler)
         if hasattr(widget, 'ban_overlay'):
             widget.ban_overlay.bind("<Button-1>", handler)
+        if hasattr(widget, 'heat_overlay'):
+            widget.heat_overlay.bind("<Button-1>", handler)
 
     def unbind_widget_clicks(self, widget):
         """解绑卡组的所有点击事件"""
@@ -645,6 +1032,8 @@ class DeckBPSimulator(tk.Tk):
         widget.name_label.unbind("<Button-1>")
         if hasattr(widget, 'ban_overlay'):
             widget.ban_overlay.unbind("<Button-1>")
+        if hasattr(widget, 'heat_overlay'):
+            widget.heat_overlay.unbind("<Button-1>")
 
     def handle_deck_click(self, widget, target_team):
         """处理卡组点击事件 (Ban 和 Pick)"""
@@ -702,6 +1091,8 @@ class DeckBPSimulator(tk.Tk):
                     self.undo_button.config(state="normal")
                     self.process_ai_pick()
 
+                self.update_pick_heatmap()
+
         elif self.game_state == "CUSTOM_OPPONENT_PICK":
             if target_team == "opponent":
                 if widget in self.opponent_picked_widgets:
@@ -754,6 +1145,44 @@ class DeckBPSimulator(tk.Tk):
                 handler = lambda e, w=w: self.handle_deck_click(w, "my")
                 self.bind_widget_clicks(w, handler)
 
+        self.speculate_ai_pick()
+        self.start_pick_heatmap()
+
+    # --- AI 预计算 (玩家思考时在后台计算AI的应对) ---
+
+    def ai_ban_key(self):
+        """AI Ban 的状态键: (对局, 我方Ban掉的对方卡组位置)"""
+        return ("ban", self.game_id, self.opponent_decks_widgets.index(self.opponent_banned_widget))
+
+    def ai_pick_key(self, my_pick_positions):
+        """AI Pick 的状态键: (对局, 双方Ban, 我方出战卡组位置)"""
+        opp_ban = self.opponent_decks_widgets.index(self.opponent_banned_widget)
+        my_ban = self.my_decks_widgets.index(self.my_banned_widget) if self.my_banned_widget else None
+        return ("pick", self.game_id, opp_ban, my_ban, tuple(sorted(my_pick_positions)))
+
+    def speculate_ai_ban(self):
+        """为玩家每一种可能的Ban预先计算AI的Ban"""
+        if self.custom_opponent_ban.get():
+            return
+        my_positions = list(range(len(self.my_decks_widgets)))
+        opp_positions = list(range(len(self.opponent_decks_widgets)))
+        ai_local = enemy_view(self.lineup_local_matrix())
+        for pos in opp_positions:
+            own_available = [i for i in opp_positions if i != pos]
+            self.ai_speculator.speculate(("ban", self.game_id, pos), self.ai_logic_ban, my_positions, own_available,
+                                         ai_local)
+
+    def speculate_ai_pick(self):
+        """为玩家每一种可能的出战组合预先计算AI的Pick"""
+        if self.custom_opponent_pick.get() or self.opponent_banned_widget is None:
+            return
+        my_available = [i for i, w in enumerate(self.my_decks_widgets) if w != self.my_banned_widget]
+        opp_available = [i for i, w in enumerate(self.opponent_decks_widgets) if w != self.opponent_banned_widget]
+        ai_local = enemy_view(self.lineup_local_matrix())
+        for picks in itertools.combinations(my_available, 3):
+            self.ai_speculator.speculate(self.ai_pick_key(picks), self.ai_logic_pick, opp_available, 3, my_available,
+                                         ai_local)
+
     # --- AI 逻辑 (入口) ---
 
     def process_ai_ban(self):
@@ -766,8 +1195,12 @@ class DeckBPSimulator(tk.Tk):
                 handler = lambda e, w=w: self.handle_deck_click(w, "my")
                 self.bind_widget_clicks(w, handler)
         else:
-            available_to_ban = [w for w in self.my_decks_widgets]
-            self.my_banned_widget = self.ai_logic_ban(available_to_ban)
+            available_to_ban = list(range(len(self.my_decks_widgets)))
+            opp_ban = self.opponent_decks_widgets.index(self.opponent_banned_widget)
+            own_available = [i for i in range(len(self.opponent_decks_widgets)) if i != opp_ban]
+            ban_pos = self.ai_speculator.result(self.ai_ban_key(), self.ai_logic_ban, available_to_ban, own_available,
+                                                enemy_view(self.lineup_local_matrix()))
+            self.my_banned_widget = self.my_decks_widgets[ban_pos] if ban_pos is not None else None
 
             if self.my_banned_widget:
                 self.set_widget_visual(self.my_banned_widget, "banned")
@@ -789,8 +1222,14 @@ class DeckBPSimulator(tk.Tk):
                     handler = lambda e, w=w: self.handle_deck_click(w, "opponent")
                     self.bind_widget_clicks(w, handler)
         else:
-            available_to_pick = [w for w in self.opponent_decks_widgets if w != self.opponent_banned_widget]
-            picked_widgets = self.ai_logic_pick(available_to_pick, 3)
+            available_to_pick = [i for i, w in enumerate(self.opponent_decks_widgets)
+                                 if w != self.opponent_banned_widget]
+            my_pick_positions = [self.my_decks_widgets.index(w) for w in self.my_picked_widgets]
+            my_available = [i for i, w in enumerate(self.my_decks_widgets) if w != self.my_banned_widget]
+            picked_positions = self.ai_speculator.result(self.ai_pick_key(my_pick_positions),
+                                                         self.ai_logic_pick, available_to_pick, 3, my_available,
+                                                         enemy_view(self.lineup_local_matrix()))
+            picked_widgets = [self.opponent_decks_widgets[i] for i in picked_positions]
 
             self.opponent_picked_decks_data = []
             self.opponent_picked_widgets = []  # 记录AI Pick的widget
@@ -813,6 +1252,9 @@ class DeckBPSimulator(tk.Tk):
         3. (PENDING_OPPONENT_PICK) -> (PICK)
         4. (PICK / CUSTOM_OPPONENT_PICK) -> (BAN)
         """
+        # 撤回后基于旧状态的后台分析已过期 (Ban参考只取决于双方阵容, 保留)
+        self.jobs.cancel_all(keep=("ban_advice",))
+        self.clear_job_progress()
 
         # 1. 撤销对战表 (如果已生成)
         if self.game_state == "DONE" and self.matchup_container.winfo_children():
@@ -874,7 +1316,10 @@ class DeckBPSimulator(tk.Tk):
         if self.game_state == "PICK" or self.game_state == "CUSTOM_OPPONENT_PICK":
             self.game_state = "BAN"
             self.status_label.config(text="[撤销] 返回 [Ban阶段]。请重新Ban [对方卡组]", fg="blue")
+            self.ai_speculator.retain(lambda key: key[0] == "ban")  # Pick阶段的预计算已过期
             self.undo_button.config(state="disabled")  # 这是撤回链的末端
+            self.pick_heatmap = None
+            self.update_pick_heatmap()
 
             # 清除Pick阶段的绑定
             for w in self.my_decks_widgets:
@@ -910,6 +1355,17 @@ class DeckBPSimulator(tk.Tk):
         )
         self.generate_matchup_button.config(state="normal")
 
+    def matchup_intervals(self, my_names, opp_names):
+        """最终对战按对战矩阵后验抽样得到的胜率区间; 没有对战矩阵文件时返回 None"""
+        try:
+            posterior = load_matchup_posterior(MATCHUP_FILE)
+        except ValueError as e:
+            print(f"警告: 对战矩阵 {MATCHUP_FILE} 无效, 不显示胜率区间: {e}")
+            return None
+        if posterior is None:
+            return None
+        return pairing_intervals(posterior, my_names, opp_names)
+
     def display_random_matchups(self):
         """(按钮触发) 显示最终的1v1随机匹配"""
         self.clear_frame(self.matchup_container)
@@ -926,6 +1382,7 @@ class DeckBPSimulator(tk.Tk):
 
         self.matchup_frame.config(text="最终对战 (1v1 随机匹配)")
         self.matchup_icon_cache = []
+        intervals = self.matchup_intervals([d['name'] for d in my_final_picks], [d['name'] for d in opp_final_picks])
 
         for i in range(3):
             my_deck = my_final_picks[i]
@@ -973,16 +1430,29 @@ class DeckBPSimulator(tk.Tk):
 
             opp_team_frame.grid(row=0, column=2, sticky="w")  # 整体左对齐
 
+            if intervals:
+                game = intervals[0][i]
+                tk.Label(match_row, text=f"{game.mean:.0%} [{game.lower:.0%}–{game.upper:.0%}]",
+                         font=self.DEFAULT_FONT, fg="gray25", bg=BG_COLOR).grid(row=1, column=1)
+
+        if intervals:
+            tk.Label(self.matchup_container, text=f"系列赛胜率 {intervals[1]}", font=self.STATUS_FONT,
+                     bg=BG_COLOR).pack(pady=int(5 * self.scaling))
+
     # --- 可替换的 AI 逻辑 ---
+    # 参数为可选卡组的位置序号与 AI 视角的胜率子矩阵, 返回选中的位置序号; 会在后台线程中被预先调用, 不要操作界面组件。
+    # 具体决策由 strategies 中注册的策略完成 (界面按大小为 1 的批次调用)。
 
-    def ai_logic_ban(self, available_decks):
+    def ai_logic_ban(self, available_decks, own_available, ai_local):
         if not available_decks: return None
-        return random.choice(available_decks)
+        batch = StateBatch([ai_local], [positions_mask(own_available)], [positions_mask(available_decks)])
+        return self.ai_strategy.ban(random, batch)[0]
 
-    def ai_logic_pick(self, available_decks, num_to_pick):
+    def ai_logic_pick(self, available_decks, num_to_pick, enemy_available, ai_local):
         if len(available_decks) < num_to_pick:
             return available_decks
-        return random.sample(available_decks, num_to_pick)
+        batch = StateBatch([ai_local], [positions_mask(available_decks)], [positions_mask(enemy_available)])
+        return mask_positions(self.ai_strategy.pick(random, batch)[0])
 
 
 def set_dpi_awareness():
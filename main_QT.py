@@ -1,14 +1,33 @@
+from startup import StartupTimer
+
+STARTUP_TIMER = StartupTimer()
+
 import sys
-import json
 import random
 import os
+import itertools
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QSlider, QGroupBox, QFrame, QRadioButton, QButtonGroup, QCheckBox,
-    QDialog, QDialogButtonBox, QScrollArea, QGridLayout, QMessageBox
+    QDialog, QDialogButtonBox, QScrollArea, QGridLayout, QMessageBox, QLineEdit, QComboBox, QInputDialog
 )
-from PyQt6.QtGui import QPixmap, QImage, QPainter, QColor, QFont, QIcon
-from PyQt6.QtCore import Qt, QSize, pyqtSignal, QRect
+from PyQt6.QtGui import QPixmap, QImage, QPainter, QPen, QColor, QFont, QIcon
+from PyQt6.QtCore import Qt, QSize, pyqtSignal, QRect, QTimer
+
+from config_cache import load_json_cached, validate_deck_list, atomic_write_json
+from file_watcher import ConfigWatcher, diff_decks
+from deck_pool import load_deck_pool
+from deck_search import DeckSearchIndex
+from lineup_store import LineupStore
+from speculation import SpeculativeAI
+from jobs import JobRunner
+from matchup import load_matchup_matrix, MatchupMatrix
+from subgame_cache import SubgameCache
+from strategies import STRATEGIES, StateBatch, create_strategy, enemy_view, positions_mask, mask_positions
+from pick_heatmap import PickHeatmap, uniform_strategy, heat_color
+from matchup_posterior import load_matchup_posterior, pairing_intervals
+
+STARTUP_TIMER.mark("导入模块")
 
 # --- 常量 ---
 ICON_WIDTH = 100
@@ -23,6 +42,16 @@ PLACEHOLDER_COLOR = "#a0a0a0"
 BG_COLOR = "#f0f0f0"
 FONT_NAME = "Microsoft YaHei UI"  # 使用与Tkinter版本一致的字体
 FONT_FALLBACK = "Arial"
+CONFIG_POLL_MS = 500  # 配置文件热更新检查间隔
+MATCHUP_FILE = "matchup_matrix.json"  # 可选的对战胜率矩阵, 缺失时胜率均按50%计
+DEFAULT_AI_STRATEGY = "random"
+
+ICON_CACHE = {}  # icon_path -> QPixmap
+
+
+def forget_icon(path):
+    """使某个图标路径的缓存失效"""
+    ICON_CACHE.pop(path, None)
 
 
 # --- DeckWidget (卡组组件) ---
@@ -42,9 +71,7 @@ class DeckWidget(QWidget):
         # 1. 底层图标
         self.icon_label = QLabel(self)
         self.icon_label.setGeometry(0, 0, size.width(), size.height())
-        pixmap = self.load_deck_icon(deck_info["icon_path"], size)
-        self.icon_label.setPixmap(pixmap.scaled(size, Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                                                Qt.TransformationMode.SmoothTransformation))
+        self.set_icon(deck_info["icon_path"])
         # self.icon_label.setScaledContents(True) # 移除：此行冗余且可能冲突
 
         # 2. 顶层名称
@@ -70,16 +97,37 @@ class DeckWidget(QWidget):
         self.ban_overlay.setGeometry(0, 0, size.width(), size.height())
         self.ban_overlay.hide()  # 默认隐藏
 
-        # 4. 边框 (通过 paintEvent 绘制)
+        # 4. Pick阶段热力图 (边际贡献)
+        self.heat_overlay = QLabel(self)
+        self.heat_overlay.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.heat_overlay.setFont(QFont(FONT_NAME, font_size, QFont.Weight.Bold))
+        self.heat_overlay.hide()
+
+        # 5. 边框 (通过 paintEvent 绘制)
         self.border_color = QColor(BG_COLOR)
         self.border_width = 1
 
+    def set_icon(self, path):
+        size = self.current_size
+        pixmap = self.load_deck_icon(path, size)
+        self.icon_label.setPixmap(pixmap.scaled(size, Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+                                                Qt.TransformationMode.SmoothTransformation))
+
+    def refresh(self):
+        """根据 self.deck_info 重新加载图标和名称 (配置热更新)"""
+        forget_icon(self.deck_info["icon_path"])
+        self.set_icon(self.deck_info["icon_path"])
+        self.name_label.setText(self.deck_info["name"])
+
     def load_deck_icon(self, path, size):
         if not os.path.exists(path):
             return self.create_placeholder(size)
-        pixmap = QPixmap(path)
-        if pixmap.isNull():
-            return self.create_placeholder(size)
+        pixmap = ICON_CACHE.get(path)
+        if pixmap is None:
+            pixmap = QPixmap(path)
+            if pixmap.isNull():
+                return self.create_placeholder(size)
+            ICON_CACHE[path] = pixmap
         return pixmap
 
     def create_placeholder(self, size):
@@ -110,6 +158,16 @@ class DeckWidget(QWidget):
 
         self.update()  # 触发 paintEvent
 
+    def set_heat(self, text, color):
+        self.heat_overlay.setText(text)
+        self.heat_overlay.setStyleSheet(f"color: white; background-color: {color}; padding: 2px 4px;")
+        self.heat_overlay.adjustSize()
+        self.heat_overlay.move((self.width() - self.heat_overlay.width()) // 2, 5)
+        self.heat_overlay.show()
+
+    def clear_heat(self):
+        self.heat_overlay.hide()
+
     def paintEvent(self, event):
         """覆盖 paintEvent 来绘制边框"""
         super().paintEvent(event)
@@ -131,7 +189,9 @@ class DeckWidget(QWidget):
 class DeckSelector(QDialog):
     """一个用于从卡组池中选择卡组的弹出对话框"""
 
-    def __init__(self, parent, title, deck_pool, min_select, max_select):
+    MAX_COLS = 5
+
+    def __init__(self, parent, title, deck_pool, min_select, max_select, search_index=None):
         super().__init__(parent)
         self.setWindowTitle(title)
         self.setMinimumSize(int(ICON_WIDTH * 5.5), int(ICON_HEIGHT * 2.5))
@@ -143,6 +203,9 @@ class DeckSelector(QDialog):
         self.selected_decks_info = []
         self.selected_widgets = []
         self.widgets_map = {}  # widget -> deck_info
+        self.widget_list = []  # 与 deck_pool 顺序一致, 用于搜索过滤
+        self.search_index = search_index or DeckSearchIndex(deck_pool)
+        self.visible_indices = list(range(len(deck_pool)))
 
         layout = QVBoxLayout(self)
 
@@ -151,17 +214,23 @@ class DeckSelector(QDialog):
         self.status_label.setFont(QFont(FONT_NAME, 10))
         layout.addWidget(self.status_label)
 
+        # 搜索框 (名称 / 拼音首字母), 过滤时只隐藏和重新排列组件
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索卡组 (名称 / 拼音首字母)")
+        self.search_edit.textChanged.connect(self.apply_filter)
+        layout.addWidget(self.search_edit)
+
         # 2. 滚动区域
         scroll_area = QScrollArea(self)
         scroll_area.setWidgetResizable(True)
         scroll_widget = QWidget()
-        scroll_layout = QGridLayout(scroll_widget)
+        self.scroll_layout = scroll_layout = QGridLayout(scroll_widget)
         scroll_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
         scroll_area.setWidget(scroll_widget)
         layout.addWidget(scroll_area)
 
         # 填充卡组
-        max_cols = 5
+        max_cols = self.MAX_COLS
         for i, deck_info in enumerate(self.deck_pool):
             row = i // max_cols
             col = i % max_cols
@@ -171,6 +240,7 @@ class DeckSelector(QDialog):
             scroll_layout.addWidget(widget, row, col)
 
             self.widgets_map[widget] = deck_info
+            self.widget_list.append(widget)
 
         # 3. 按钮
         self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -183,6 +253,21 @@ class DeckSelector(QDialog):
         self.button_box.rejected.connect(self.reject)
         layout.addWidget(self.button_box)
 
+    def apply_filter(self, text):
+        """按搜索框内容过滤卡组, 不重建组件"""
+        indices = self.search_index.search(text)
+        if indices == self.visible_indices:
+            return
+
+        for widget in self.widget_list:
+            self.scroll_layout.removeWidget(widget)
+            widget.hide()
+        for pos, i in enumerate(indices):
+            widget = self.widget_list[i]
+            self.scroll_layout.addWidget(widget, pos // self.MAX_COLS, pos % self.MAX_COLS)
+            widget.show()
+        self.visible_indices = indices
+
     def toggle_select(self, widget):
         if widget in self.selected_widgets:
             self.selected_widgets.remove(widget)
@@ -213,9 +298,9 @@ class DeckSelector(QDialog):
         super().accept()
 
     @staticmethod
-    def get_decks(parent, title, deck_pool, min_s, max_s):
+    def get_decks(parent, title, deck_pool, min_s, max_s, search_index=None):
         """静态方法，用于启动对话框并返回结果"""
-        dialog = DeckSelector(parent, title, deck_pool, min_s, max_s)
+        dialog = DeckSelector(parent, title, deck_pool, min_s, max_s, search_index)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             return dialog.selected_decks_info
         return None  # 用户取消
@@ -231,16 +316,32 @@ class DeckBPSimulator(QWidget):
         self.setStyleSheet(f"background-color: {BG_COLOR};")
 
         # 1. 加载配置
-        self.deck_pool = self.load_json("deck_pool.json", "卡组资源池")
+        self.deck_pool = self.load_pool("deck_pool.json")
         self.my_fixed_decks_info_from_file = self.load_json("my_decks.json", "我方卡组")
         if not self.deck_pool or not self.my_fixed_decks_info_from_file:
             sys.exit(1)
+        unknown = self.deck_pool.unknown_decks(self.my_fixed_decks_info_from_file)
+        if unknown:
+            print(f"警告: 以下我方卡组不在卡组资源池中: {'、'.join(unknown)}")
+        self.matchup = self.load_matchup()
+        self.ai_strategy = create_strategy(DEFAULT_AI_STRATEGY)
+        STARTUP_TIMER.mark("加载配置")
 
         # 2. 初始化状态变量
+        self.config_watcher = ConfigWatcher(["deck_pool.json", "my_decks.json", MATCHUP_FILE])
+        self.deck_search_index = DeckSearchIndex(self.deck_pool)
+        self.lineup_store = LineupStore()
+        self.config_timer = QTimer(self)
+        self.config_timer.timeout.connect(self.poll_config_changes)
         self.my_decks_data_current = []
         self.my_decks_changed = False
 
         self.game_state = "SETUP"
+        self.game_id = 0
+        self.jobs = JobRunner()
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.jobs.poll)
+        self.ai_speculator = SpeculativeAI(executor=self.jobs.thread_pool)
         self.my_decks_widgets = []
         self.opponent_decks_widgets = []
         self.opponent_decks_data = []
@@ -249,23 +350,68 @@ class DeckBPSimulator(QWidget):
         self.my_picked_widgets = []
         self.opponent_picked_widgets = []
         self.opponent_picked_decks_data = []
+        self.bp_solution = None
+        self.pick_heatmap = None
+        self.subgame_cache = SubgameCache()
 
-        # 3. 创建UI
+        # 3. 创建UI (卡组图标在窗口显示之后再加载)
         self.init_ui()
         self.connect_signals()
+        STARTUP_TIMER.mark("创建界面")
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """窗口显示后再加载卡组图标, 并输出启动耗时报告"""
+        STARTUP_TIMER.mark("首次绘制")
         self.reset_game()
+        self.restore_active_profile()
+        if self.deck_pool.diagnostics:
+            self.status_label.setText(f"卡组池检查: {self.deck_pool.diagnostics.summary()} (详见控制台)")
+            self.status_label.setStyleSheet("color: #E67E22;")
+        STARTUP_TIMER.finish("加载卡组图标")
+        self.config_timer.start(CONFIG_POLL_MS)
+        self.job_timer.start(30)
+
+    def closeEvent(self, event):
+        """关闭窗口前停止后台任务和文件监视"""
+        self.ai_speculator.cancel_all()
+        self.jobs.shutdown()
+        self.config_watcher.stop()
+        super().closeEvent(event)
+
+    def load_pool(self, filepath):
+        """读取并校验卡组资源池, 问题清单输出到控制台"""
+        try:
+            pool = load_deck_pool(filepath)
+        except FileNotFoundError:
+            self.show_error_message(f"错误: 未找到配置文件 '{filepath}'。")
+            return None
+        except ValueError:
+            self.show_error_message(f"错误: 配置文件 '{filepath}' 格式错误。")
+            return None
+
+        if pool.diagnostics:
+            print(pool.diagnostics.report(pool))
+        return pool
 
     def load_json(self, filepath, name):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_json_cached(filepath, validate_deck_list)
         except FileNotFoundError:
             self.show_error_message(f"错误: 未找到配置文件 '{filepath}'。")
             return None
-        except json.JSONDecodeError:
+        except ValueError:
             self.show_error_message(f"错误: 配置文件 '{filepath}' 格式错误。")
             return None
 
+    def load_matchup(self):
+        """读取对战胜率矩阵; 文件有误时退回全 50% 矩阵"""
+        try:
+            return load_matchup_matrix(MATCHUP_FILE)
+        except ValueError as e:
+            print(f"警告: 对战矩阵 {MATCHUP_FILE} 无效, 胜率均按50%计: {e}")
+            return MatchupMatrix.uniform([])
+
     def show_error_message(self, message):
         QMessageBox.critical(self, "错误", message)
 
@@ -297,6 +443,12 @@ class DeckBPSimulator(QWidget):
         self.count_slider_label = QLabel(f"{self.count_slider.value()}")
         opp_layout.addWidget(self.count_slider)
         opp_layout.addWidget(self.count_slider_label)
+
+        self.ai_strategy_combo = QComboBox()
+        self.ai_strategy_combo.addItems(list(STRATEGIES))
+        self.ai_strategy_combo.setCurrentText(DEFAULT_AI_STRATEGY)
+        opp_layout.addWidget(QLabel("AI:"))
+        opp_layout.addWidget(self.ai_strategy_combo)
         opp_group.setLayout(opp_layout)
         control_layout.addWidget(opp_group)
 
@@ -315,6 +467,15 @@ class DeckBPSimulator(QWidget):
         self.save_my_decks_button = QPushButton("保存卡组")
         self.save_my_decks_button.setEnabled(False)
         my_layout.addWidget(self.save_my_decks_button)
+
+        # 阵容方案 (多套命名阵容)
+        self.profile_combo = QComboBox()
+        self.profile_combo.setPlaceholderText("阵容方案")
+        self.profile_combo.addItems(self.lineup_store.names())
+        self.profile_combo.setCurrentIndex(-1)
+        my_layout.addWidget(self.profile_combo)
+        self.save_profile_button = QPushButton("另存为方案")
+        my_layout.addWidget(self.save_profile_button)
         my_group.setLayout(my_layout)
         control_layout.addWidget(my_group)
 
@@ -339,6 +500,12 @@ class DeckBPSimulator(QWidget):
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.main_layout.addWidget(self.status_label)
 
+        # 后台任务进度
+        self.job_label = QLabel("")
+        self.job_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.job_label.setStyleSheet("color: gray;")
+        self.main_layout.addWidget(self.job_label)
+
         # 对方卡组
         self.opponent_frame = QGroupBox("对方卡组 (待生成)")
         self.opponent_frame.setFont(QFont(FONT_NAME, 12, QFont.Weight.Bold))
@@ -348,6 +515,10 @@ class DeckBPSimulator(QWidget):
         self.opponent_decks_container = QHBoxLayout()
         self.opponent_decks_container.setAlignment(Qt.AlignmentFlag.AlignLeft)
         opp_frame_layout.addLayout(self.opponent_decks_container)
+        # Ban参考: Ban掉每套对方卡组后的预期系列赛胜率
+        self.ban_advice_layout = QHBoxLayout()
+        self.ban_advice_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        opp_frame_layout.addLayout(self.ban_advice_layout)
         self.opponent_frame.setLayout(opp_frame_layout)
         self.main_layout.addWidget(self.opponent_frame, 1)
 
@@ -384,10 +555,14 @@ class DeckBPSimulator(QWidget):
     def connect_signals(self):
         """连接所有UI信号"""
         self.count_slider.valueChanged.connect(lambda v: self.count_slider_label.setText(str(v)))
+        self.ai_strategy_combo.currentTextChanged.connect(lambda name: setattr(self, "ai_strategy",
+                                                                               create_strategy(name)))
         self.opponent_radio_group.buttonClicked.connect(self.toggle_opponent_mode)
         self.my_radio_group.buttonClicked.connect(self.toggle_my_deck_mode)
 
         self.save_my_decks_button.clicked.connect(self.save_my_decks)
+        self.profile_combo.activated.connect(self.switch_lineup_profile)
+        self.save_profile_button.clicked.connect(self.save_lineup_profile)
         self.generate_button.clicked.connect(self.start_game_flow)
         self.undo_button.clicked.connect(self.process_undo)
         self.reset_button.clicked.connect(self.reset_game)
@@ -398,8 +573,6 @@ class DeckBPSimulator(QWidget):
             child = layout.takeAt(0)
             if child.widget():
                 child.widget().deleteLater()
-        self.my_decks_widgets = []
-        self.opponent_decks_widgets = []
 
     # --- UI 模式切换 ---
     def toggle_opponent_mode(self):
@@ -416,11 +589,12 @@ class DeckBPSimulator(QWidget):
             self.my_decks_data_current = list(self.my_fixed_decks_info_from_file)
             self.my_decks_changed = False
             self.save_my_decks_button.setEnabled(False)
+            self.profile_combo.setCurrentIndex(-1)
             self.reload_my_decks_ui()
             self.status_label.setText("我方卡组已重置为 [默认]")
         else:  # custom
             selected = DeckSelector.get_decks(
-                self, "请选择6套 [我方] 卡组", self.deck_pool, 6, 6
+                self, "请选择6套 [我方] 卡组", self.deck_pool, 6, 6, self.deck_search_index
             )
             if selected:
                 self.my_decks_data_current = selected
@@ -434,8 +608,7 @@ class DeckBPSimulator(QWidget):
     def save_my_decks(self):
         if not self.my_decks_changed: return
         try:
-            with open("my_decks.json", 'w', encoding='utf-8') as f:
-                json.dump(self.my_decks_data_current, f, indent=4, ensure_ascii=False)
+            atomic_write_json("my_decks.json", self.my_decks_data_current)
 
             self.my_fixed_decks_info_from_file = list(self.my_decks_data_current)
             self.my_decks_changed = False
@@ -445,6 +618,210 @@ class DeckBPSimulator(QWidget):
         except Exception as e:
             self.show_error_message(f"保存失败: {e}")
 
+    # --- 阵容方案 ---
+    def restore_active_profile(self):
+        """启动时恢复上次使用的阵容方案"""
+        index = self.profile_combo.findText(self.lineup_store.active or "")
+        if self.lineup_store.active in self.lineup_store and index >= 0:
+            self.profile_combo.setCurrentIndex(index)
+            self.switch_lineup_profile(index)
+
+    def switch_lineup_profile(self, index):
+        """切换到选中的阵容方案"""
+        name = self.profile_combo.itemText(index)
+        if not name:
+            return
+        try:
+            decks = self.lineup_store.switch(name)
+        except (OSError, ValueError, KeyError) as e:
+            self.show_error_message(f"读取方案失败: {e}")
+            return
+
+        self.my_decks_data_current = decks
+        self.my_radio_custom.setChecked(True)
+        self.my_decks_changed = True  # 可通过"保存卡组"设为默认阵容
+        self.save_my_decks_button.setEnabled(True)
+        self.reload_my_decks_ui()
+        self.status_label.setText(f"我方卡组已切换为方案 [{name}]")
+        self.status_label.setStyleSheet("color: black;")
+
+    def save_lineup_profile(self):
+        """将当前我方卡组另存为命名方案"""
+        name, ok = QInputDialog.getText(self, "另存为方案", "方案名称 (如 选手-赛事):",
+                                        text=self.profile_combo.currentText())
+        if not ok or not name.strip():
+            return
+        name = name.strip()
+        try:
+            self.lineup_store.save(name, self.my_decks_data_current)
+        except (OSError, ValueError) as e:
+            self.show_error_message(f"保存方案失败: {e}")
+            return
+
+        self.profile_combo.clear()
+        self.profile_combo.addItems(self.lineup_store.names())
+        self.profile_combo.setCurrentText(name)
+        self.status_label.setText(f"成功保存方案 [{name}]")
+        self.status_label.setStyleSheet("color: green;")
+
+    # --- 后台任务 ---
+    def run_job(self, fn, *args, key=None, on_done=None, message="后台计算中"):
+        """在后台运行 fn(job, *args), 进度显示在状态栏下方, 完成后在GUI线程回调 on_done"""
+        def done(result):
+            self.clear_job_progress()
+            if on_done:
+                on_done(result)
+
+        def error(exc):
+            self.clear_job_progress()
+            self.show_error_message(f"{message}失败: {exc}")
+
+        def progress(done_count, total, note):
+            self.job_label.setText(f"{message}... {done_count}/{total} {note}")
+
+        self.job_label.setText(f"{message}...")
+        return self.jobs.submit(fn, *args, key=key, on_done=done, on_progress=progress, on_error=error)
+
+    def clear_job_progress(self):
+        self.job_label.setText("")
+
+    # --- Ban参考 ---
+    def lineup_names(self):
+        return ([w.deck_info["name"] for w in self.my_decks_widgets],
+                [w.deck_info["name"] for w in self.opponent_decks_widgets])
+
+    def lineup_local_matrix(self):
+        """当前双方阵容之间的单局胜率子矩阵 (行为我方)"""
+        return self.matchup.local(*self.lineup_names())
+
+    def start_ban_analysis(self):
+        """对方阵容生成后, 一次求解所有Ban选择的预期胜率 (同一阵容与矩阵版本的结果取自磁盘缓存)"""
+        self.bp_solution = None
+        if len(self.my_decks_widgets) < 4 or len(self.opponent_decks_widgets) < 4:
+            return
+        my_names, opp_names = self.lineup_names()
+        self.run_job(lambda job, matrix: self.subgame_cache.solve_bp(matrix, my_names, opp_names), self.matchup,
+                     key="ban_advice", on_done=self.show_ban_advice, message="计算Ban参考")
+
+    def clear_ban_advice(self):
+        self.bp_solution = None
+        self.pick_heatmap = None
+        while self.ban_advice_layout.count():
+            self.ban_advice_layout.takeAt(0).widget().deleteLater()
+
+    def show_ban_advice(self, solution):
+        self.clear_ban_advice()
+        self.bp_solution = solution
+        title = QLabel("Ban后预期胜率:")
+        title.setFont(QFont(FONT_NAME, 10))
+        self.ban_advice_layout.addWidget(title)
+        for pos, widget in enumerate(self.opponent_decks_widgets):
+            best = pos == solution.best_ban
+            label = QLabel(f"{widget.deck_info['name']} {solution.ban_values[pos]:.1%}")
+            label.setFont(QFont(FONT_NAME, 10, QFont.Weight.Bold if best else QFont.Weight.Normal))
+            label.setStyleSheet("color: #27AE60;" if best else "color: black;")
+            self.ban_advice_layout.addWidget(label)
+        if self.matchup.is_default:
+            note = QLabel("(未加载对战数据, 胜率均按50%计)")
+            note.setStyleSheet(f"color: {PLACEHOLDER_COLOR};")
+            self.ban_advice_layout.addWidget(note)
+        if self.game_state == "PICK":
+            self.start_pick_heatmap()  # 用均衡策略替换均匀分布的预测
+
+    # --- Pick阶段热力图 ---
+    def start_pick_heatmap(self):
+        """按当前双方Ban和预测的对方出战分布, 计算我方各出战组合的期望胜率"""
+        opp_ban = self.opponent_decks_widgets.index(self.opponent_banned_widget)
+        my_ban = self.my_decks_widgets.index(self.my_banned_widget) if self.my_banned_widget else None
+        my_available = [i for i in range(len(self.my_decks_widgets)) if i != my_ban]
+        opp_available = [i for i in range(len(self.opponent_decks_widgets)) if i != opp_ban]
+
+        strategies = self.bp_solution.pick_strategies if self.bp_solution else {}
+        if (opp_ban, my_ban) in strategies:
+            opp_strategy = strategies[(opp_ban, my_ban)][1]
+        else:
+            opp_strategy = uniform_strategy(opp_available)
+        self.pick_heatmap = PickHeatmap(self.lineup_local_matrix(), my_available, opp_strategy)
+        self.update_pick_heatmap()
+
+    def update_pick_heatmap(self):
+        """在我方未选卡组上显示边际贡献; 离开Pick阶段时隐藏"""
+        contributions = {}
+        if self.game_state == "PICK" and self.pick_heatmap is not None:
+            picked = [self.my_decks_widgets.index(w) for w in self.my_picked_widgets]
+            contributions = self.pick_heatmap.contributions(picked)
+
+        for pos, widget in enumerate(self.my_decks_widgets):
+            if pos in contributions:
+                _, delta = contributions[pos]
+                widget.set_heat(f"{delta:+.1%}", heat_color(delta))
+            else:
+                widget.clear_heat()
+
+    # --- 配置热更新 ---
+    def poll_config_changes(self):
+        """定时取出配置文件变化, 在GUI线程中处理"""
+        for path in self.config_watcher.poll():
+            self.on_config_file_changed(path)
+
+    def on_config_file_changed(self, path):
+        """重新读取变化的配置, 只更新受影响的卡组组件"""
+        filename = os.path.basename(path)
+        if filename == "deck_pool.json":
+            new_pool = self.load_pool("deck_pool.json")
+            if not new_pool:
+                return
+            diff = diff_decks(self.deck_pool, new_pool)
+            reordered = [d["name"] for d in self.deck_pool or ()] != [d["name"] for d in new_pool]
+            self.deck_pool = new_pool
+            if diff or reordered:
+                # 搜索索引按位置记录卡组, 仅调整顺序时 diff 为空, 也需要重建
+                self.deck_search_index = DeckSearchIndex(self.deck_pool)
+            if diff:
+                self.patch_deck_widgets(diff.changed)
+                self.status_label.setText(f"卡组资源池已更新 ({diff.summary()})")
+                self.status_label.setStyleSheet("color: green;")
+
+        elif filename == "my_decks.json":
+            new_decks = self.load_json("my_decks.json", "我方卡组")
+            if not new_decks:
+                return
+            old_decks = self.my_fixed_decks_info_from_file
+            self.my_fixed_decks_info_from_file = new_decks
+            if new_decks == old_decks:
+                return
+            if self.game_state == "SETUP" and self.my_radio_file.isChecked():
+                self.patch_my_decks(old_decks, new_decks)
+            self.status_label.setText("[我方卡组] 配置已更新")
+            self.status_label.setStyleSheet("color: green;")
+
+        elif filename == MATCHUP_FILE:
+            self.matchup = self.load_matchup()
+            if self.opponent_decks_widgets and self.game_state != "SETUP":
+                self.start_ban_analysis()
+            self.status_label.setText("[对战矩阵] 已更新")
+            self.status_label.setStyleSheet("color: green;")
+
+    def patch_deck_widgets(self, changed):
+        """按卡组名称更新界面上已显示的卡组 (changed: name -> 新 deck_info)"""
+        for widget in self.my_decks_widgets + self.opponent_decks_widgets:
+            new_info = changed.get(widget.deck_info["name"])
+            if new_info is not None:
+                widget.deck_info = dict(new_info)  # 换成新字典: 旧字典与资源池、我方卡组列表共享
+                widget.refresh()
+
+    def patch_my_decks(self, old_decks, new_decks):
+        """按位置比较, 只重建变化了的我方卡组组件"""
+        self.my_decks_data_current = list(new_decks)
+        if len(old_decks) != len(new_decks) or len(self.my_decks_widgets) != len(new_decks):
+            self.reload_my_decks_ui()
+            return
+
+        for widget, old, new in zip(self.my_decks_widgets, old_decks, new_decks):
+            if old != new:
+                widget.deck_info = new
+                widget.refresh()
+
     # --- 游戏流程 ---
 
     def reload_my_decks_ui(self):
@@ -463,6 +840,9 @@ class DeckBPSimulator(QWidget):
     def reset_game(self):
         """重置整个游戏状态和UI"""
         self.game_state = "SETUP"
+        self.ai_speculator.cancel_all()
+        self.jobs.cancel_all()
+        self.clear_job_progress()
         self.status_label.setText("请设置卡组，然后点击'生成对局'")
         self.status_label.setStyleSheet("color: black;")
 
@@ -478,6 +858,7 @@ class DeckBPSimulator(QWidget):
         while self.opponent_decks_container.count():
             self.opponent_decks_container.takeAt(0).widget().deleteLater()
         self.opponent_decks_widgets = []
+        self.clear_ban_advice()
 
         self.clear_layout(self.matchup_list_layout)  # 只清除对战列表
 
@@ -494,6 +875,7 @@ class DeckBPSimulator(QWidget):
         self.set_controls_locked(False)
         self.undo_button.setEnabled(False)
         self.save_my_decks_button.setEnabled(False)
+        self.profile_combo.setCurrentIndex(-1)
 
     def set_controls_locked(self, locked):
         """锁定/解锁顶部的控制"""
@@ -507,6 +889,9 @@ class DeckBPSimulator(QWidget):
 
         self.generate_button.setEnabled(not locked)
         self.save_my_decks_button.setEnabled(not locked and self.my_decks_changed)
+        self.profile_combo.setEnabled(not locked)
+        self.save_profile_button.setEnabled(not locked)
+        self.ai_strategy_combo.setEnabled(not locked)
         self.undo_button.setEnabled(False)  # 撤回只在特定阶段启用
 
         self.custom_opponent_ban_check.setEnabled(not locked)
@@ -517,15 +902,21 @@ class DeckBPSimulator(QWidget):
         self.set_controls_locked(True)
 
         self.game_state = "BAN"
+        self.game_id += 1
+        self.ai_speculator.cancel_all()
+        self.jobs.cancel_all()
+        self.clear_job_progress()
         while self.opponent_decks_container.count():
             self.opponent_decks_container.takeAt(0).widget().deleteLater()
         self.opponent_decks_widgets = []
+        self.clear_ban_advice()
 
         self.clear_layout(self.matchup_list_layout)
         self.generate_matchup_button.hide()
 
         for widget in self.my_decks_widgets:
             widget.set_visual_state("normal")
+            widget.clear_heat()
             try:
                 widget.clicked.disconnect()
             except TypeError:
@@ -547,7 +938,7 @@ class DeckBPSimulator(QWidget):
             self.opponent_decks_data = random.sample(self.deck_pool, count)
         else:  # custom
             selected = DeckSelector.get_decks(
-                self, "请选择 4 到 6 套 [对方] 卡组", self.deck_pool, 4, 6
+                self, "请选择 4 到 6 套 [对方] 卡组", self.deck_pool, 4, 6, self.deck_search_index
             )
             if not selected:  # 用户取消
                 self.reset_game();
@@ -565,6 +956,8 @@ class DeckBPSimulator(QWidget):
 
         self.status_label.setText("[Ban阶段] 请点击一套 [对方卡组] 进行Ban (1/1)")
         self.status_label.setStyleSheet("color: blue;")
+        self.speculate_ai_ban()
+        self.start_ban_analysis()
 
     def handle_deck_click(self, widget, target_team):
         """处理卡组点击事件 (Ban 和 Pick)"""
@@ -622,6 +1015,8 @@ class DeckBPSimulator(QWidget):
                             pass
                     self.process_ai_pick()
 
+                self.update_pick_heatmap()
+
         elif self.game_state == "CUSTOM_OPPONENT_PICK":
             if target_team == "opponent":
                 if widget in self.opponent_picked_widgets:
@@ -657,6 +1052,44 @@ class DeckBPSimulator(QWidget):
             if w != self.my_banned_widget:
                 w.clicked.connect(lambda w=w: self.handle_deck_click(w, "my"))
 
+        self.speculate_ai_pick()
+        self.start_pick_heatmap()
+
+    # --- AI 预计算 (玩家思考时在后台计算AI的应对) ---
+
+    def ai_ban_key(self):
+        """AI Ban 的状态键: (对局, 我方Ban掉的对方卡组位置)"""
+        return ("ban", self.game_id, self.opponent_decks_widgets.index(self.opponent_banned_widget))
+
+    def ai_pick_key(self, my_pick_positions):
+        """AI Pick 的状态键: (对局, 双方Ban, 我方出战卡组位置)"""
+        opp_ban = self.opponent_decks_widgets.index(self.opponent_banned_widget)
+        my_ban = self.my_decks_widgets.index(self.my_banned_widget) if self.my_banned_widget else None
+        return ("pick", self.game_id, opp_ban, my_ban, tuple(sorted(my_pick_positions)))
+
+    def speculate_ai_ban(self):
+        """为玩家每一种可能的Ban预先计算AI的Ban"""
+        if self.custom_opponent_ban_check.isChecked():
+            return
+        my_positions = list(range(len(self.my_decks_widgets)))
+        opp_positions = list(range(len(self.opponent_decks_widgets)))
+        ai_local = enemy_view(self.lineup_local_matrix())
+        for pos in opp_positions:
+            own_available = [i for i in opp_positions if i != pos]
+            self.ai_speculator.speculate(("ban", self.game_id, pos), self.ai_logic_ban, my_positions, own_available,
+                                         ai_local)
+
+    def speculate_ai_pick(self):
+        """为玩家每一种可能的出战组合预先计算AI的Pick"""
+        if self.custom_opponent_pick_check.isChecked() or self.opponent_banned_widget is None:
+            return
+        my_available = [i for i, w in enumerate(self.my_decks_widgets) if w != self.my_banned_widget]
+        opp_available = [i for i, w in enumerate(self.opponent_decks_widgets) if w != self.opponent_banned_widget]
+        ai_local = enemy_view(self.lineup_local_matrix())
+        for picks in itertools.combinations(my_available, 3):
+            self.ai_speculator.speculate(self.ai_pick_key(picks), self.ai_logic_pick, opp_available, 3, my_available,
+                                         ai_local)
+
     # --- AI 逻辑 (入口) ---
 
     def process_ai_ban(self):
@@ -668,8 +1101,12 @@ class DeckBPSimulator(QWidget):
             for w in self.my_decks_widgets:
                 w.clicked.connect(lambda w=w: self.handle_deck_click(w, "my"))
         else:
-            available_to_ban = [w for w in self.my_decks_widgets]
-            self.my_banned_widget = self.ai_logic_ban(available_to_ban)
+            available_to_ban = list(range(len(self.my_decks_widgets)))
+            opp_ban = self.opponent_decks_widgets.index(self.opponent_banned_widget)
+            own_available = [i for i in range(len(self.opponent_decks_widgets)) if i != opp_ban]
+            ban_pos = self.ai_speculator.result(self.ai_ban_key(), self.ai_logic_ban, available_to_ban, own_available,
+                                                enemy_view(self.lineup_local_matrix()))
+            self.my_banned_widget = self.my_decks_widgets[ban_pos] if ban_pos is not None else None
             if self.my_banned_widget:
                 self.my_banned_widget.set_visual_state("banned")
             self.start_player_pick_phase()
@@ -686,8 +1123,14 @@ class DeckBPSimulator(QWidget):
                 if w != self.opponent_banned_widget:
                     w.clicked.connect(lambda w=w: self.handle_deck_click(w, "opponent"))
         else:
-            available_to_pick = [w for w in self.opponent_decks_widgets if w != self.opponent_banned_widget]
-            picked_widgets = self.ai_logic_pick(available_to_pick, 3)
+            available_to_pick = [i for i, w in enumerate(self.opponent_decks_widgets)
+                                 if w != self.opponent_banned_widget]
+            my_pick_positions = [self.my_decks_widgets.index(w) for w in self.my_picked_widgets]
+            my_available = [i for i, w in enumerate(self.my_decks_widgets) if w != self.my_banned_widget]
+            picked_positions = self.ai_speculator.result(self.ai_pick_key(my_pick_positions),
+                                                         self.ai_logic_pick, available_to_pick, 3, my_available,
+                                                         enemy_view(self.lineup_local_matrix()))
+            picked_widgets = [self.opponent_decks_widgets[i] for i in picked_positions]
 
             self.opponent_picked_decks_data = []
             for widget in picked_widgets:
@@ -708,7 +1151,14 @@ class DeckBPSimulator(QWidget):
         if self.game_state != "PICK" and self.game_state != "CUSTOM_OPPONENT_PICK":
             return
 
+        # 撤回后基于旧状态的后台分析已过期 (Ban参考只取决于双方阵容, 保留)
+        self.jobs.cancel_all(keep=("ban_advice",))
+        self.clear_job_progress()
+
         self.game_state = "BAN"
+        self.ai_speculator.retain(lambda key: key[0] == "ban")  # Pick阶段的预计算已过期
+        self.pick_heatmap = None
+        self.update_pick_heatmap()
         self.status_label.setText("[Ban阶段] (已撤回) 请点击一套 [对方卡组] 进行Ban (1/1)")
         self.status_label.setStyleSheet("color: blue;")
         self.undo_button.setEnabled(False)
@@ -736,6 +1186,17 @@ class DeckBPSimulator(QWidget):
         self.clear_layout(self.matchup_list_layout)
         self.generate_matchup_button.show()
 
+    def matchup_intervals(self, my_names, opp_names):
+        """最终对战按对战矩阵后验抽样得到的胜率区间; 没有对战矩阵文件时返回 None"""
+        try:
+            posterior = load_matchup_posterior(MATCHUP_FILE)
+        except ValueError as e:
+            print(f"警告: 对战矩阵 {MATCHUP_FILE} 无效, 不显示胜率区间: {e}")
+            return None
+        if posterior is None:
+            return None
+        return pairing_intervals(posterior, my_names, opp_names)
+
     def display_random_matchups(self):
         """显示最终的1v1随机匹配"""
         self.clear_layout(self.matchup_list_layout)
@@ -752,6 +1213,7 @@ class DeckBPSimulator(QWidget):
         random.shuffle(opp_final_picks)
 
         self.matchup_frame.setTitle("最终对战 (1v1 随机匹配)")
+        intervals = self.matchup_intervals([d['name'] for d in my_final_picks], [d['name'] for d in opp_final_picks])
 
         for i in range(3):
             my_deck = my_final_picks[i]
@@ -785,6 +1247,11 @@ class DeckBPSimulator(QWidget):
             row_layout.addLayout(my_team_layout, 0, 0, Qt.AlignmentFlag.AlignRight)
             row_layout.addWidget(vs_label, 0, 1, Qt.AlignmentFlag.AlignCenter)
             row_layout.addLayout(opp_team_layout, 0, 2, Qt.AlignmentFlag.AlignLeft)
+            if intervals:
+                game = intervals[0][i]
+                interval_label = QLabel(f"{game.mean:.0%} [{game.lower:.0%}–{game.upper:.0%}]")
+                interval_label.setStyleSheet("color: #404040;")
+                row_layout.addWidget(interval_label, 1, 1, Qt.AlignmentFlag.AlignCenter)
 
             row_layout.setColumnStretch(0, 3)
             row_layout.setColumnStretch(1, 1)
@@ -792,16 +1259,25 @@ class DeckBPSimulator(QWidget):
 
             self.matchup_list_layout.addWidget(match_row)
 
+        if intervals:
+            series_label = QLabel(f"系列赛胜率 {intervals[1]}")
+            series_label.setFont(QFont(FONT_NAME, 12, QFont.Weight.Bold))
+            self.matchup_list_layout.addWidget(series_label, alignment=Qt.AlignmentFlag.AlignCenter)
+
     # --- 可替换的 AI 逻辑 ---
+    # 参数为可选卡组的位置序号与 AI 视角的胜率子矩阵, 返回选中的位置序号; 会在后台线程中被预先调用, 不要操作界面组件。
+    # 具体决策由 strategies 中注册的策略完成 (界面按大小为 1 的批次调用)。
 
-    def ai_logic_ban(self, available_decks):
+    def ai_logic_ban(self, available_decks, own_available, ai_local):
         if not available_decks: return None
-        return random.choice(available_decks)
+        batch = StateBatch([ai_local], [positions_mask(own_available)], [positions_mask(available_decks)])
+        return self.ai_strategy.ban(random, batch)[0]
 
-    def ai_logic_pick(self, available_decks, num_to_pick):
+    def ai_logic_pick(self, available_decks, num_to_pick, enemy_available, ai_local):
         if len(available_decks) < num_to_pick:
             return available_decks
-        return random.sample(available_decks, num_to_pick)
+        batch = StateBatch([ai_local], [positions_mask(available_decks)], [positions_mask(enemy_available)])
+        return mask_positions(self.ai_strategy.pick(random, batch)[0])
 
 
 # --- 运行 ---
@@ -0,0 +1,113 @@
+import hashlib
+import struct
+
+from config_cache import load_json_cached
+
+# --- 对战胜率矩阵 ---
+# value(i, j) 为卡组 i 对卡组 j 的单局胜率, 行列按卡组名称索引。
+# 文件格式 (matchup_matrix.json): {"decks": [名称...], "winrates": [[...], ...]}
+
+DEFAULT_WINRATE = 0.5
+
+
+def validate_matrix(data):
+    """校验矩阵 JSON, 返回 (names, 扁平胜率列表)"""
+    if not isinstance(data, dict) or not isinstance(data.get("decks"), list) \
+            or not isinstance(data.get("winrates"), list):
+        raise ValueError("对战矩阵应包含 decks 与 winrates")
+    names = data["decks"]
+    rows = data["winrates"]
+    n = len(names)
+    if len(rows) != n or any(not isinstance(row, list) or len(row) != n for row in rows):
+        raise ValueError("winrates 应为 N×N 矩阵")
+    flat = []
+    for row in rows:
+        for value in row:
+            value = DEFAULT_WINRATE if value is None else float(value)
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"胜率 {value} 超出 [0, 1]")
+            flat.append(value)
+    return names, flat
+
+
+class MatchupMatrix:
+    """N×N 单局胜率矩阵 (数据按行扁平存放)"""
+
+    def __init__(self, names, data, version=None, is_default=False):
+        self.names = list(names)
+        self.n = len(self.names)
+        self.data = data
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.is_default = is_default
+        self.version = version or self._content_hash()
+
+    def _content_hash(self):
+        h = hashlib.sha1()
+        h.update("\0".join(self.names).encode("utf-8"))
+        h.update(struct.pack(f"{len(self.data)}d", *self.data))
+        return h.hexdigest()[:16]
+
+    @classmethod
+    def uniform(cls, names):
+        """没有对战数据时使用: 所有对局胜率均为 50%"""
+        n = len(names)
+        return cls(names, [DEFAULT_WINRATE] * (n * n), version=f"uniform-{n}", is_default=True)
+
+    def value(self, i, j):
+        return self.data[i * self.n + j]
+
+    def row(self, i):
+        return self.data[i * self.n:(i + 1) * self.n]
+
+    def winrate(self, name_a, name_b):
+        """按名称取胜率, 未知卡组按 50% 计"""
+        i = self.index.get(name_a)
+        j = self.index.get(name_b)
+        if i is None or j is None:
+            return DEFAULT_WINRATE
+        return self.data[i * self.n + j]
+
+    def local(self, my_names, opp_names):
+        """取出两套阵容之间的子矩阵 (二维列表, 行为我方); 列序号只查一次, 每行按偏移直接取值"""
+        data, n, index = self.data, self.n, self.index
+        cols = [index.get(b) for b in opp_names]
+        result = []
+        for a in my_names:
+            i = index.get(a)
+            if i is None:
+                result.append([DEFAULT_WINRATE] * len(cols))
+            else:
+                base = i * n
+                result.append([data[base + j] if j is not None else DEFAULT_WINRATE for j in cols])
+        return result
+
+    def indices(self, names):
+        """名称 -> 矩阵序号 (未知卡组为 None)"""
+        return [self.index.get(name) for name in names]
+
+
+def load_matchup_matrix(filepath, deck_names=None):
+    """
+    读取对战矩阵: .json, matrix_store 的 .bpm 二进制文件, 或快照库 ("目录" 为当前快照, "目录@日期" 为指定快照)。
+    文件不存在时依次退回 matchup_store/ 的当前快照与全 50% 矩阵。
+    给出 deck_names 时, 矩阵按该顺序重新排列 (缺失的对局按 50% 计)。
+    """
+    # matrix_store 依赖本模块, 延迟导入
+    from matrix_store import DEFAULT_ROOT, open_matrix_file, open_snapshot
+    try:
+        matrix = open_snapshot(filepath)
+        if matrix is None and filepath.endswith(".bpm"):
+            matrix = open_matrix_file(filepath)
+        elif matrix is None:
+            names, flat = load_json_cached(filepath, validate_matrix, tag="matrix")
+            matrix = MatchupMatrix(names, flat)
+    except FileNotFoundError:
+        matrix = open_snapshot(DEFAULT_ROOT)
+        if matrix is None:
+            return MatchupMatrix.uniform(deck_names or [])
+
+    if deck_names is None or list(deck_names) == matrix.names:
+        return matrix
+
+    aligned = [matrix.winrate(a, b) for a in deck_names for b in deck_names]
+    return MatchupMatrix(deck_names, aligned)
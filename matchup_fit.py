@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import math
+import sys
+
+from config_cache import atomic_write_json, write_snapshot
+from deck_pool import load_deck_pool
+from matchup import DEFAULT_WINRATE, MatchupMatrix, validate_matrix
+
+# --- 由对局记录拟合对战胜率矩阵 ---
+# 对局记录逐行为 (卡组A, 卡组B, 胜者)。按卡组对累计胜场后:
+#   1. 用 Bradley–Terry 模型 (MM 算法) 拟合每套卡组的整体强度, 作为各对局的先验胜率 p0 = s_a / (s_a + s_b);
+#   2. 每个对局的胜率取 Beta 后验均值 (w + k·p0) / (n + k), k 为先验等效局数 (prior_games)。
+# 样本少的对局向整体强度收缩, 样本多的对局以实际胜率为准; 没有记录的对局直接取先验。
+# 计数可以保存下来, 新记录到达时累加计数并以上次的强度为初值继续迭代 (增量更新)。
+# 输出为 matchup_matrix.json (附带每格局数与 prior_games, 供后验抽样), 同时写入二进制快照, 模拟器可直接读取。
+
+DEFAULT_PRIOR_GAMES = 20.0
+COUNTS_FILE = "matchup_counts.json"
+
+
+class MatchupCounts:
+    """按卡组对累计的胜场: (A, B) (A < B) -> [A 胜场, 总局数]; 同名对局 (镜像) 不计入"""
+
+    def __init__(self):
+        self.pairs = {}
+
+    def add(self, deck_a, deck_b, a_won, games=1):
+        if deck_a == deck_b:
+            return
+        if deck_a < deck_b:
+            key, wins = (deck_a, deck_b), a_won
+        else:
+            key, wins = (deck_b, deck_a), games - a_won
+        row = self.pairs.get(key)
+        if row is None:
+            row = self.pairs[key] = [0, 0]
+        row[0] += wins
+        row[1] += games
+
+    def merge(self, other):
+        for (a, b), (wins, games) in other.pairs.items():
+            self.add(a, b, wins, games)
+        return self
+
+    def names(self):
+        seen = set()
+        for a, b in self.pairs:
+            seen.add(a)
+            seen.add(b)
+        return sorted(seen)
+
+    @property
+    def total_games(self):
+        return sum(games for _, games in self.pairs.values())
+
+    def to_dict(self):
+        return {"pairs": [[a, b, wins, games] for (a, b), (wins, games) in self.pairs.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        counts = cls()
+        for a, b, wins, games in data["pairs"]:
+            counts.add(a, b, wins, games)
+        return counts
+
+
+def fit_strengths(names, counts, initial=None, iterations=500, tol=1e-9):
+    """
+    Bradley–Terry 强度 (MM 算法, 几何平均归一化为 1)。每轮只遍历一次有记录的卡组对。
+    每套卡组另与强度为 1 的虚拟对手记 1 局平局, 避免全胜/全负的卡组强度发散。
+    initial 为上次的强度 (增量更新时作为初值, 收敛很快)。
+    """
+    index = {n: i for i, n in enumerate(names)}
+    pairs = [(index[a], index[b], wins, games) for (a, b), (wins, games) in counts.pairs.items()
+             if a in index and b in index]
+    total_wins = [0.5] * len(names)
+    for i, j, wins, games in pairs:
+        total_wins[i] += wins
+        total_wins[j] += games - wins
+    strength = [initial.get(n, 1.0) for n in names] if initial else [1.0] * len(names)
+
+    for _ in range(iterations):
+        denom = [1.0 / (s + 1.0) for s in strength]
+        for i, j, _, games in pairs:
+            d = games / (strength[i] + strength[j])
+            denom[i] += d
+            denom[j] += d
+        new = [w / d for w, d in zip(total_wins, denom)]
+        log_mean = sum(math.log(v) for v in new) / len(new) if new else 0.0
+        scale = math.exp(log_mean)
+        new = [v / scale for v in new]
+        change = max((abs(math.log(a / b)) for a, b in zip(new, strength)), default=0.0)
+        strength = new
+        if change < tol:
+            break
+    return dict(zip(names, strength))
+
+
+class MatchupFitter:
+    """累计计数 + 强度; update() 之后 matrix() 给出平滑后的胜率矩阵"""
+
+    def __init__(self, prior_games=DEFAULT_PRIOR_GAMES, counts=None, strengths=None):
+        self.prior_games = prior_games
+        self.counts = counts or MatchupCounts()
+        self.strengths = strengths or {}
+
+    def update(self, results=None, names=None):
+        """累加新的记录 ((A, B, A 是否获胜) 的可迭代对象或 MatchupCounts), 然后重新拟合强度"""
+        if isinstance(results, MatchupCounts):
+            self.counts.merge(results)
+        elif results is not None:
+            for deck_a, deck_b, a_won in results:
+                self.counts.add(deck_a, deck_b, int(a_won))
+        all_names = sorted(set(self.counts.names()) | set(names or ()))
+        self.strengths = fit_strengths(all_names, self.counts, self.strengths)
+        return self
+
+    def prior(self, deck_a, deck_b):
+        sa = self.strengths.get(deck_a, 1.0)
+        sb = self.strengths.get(deck_b, 1.0)
+        return sa / (sa + sb)
+
+    def cell(self, deck_a, deck_b):
+        """(后验均值, 实际局数)"""
+        if deck_a == deck_b:
+            return DEFAULT_WINRATE, 0
+        key = (deck_a, deck_b) if deck_a < deck_b else (deck_b, deck_a)
+        wins, games = self.counts.pairs.get(key, (0, 0))
+        if deck_a != key[0]:
+            wins = games - wins
+        k = self.prior_games
+        return (wins + k * self.prior(deck_a, deck_b)) / (games + k), games
+
+    def matrix_data(self, names):
+        """matchup_matrix.json 的内容: 胜率矩阵 + 每格局数与先验强度 (后验为 Beta(m·(n+k), (1-m)·(n+k)))"""
+        winrates = []
+        games = []
+        for a in names:
+            cells = [self.cell(a, b) for b in names]
+            winrates.append([round(m, 6) for m, _ in cells])
+            games.append([n for _, n in cells])
+        return {"decks": list(names), "winrates": winrates, "games": games, "prior_games": self.prior_games}
+
+    def matrix(self, names):
+        data = self.matrix_data(names)
+        return MatchupMatrix(names, validate_matrix(data)[1])
+
+    def to_dict(self):
+        return {"prior_games": self.prior_games, "strengths": self.strengths, **self.counts.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("prior_games", DEFAULT_PRIOR_GAMES), MatchupCounts.from_dict(data),
+                   dict(data.get("strengths", {})))
+
+
+def write_matrix(path, data):
+    """写入矩阵文件, 并立即生成二进制快照 (首次加载也无需解析 JSON)"""
+    atomic_write_json(path, data, indent=None)
+    write_snapshot(path, validate_matrix(data), tag="matrix")
+
+
+# --- 读取对局记录 ---
+# CSV 需包含 deck_a, deck_b, winner 列 (winner 为胜者卡组名, 或 "a"/"b"); JSONL 每行一个同名字段的对象。
+
+def parse_winner(deck_a, deck_b, winner):
+    """胜者字段 -> A 是否获胜 (1 / 0)"""
+    winner = winner.strip()
+    if winner in ("a", "A") or winner == deck_a:
+        return 1
+    if winner in ("b", "B") or winner == deck_b:
+        return 0
+    raise ValueError(f"无法识别的胜者: {winner}")
+
+
+def iter_results(path):
+    """逐行读取对局记录 (不整体载入内存), 产出 (A, B, A 是否获胜)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    a, b = row["deck_a"], row["deck_b"]
+                    yield a, b, parse_winner(a, b, str(row["winner"]))
+        else:
+            for row in csv.DictReader(f):
+                yield row["deck_a"], row["deck_b"], parse_winner(row["deck_a"], row["deck_b"], row["winner"])
+
+
+def load_fitter(path, prior_games=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            fitter = MatchupFitter.from_dict(json.load(f))
+    except FileNotFoundError:
+        return MatchupFitter(prior_games if prior_games is not None else DEFAULT_PRIOR_GAMES)
+    if prior_games is not None:
+        fitter.prior_games = prior_games
+    return fitter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="由对局记录拟合对战胜率矩阵")
+    parser.add_argument("logs", nargs="*", help="对局记录文件 (CSV 或 JSONL)")
+    parser.add_argument("--prior-games", type=float, default=None, help=f"先验等效局数 (默认 {DEFAULT_PRIOR_GAMES:g})")
+    parser.add_argument("--counts", default=COUNTS_FILE, help="累计计数文件 (增量更新)")
+    parser.add_argument("--reset", action="store_true", help="忽略已有计数, 从头拟合")
+    parser.add_argument("--out", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool_names = [d["name"] for d in load_deck_pool("deck_pool.json", check_icons=False)]
+        if args.reset:
+            fitter = MatchupFitter(args.prior_games if args.prior_games is not None else DEFAULT_PRIOR_GAMES)
+        else:
+            fitter = load_fitter(args.counts, args.prior_games)
+        new = MatchupCounts()
+        for path in args.logs:
+            for deck_a, deck_b, a_won in iter_results(path):
+                new.add(deck_a, deck_b, a_won)
+        fitter.update(new, pool_names)
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    known = set(pool_names)
+    names = pool_names + [n for n in fitter.counts.names() if n not in known]
+    atomic_write_json(args.counts, fitter.to_dict(), indent=None)
+    write_matrix(args.out, fitter.matrix_data(names))
+    print(f"新增 {new.total_games} 局, 累计 {fitter.counts.total_games} 局, {len(names)} 套卡组 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import argparse
+import random
+import sys
+
+from config_cache import load_json_cached
+from matchup import DEFAULT_WINRATE, validate_matrix
+from matchup_fit import DEFAULT_PRIOR_GAMES
+from series import series_win_prob
+from symmetry import solve_bp_symmetric
+
+# --- 胜率不确定性 ---
+# matchup_fit 输出的每格胜率是 Beta 后验均值 m, 局数 n 与先验等效局数 k 一起给出后验 Beta(m·(n+k), (1-m)·(n+k))。
+# (手工编写、没有局数的矩阵按 n = 0 处理, 即只有先验的不确定性。)
+# 从后验中一次抽取 POSTERIOR_SAMPLES 个胜率矩阵 (只抽当前对局用到的格子, 每格一整列样本),
+# 在每个样本下计算系列赛胜率, 报告均值与可信区间。A 对 B 与 B 对 A 共用同一个样本 (互补)。
+
+POSTERIOR_SAMPLES = 4000
+CREDIBLE_LEVEL = 0.90
+_MIN_SHAPE = 1e-3
+
+
+def validate_posterior(data):
+    """矩阵 JSON -> (names, 扁平 α 列表, 扁平 β 列表, 先验等效局数)"""
+    names, flat = validate_matrix(data)
+    n = len(names)
+    games = data.get("games")
+    if games is not None and (len(games) != n or any(len(row) != n for row in games)):
+        raise ValueError("games 应为 N×N 矩阵")
+    k = float(data.get("prior_games", DEFAULT_PRIOR_GAMES))
+    alpha = []
+    beta = []
+    for idx, m in enumerate(flat):
+        total = (games[idx // n][idx % n] if games is not None else 0) + k
+        alpha.append(max(m * total, _MIN_SHAPE))
+        beta.append(max((1.0 - m) * total, _MIN_SHAPE))
+    return names, alpha, beta, k
+
+
+class MatchupPosterior:
+    def __init__(self, names, alpha, beta, prior_games=DEFAULT_PRIOR_GAMES):
+        self.names = list(names)
+        self.n = len(self.names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.alpha = alpha
+        self.beta = beta
+        self.prior_games = prior_games
+
+    def params(self, deck_a, deck_b):
+        """(α, β); 未知卡组取以 50% 为中心的先验, 同名对局返回 None (固定 50%)"""
+        if deck_a == deck_b:
+            return None
+        i = self.index.get(deck_a)
+        j = self.index.get(deck_b)
+        if i is None or j is None:
+            half = DEFAULT_WINRATE * self.prior_games
+            return half, half
+        return self.alpha[i * self.n + j], self.beta[i * self.n + j]
+
+    def sample_cells(self, pairs, count, rng):
+        """pairs 中每个 (A, B) 的 count 个胜率样本 (列表的列表); 互为镜像的两格只抽一次"""
+        columns = {}
+        result = []
+        for a, b in pairs:
+            if (a, b) not in columns:
+                if (b, a) in columns:
+                    columns[(a, b)] = [1.0 - p for p in columns[(b, a)]]
+                else:
+                    params = self.params(a, b)
+                    if params is None:
+                        columns[(a, b)] = [DEFAULT_WINRATE] * count
+                    else:
+                        alpha, beta = params
+                        betavariate = rng.betavariate
+                        columns[(a, b)] = [betavariate(alpha, beta) for _ in range(count)]
+            result.append(columns[(a, b)])
+        return result
+
+    def sample_locals(self, my_names, opp_names, count, rng):
+        """count 个阵容间胜率子矩阵样本"""
+        pairs = [(a, b) for a in my_names for b in opp_names]
+        columns = self.sample_cells(pairs, count, rng)
+        width = len(opp_names)
+        locals = []
+        for s in range(count):
+            flat = [col[s] for col in columns]
+            locals.append([flat[r * width:(r + 1) * width] for r in range(len(my_names))])
+        return locals
+
+
+def load_matchup_posterior(filepath):
+    """读取矩阵文件中的后验参数; 文件不存在时返回 None"""
+    try:
+        names, alpha, beta, prior_games = load_json_cached(filepath, validate_posterior, tag="posterior")
+    except FileNotFoundError:
+        return None
+    return MatchupPosterior(names, alpha, beta, prior_games)
+
+
+class Interval:
+    """样本的均值与等尾可信区间"""
+
+    def __init__(self, samples, level=CREDIBLE_LEVEL):
+        ordered = sorted(samples)
+        tail = (1.0 - level) / 2.0
+        self.mean = sum(ordered) / len(ordered)
+        tail_index = int(tail * (len(ordered) - 1))  # 两端按同一规则取序号, 区间对称
+        self.lower = ordered[tail_index]
+        self.upper = ordered[len(ordered) - 1 - tail_index]
+        self.level = level
+
+    def __str__(self):
+        return f"{self.mean:.1%} ({self.level:.0%} 区间 {self.lower:.1%}–{self.upper:.1%})"
+
+
+def pairing_intervals(posterior, my_names, opp_names, count=POSTERIOR_SAMPLES, rng=None):
+    """
+    按给定配对 (my_names[k] 对 opp_names[k]) 的每局胜率区间与系列赛胜率区间: ([每局 Interval], 系列赛 Interval)。
+    所有样本一次抽出, 系列赛胜率按列逐样本计算。
+    """
+    rng = rng or random.Random()
+    columns = posterior.sample_cells(list(zip(my_names, opp_names)), count, rng)
+    series = [series_win_prob(p1, p2, p3) for p1, p2, p3 in zip(*columns)]
+    return [Interval(col) for col in columns], Interval(series)
+
+
+def lineup_value_interval(posterior, my_names, opp_names, count=1000, rng=None, job=None):
+    """双方按最优 B/P 行动时系列赛胜率的后验区间 (每个样本矩阵各求解一次)"""
+    rng = rng or random.Random()
+    values = []
+    for done, local in enumerate(posterior.sample_locals(my_names, opp_names, count, rng), 1):
+        values.append(solve_bp_symmetric(local, strategies=False).value)
+        if job is not None and done % 50 == 0:
+            job.check_cancelled()
+            job.report_progress(done, count)
+    return Interval(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按对战矩阵后验计算系列赛胜率区间")
+    parser.add_argument("--my", nargs="+", required=True, help="我方阵容 (卡组名称)")
+    parser.add_argument("--opp", nargs="+", required=True, help="对方阵容 (卡组名称)")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        posterior = load_matchup_posterior(args.matrix)
+        if posterior is None:
+            raise FileNotFoundError(f"找不到对战矩阵 {args.matrix}")
+        interval = lineup_value_interval(posterior, args.my, args.opp, args.samples, random.Random(args.seed))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(f"最优 B/P 下的系列赛胜率: {interval}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from config_cache import CACHE_DIR, atomic_write_bytes, atomic_write_json
+from matchup import MatchupMatrix, load_matchup_matrix
+from solver import solve_bp
+
+# --- 二进制对战矩阵与环境快照 ---
+# .bpm 文件: 定长文件头 + 卡组名称 (UTF-8, 以 \0 分隔) + 按行存放的 float32 稠密矩阵 (16 字节对齐, 小端)。
+# 打开时只解析文件头与名称, 胜率数据通过 mmap 直接映射为 memoryview, 没有解析开销;
+# 文件头中保存内容哈希作为矩阵版本, 不必重新计算。传给工作进程时只传路径, 由对方重新映射。
+#
+# 快照库 (matchup_store/): 每个日期一份快照, index.json 记录快照列表与当前使用的快照。
+# 卡组名单不变且改动格子不多时, 快照只保存相对上一份快照的差异 (序号 + 新值);
+# 打开差异快照时在 .bp_cache 中物化为完整 .bpm 文件, 之后切换到该快照与打开完整快照一样快。
+# load_matchup_matrix 接受快照库目录 (当前快照) 或 "目录@日期" (指定快照); 矩阵 JSON 不存在时
+# 退回 matchup_store/ 的当前快照, 因此 "use" 切换后界面与各命令行工具下次读取矩阵即使用新快照。
+
+MAGIC = b"BPMX"
+DELTA_MAGIC = b"BPMD"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHHI8sI")  # magic, 格式版本, 保留, N, 内容哈希, 名称区长度
+_DELTA_HEADER = struct.Struct("<4sHHI8s8sI")  # magic, 格式版本, 保留, N, 基准哈希, 内容哈希, 改动数
+_ALIGN = 16
+
+DEFAULT_ROOT = "matchup_store"
+INDEX_VERSION = 1
+MAX_DELTA_FRACTION = 0.25  # 改动格子超过该比例时保存完整快照
+MAX_DELTA_CHAIN = 8  # 连续差异快照的最大数量
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _digest(names, values):
+    h = hashlib.sha1()
+    h.update("\0".join(names).encode("utf-8"))
+    h.update(_float32_bytes(values))
+    return h.digest()[:8]
+
+
+def _float32_bytes(values):
+    data = values if isinstance(values, array) and values.typecode == "f" else array("f", values)
+    if not _LITTLE_ENDIAN:
+        data = array("f", data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def write_matrix_file(path, names, values):
+    """写入 .bpm 文件 (float32), 返回内容哈希 (十六进制)"""
+    names = list(names)
+    if len(values) != len(names) * len(names):
+        raise ValueError("胜率数据应为 N×N")
+    name_bytes = "\0".join(names).encode("utf-8")
+    digest = _digest(names, values)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(names), digest, len(name_bytes))
+    offset = _HEADER.size + len(name_bytes)
+    padding = b"\0" * (-offset % _ALIGN)
+    atomic_write_bytes(path, header + name_bytes + padding + _float32_bytes(values))
+    return digest.hex()
+
+
+class MappedMatchupMatrix(MatchupMatrix):
+    """数据为只读 mmap 视图的 MatchupMatrix; 序列化 (pickle) 时只保存文件路径"""
+
+    def __init__(self, path, names, data, version, mapping):
+        super().__init__(names, data, version=version)
+        self.path = path
+        self._mapping = mapping
+
+    def __reduce__(self):
+        return open_matrix_file, (self.path,)
+
+    def row(self, i):
+        return self.data[i * self.n:(i + 1) * self.n].tolist()  # 复制, 不在映射上留下外部视图
+
+    def close(self):
+        """释放映射; 仍有外部视图 (如 data 的切片) 时留给垃圾回收处理"""
+        try:
+            if isinstance(self.data, memoryview):
+                self.data.release()
+            self._mapping.close()
+        except BufferError:
+            pass
+
+
+def open_matrix_file(path):
+    """映射 .bpm 文件, 返回 MappedMatchupMatrix"""
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, fmt, _, n, digest, name_len = _HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} 不是有效的矩阵文件")
+        names = bytes(mapping[_HEADER.size:_HEADER.size + name_len]).decode("utf-8").split("\0") if n else []
+        offset = _HEADER.size + name_len
+        offset += -offset % _ALIGN
+        if len(mapping) != offset + 4 * n * n:
+            raise ValueError(f"{path} 长度与矩阵大小不符")
+    except (struct.error, ValueError, UnicodeDecodeError) as e:
+        mapping.close()
+        raise ValueError(f"{path} 不是有效的矩阵文件: {e}") from None
+
+    if _LITTLE_ENDIAN:
+        data = memoryview(mapping)[offset:].cast("f")
+    else:
+        data = array("f", mapping[offset:])
+        data.byteswap()
+    return MappedMatchupMatrix(path, names, data, digest.hex(), mapping)
+
+
+# --- 差异 ---
+
+def _write_delta(path, base_digest, digest, n, changes):
+    indices = array("I", (i for i, _ in changes))
+    values = [v for _, v in changes]
+    if not _LITTLE_ENDIAN:
+        indices.byteswap()
+    header = _DELTA_HEADER.pack(DELTA_MAGIC, FORMAT_VERSION, 0, n, base_digest, digest, len(changes))
+    atomic_write_bytes(path, header + indices.tobytes() + _float32_bytes(values))
+
+
+def _read_delta(path):
+    with open(path, 'rb') as f:
+        payload = f.read()
+    magic, fmt, _, n, base_digest, digest, count = _DELTA_HEADER.unpack_from(payload, 0)
+    if magic != DELTA_MAGIC or fmt != FORMAT_VERSION:
+        raise ValueError(f"{path} 不是有效的差异文件")
+    start = _DELTA_HEADER.size
+    indices = array("I", payload[start:start + 4 * count])
+    values = array("f", payload[start + 4 * count:start + 8 * count])
+    if not _LITTLE_ENDIAN:
+        indices.byteswap()
+        values.byteswap()
+    return base_digest.hex(), digest.hex(), zip(indices, values)
+
+
+class MatrixStore:
+    """按日期保存的对战矩阵快照库"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.snapshots = []  # [{"date", "file", "kind": full/delta, "version", "decks", "note"}], 按日期排序
+        self.active = None
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            raise ValueError(f"快照索引 {self.index_path} 已损坏: {e}") from None
+        self.snapshots = index.get("snapshots", [])
+        self.active = index.get("active")
+
+    def _save_index(self):
+        atomic_write_json(self.index_path, {"version": INDEX_VERSION, "snapshots": self.snapshots,
+                                            "active": self.active})
+
+    def _entry(self, date):
+        for entry in self.snapshots:
+            if entry["date"] == date:
+                return entry
+        raise ValueError(f"没有 {date} 的快照")
+
+    def dates(self):
+        return [entry["date"] for entry in self.snapshots]
+
+    def add(self, date, matrix, note=""):
+        """保存一份快照 (同日期原地覆盖, 不影响当前快照); 与上一份快照的卡组相同且改动不多时只保存差异"""
+        replaced = next((e for e in self.snapshots if e["date"] == date), None)
+        previous = [e for e in self.snapshots if e["date"] < date]
+        later = [e for e in self.snapshots if e["date"] > date]
+        if later:
+            self._make_full(later[0])
+        names = list(matrix.names)
+        values = array("f", matrix.data)  # 统一按 float32 比较与保存
+        os.makedirs(self.root, exist_ok=True)
+        entry = {"date": date, "decks": len(names), "note": note}
+
+        base = previous[-1] if previous else None
+        changes = None
+        if base is not None:
+            chain = 0
+            for e in reversed(previous):
+                if e["kind"] != "delta":
+                    break
+                chain += 1
+            parent = self.open(base["date"])
+            if parent.names == names and chain < MAX_DELTA_CHAIN:
+                changes = [(i, v) for i, (v, old) in enumerate(zip(values, parent.data)) if v != old]
+                if len(changes) > MAX_DELTA_FRACTION * len(values):
+                    changes = None
+            parent.close()
+
+        if changes is not None:
+            digest = _digest(names, values)
+            entry.update(kind="delta", file=f"{date}.delta", version=digest.hex())
+            _write_delta(os.path.join(self.root, entry["file"]), bytes.fromhex(base["version"]), digest,
+                         len(names), changes)
+        else:
+            entry.update(kind="full", file=f"{date}.bpm")
+            entry["version"] = write_matrix_file(os.path.join(self.root, entry["file"]), names, values)
+
+        if replaced is not None and replaced["file"] != entry["file"]:
+            try:
+                os.remove(os.path.join(self.root, replaced["file"]))
+            except FileNotFoundError:
+                pass
+        self.snapshots = sorted(previous + [entry] + later, key=lambda e: e["date"])
+        if self.active is None:
+            self.active = date
+        self._save_index()
+        return entry
+
+    def _make_full(self, entry):
+        """把差异快照改存为完整快照 (在它的基准快照被删除或前面插入新快照之前调用)"""
+        if entry["kind"] != "delta":
+            return
+        matrix = self.open(entry["date"])
+        write_matrix_file(os.path.join(self.root, f"{entry['date']}.bpm"), matrix.names, matrix.data)
+        matrix.close()
+        os.remove(os.path.join(self.root, entry["file"]))
+        entry.update(kind="full", file=f"{entry['date']}.bpm")
+
+    def remove(self, date):
+        """删除快照; 依赖它的差异快照会先改存为完整快照"""
+        entry = self._entry(date)
+        position = self.snapshots.index(entry)
+        if position + 1 < len(self.snapshots):
+            self._make_full(self.snapshots[position + 1])
+        self.snapshots.remove(entry)
+        try:
+            os.remove(os.path.join(self.root, entry["file"]))
+        except FileNotFoundError:
+            pass
+        if self.active == date:
+            self.active = self.snapshots[-1]["date"] if self.snapshots else None
+        self._save_index()
+
+    def _materialized_path(self, entry):
+        return os.path.join(CACHE_DIR, "matrix_store", f"{entry['version']}.bpm")
+
+    def open(self, date=None):
+        """打开快照 (默认为当前快照), 返回 MappedMatchupMatrix"""
+        date = date or self.active
+        if date is None:
+            raise ValueError("快照库为空")
+        entry = self._entry(date)
+        if entry["kind"] == "full":
+            return open_matrix_file(os.path.join(self.root, entry["file"]))
+
+        path = self._materialized_path(entry)
+        try:
+            return open_matrix_file(path)
+        except (OSError, ValueError):
+            pass
+        # 从最近的完整快照开始依次应用差异
+        position = self.snapshots.index(entry)
+        start = position
+        while self.snapshots[start]["kind"] == "delta":
+            start -= 1
+        base = open_matrix_file(os.path.join(self.root, self.snapshots[start]["file"]))
+        names, values, prev_version = base.names, array("f", base.data), base.version
+        base.close()
+        for e in self.snapshots[start + 1:position + 1]:
+            base_version, version, changes = _read_delta(os.path.join(self.root, e["file"]))
+            if base_version != prev_version:
+                raise ValueError(f"快照 {e['date']} 的基准与上一份快照不一致")
+            prev_version = version
+            for i, v in changes:
+                values[i] = v
+        write_matrix_file(path, names, values)
+        return open_matrix_file(path)
+
+    def use(self, date):
+        """切换当前快照"""
+        self._entry(date)
+        self.active = date
+        self._save_index()
+
+
+def open_snapshot(spec):
+    """
+    "目录" 或 "目录@日期" -> 快照库中的当前/指定快照 (MappedMatchupMatrix)。
+    spec 指向的不是快照库, 或快照库为空且未指定日期时返回 None。
+    """
+    root, _, date = spec.partition("@")
+    if not os.path.isfile(os.path.join(root, "index.json")):
+        return None
+    store = MatrixStore(root)
+    if not date and store.active is None:
+        return None
+    return store.open(date or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对战矩阵快照库")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="保存快照")
+    add.add_argument("date", help="快照日期 (YYYY-MM-DD)")
+    add.add_argument("matrix", help="矩阵文件 (.json 或 .bpm)")
+    add.add_argument("--note", default="")
+    sub.add_parser("list", help="列出快照")
+    use = sub.add_parser("use", help="切换当前快照")
+    use.add_argument("date")
+    export = sub.add_parser("export", help="导出快照为 .bpm 文件")
+    export.add_argument("date")
+    export.add_argument("out")
+    compare = sub.add_parser("compare", help="比较一组对局在各快照下的最优 B/P 胜率")
+    compare.add_argument("--my", nargs="+", required=True)
+    compare.add_argument("--opp", nargs="+", required=True)
+    args = parser.parse_args(argv)
+
+    try:
+        store = MatrixStore(args.root)
+        if args.command == "add":
+            entry = store.add(args.date, load_matchup_matrix(args.matrix), args.note)
+            print(f"已保存 {entry['date']} ({entry['kind']}, {entry['decks']} 套卡组)")
+        elif args.command == "list":
+            for e in store.snapshots:
+                mark = "*" if e["date"] == store.active else " "
+                print(f"{mark} {e['date']}  {e['kind']:5}  {e['decks']:4} 套卡组  {e['version']}  {e['note']}")
+        elif args.command == "use":
+            store.use(args.date)
+        elif args.command == "export":
+            matrix = store.open(args.date)
+            write_matrix_file(args.out, matrix.names, matrix.data)
+        elif args.command == "compare":
+            for date in store.dates():
+                matrix = store.open(date)
+                value = solve_bp(matrix.local(args.my, args.opp), strategies=False).value
+                print(f"{date}: {value:.2%}")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
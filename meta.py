@@ -0,0 +1,38 @@
+from config_cache import load_json_cached
+
+# --- 环境 (meta) 分布 ---
+# meta.json: {"卡组名称": 使用率权重}, 权重无需归一化; 未列出的卡组权重为 0。
+# 文件不存在时按卡组资源池均匀分布。抽取阵容时按权重不放回抽样, 正权重卡组不足时用其余卡组随机补足。
+
+META_FILE = "meta.json"
+
+
+def validate_meta(data):
+    if not isinstance(data, dict):
+        raise ValueError("环境分布应为 {\"卡组名称\": 权重} 对象")
+    for name, weight in data.items():
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"卡组 '{name}' 的权重应为非负数")
+    return data
+
+
+def load_meta(filepath, pool_names):
+    """按 pool_names 顺序返回权重列表; 文件不存在时全部为 1"""
+    try:
+        data = load_json_cached(filepath, validate_meta, tag="meta")
+    except FileNotFoundError:
+        return [1.0] * len(pool_names)
+    unknown = [name for name in data if name not in set(pool_names)]
+    if unknown:
+        raise ValueError(f"环境分布中的卡组不在卡组资源池中: {', '.join(unknown)}")
+    weights = [float(data.get(name, 0.0)) for name in pool_names]
+    if not any(weights):
+        raise ValueError("环境分布的权重全部为 0")
+    return weights
+
+
+def sample_lineup(names, weights, size, rng):
+    """按权重不放回抽取 size 套卡组 (Efraimidis–Spirakis: 键 u^(1/w) 最大的 size 个)"""
+    keys = [rng.random() ** (1.0 / w) if w > 0 else -rng.random() for w in weights]
+    order = sorted(range(len(names)), key=keys.__getitem__, reverse=True)
+    return [names[i] for i in order[:size]]
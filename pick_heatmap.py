@@ -0,0 +1,65 @@
+import itertools
+
+from series import PICK_COUNT, lineup_series_prob, triple_mask
+
+# --- Pick阶段热力图 ---
+# 对方出战组合按预测分布 (B/P 求解得到的 Pick 均衡策略, 没有时取均匀分布) 取期望,
+# 每套可选卡组的边际贡献 = 含该卡组的最佳补全胜率 - 不含该卡组的最佳补全胜率。
+
+HEAT_SCALE = 0.10  # 贡献达到 ±10% 时颜色饱和
+
+
+def uniform_strategy(opp_available):
+    triples = list(itertools.combinations(opp_available, PICK_COUNT))
+    return [(t, 1.0 / len(triples)) for t in triples] if triples else []
+
+
+class PickHeatmap:
+    """
+    一次性算出我方所有可选出战组合对预测对方阵容的期望胜率,
+    之后按已选卡组的位掩码缓存每套卡组的 (最佳补全胜率, 边际贡献), 反复切换选择时直接取缓存。
+    """
+
+    def __init__(self, local, my_available, opp_strategy):
+        self.available = list(my_available)
+        self.triples = list(itertools.combinations(self.available, PICK_COUNT))
+        self.masks = [triple_mask(t) for t in self.triples]
+        self.values = [sum(p * lineup_series_prob(local, t, q) for q, p in opp_strategy) for t in self.triples]
+        self._cache = {}
+
+    def contributions(self, picked):
+        """picked: 已选卡组位置; 返回 {未选卡组位置: (最佳补全胜率, 边际贡献)}"""
+        mask = triple_mask(picked)
+        result = self._cache.get(mask)
+        if result is None:
+            result = self._cache[mask] = self._compute(mask)
+        return result
+
+    def _compute(self, mask):
+        candidates = [(pos, 1 << pos) for pos in self.available if not mask & (1 << pos)]
+        best_with = {}
+        best_without = {}
+        for m, v in zip(self.masks, self.values):
+            if m & mask != mask:
+                continue
+            for pos, bit in candidates:
+                best = best_with if m & bit else best_without
+                if v > best.get(pos, -1.0):
+                    best[pos] = v
+
+        result = {}
+        for pos, value in best_with.items():
+            other = best_without.get(pos)
+            result[pos] = (value, value - other if other is not None else 0.0)
+        return result
+
+
+def heat_color(delta, scale=HEAT_SCALE):
+    """边际贡献 -> 颜色 (负为红, 0 为灰, 正为绿)"""
+    t = max(-1.0, min(1.0, delta / scale))
+    if t >= 0:
+        r, g, b = 0x95 + (0x27 - 0x95) * t, 0xA5 + (0xAE - 0xA5) * t, 0xA6 + (0x60 - 0xA6) * t
+    else:
+        t = -t
+        r, g, b = 0x95 + (0xE7 - 0x95) * t, 0xA5 + (0x4C - 0xA5) * t, 0xA6 + (0x3C - 0xA6) * t
+    return f"#{int(r):02X}{int(g):02X}{int(b):02X}"
@@ -0,0 +1,179 @@
+import itertools
+import math
+import random
+
+from simulate import SimulationConfig, SeriesDraws, play_series, series_won
+from stats import RunningStats
+
+# --- 自适应提前停止的蒙特卡洛比较 (Racing) ---
+# 多个候选 (阵容/策略) 轮流分批采样, 每轮用经验 Bernstein 置信区间检查:
+#   - 上界低于当前最好候选下界的候选被淘汰;
+#   - 区间半宽已小于 epsilon 的候选不再采样;
+#   - 只剩一个未被淘汰的候选时整场比较结束。
+# 置信区间对采样次数取并集界 (δ_n = δ / (K·n·(n+1))), 因此每轮都检查也不会放大出错概率。
+# 样本取值须在 [0, 1] 内 (系列赛胜负或胜率)。使用公共随机数时按两两配对差值判断淘汰, 方差小得多。
+
+DEFAULT_DELTA = 0.05
+DEFAULT_EPSILON = 0.01
+DEFAULT_BATCH = 200
+
+
+def bernstein_radius(stats, delta, value_range=1.0):
+    """取值范围宽度为 value_range 的样本均值的经验 Bernstein 置信半径 (Maurer & Pontil), 置信度 1 - delta"""
+    n = stats.count
+    if n < 2:
+        return math.inf
+    log_term = math.log(2.0 / delta)
+    return math.sqrt(2.0 * stats.variance * log_term / n) + 7.0 * value_range * log_term / (3.0 * (n - 1))
+
+
+class RaceEntry:
+    """一个候选的采样函数与当前统计; status: racing / best / eliminated / settled / budget"""
+
+    def __init__(self, name, sampler):
+        self.name = name
+        self.sampler = sampler
+        self.stats = RunningStats()
+        self.radius = math.inf
+        self.status = "racing"
+
+    @property
+    def lower(self):
+        return max(0.0, self.stats.mean - self.radius)
+
+    @property
+    def upper(self):
+        return min(1.0, self.stats.mean + self.radius)
+
+
+class RaceResult:
+    def __init__(self, entries, fixed_budget):
+        self.entries = sorted(entries, key=lambda e: -e.stats.mean)
+        self.samples = sum(e.stats.count for e in entries)
+        self.fixed_budget = fixed_budget  # 不提前停止时需要的总样本数
+
+    @property
+    def best(self):
+        return self.entries[0]
+
+    def summary(self):
+        lines = [f"共采样 {self.samples} 次 (固定预算需 {self.fixed_budget} 次)"]
+        for e in self.entries:
+            lines.append(f"  {e.name}: {e.stats.mean:.2%} [{e.lower:.2%}, {e.upper:.2%}] "
+                         f"n={e.stats.count} {e.status}")
+        return "\n".join(lines)
+
+
+def race(candidates, delta=DEFAULT_DELTA, epsilon=DEFAULT_EPSILON, batch=DEFAULT_BATCH, max_samples=100000,
+         seed=0, draws=None, job=None):
+    """
+    candidates: [(名称, sampler)]。返回 RaceResult; job 为 jobs.Job 时汇报进度并响应取消。
+    draws 为 None 时各候选使用独立的随机数流, sampler(rng) 返回一次采样的取值;
+    draws 为 simulate.SeriesDraws 时使用公共随机数: 所有候选按相同序号取同一份随机输入,
+    sampler(rng, opp_lineup, uniforms), 淘汰改用两两配对差值的置信区间判断。
+    """
+    entries = [RaceEntry(name, sampler) for name, sampler in candidates]
+    fixed_budget = max_samples * len(entries)
+    paired = None
+    if draws is not None:
+        paired = {(a, b): RunningStats() for a in range(len(entries)) for b in range(a + 1, len(entries))}
+    else:
+        rngs = [random.Random(f"{seed}:{i}") for i in range(len(entries))]
+
+    rounds = 0
+    next_index = 0
+    while True:
+        active = [i for i, e in enumerate(entries) if e.status == "racing"]
+        if not active:
+            break
+        if paired is None:
+            for i in active:
+                e = entries[i]
+                for _ in range(min(batch, max_samples - e.stats.count)):
+                    e.stats.add(e.sampler(rngs[i]))
+        else:
+            n = min(batch, max_samples - min(entries[i].stats.count for i in active))
+            for sample_index in range(next_index, next_index + n):
+                rng, opp_lineup, uniforms = draws.draw(sample_index)
+                state = rng.getstate()
+                values = {}
+                for i in active:
+                    rng.setstate(state)  # 每个候选从同一随机状态开始
+                    values[i] = entries[i].sampler(rng, opp_lineup, uniforms)
+                    entries[i].stats.add(values[i])
+                for a, b in itertools.combinations(active, 2):
+                    paired[(a, b)].add(values[a] - values[b])
+            next_index += n
+        rounds += 1
+        _update_bounds(entries, delta, epsilon, max_samples, paired)
+        if job is not None:
+            done = sum(e.stats.count for e in entries)
+            job.report_progress(done, fixed_budget, f"第 {rounds} 轮, 剩余 {len(active)} 个候选")
+
+    return RaceResult(entries, fixed_budget)
+
+
+def _update_bounds(entries, delta, epsilon, max_samples, paired=None):
+    k = len(entries)
+    tests = k + (len(paired) if paired else 0)
+    for e in entries:
+        n = e.stats.count
+        e.radius = bernstein_radius(e.stats, delta / (tests * n * (n + 1))) if n else math.inf
+
+    pair_radius = {}
+    alive = [i for i, e in enumerate(entries) if e.status != "eliminated"]
+    if paired is None:
+        best_lower = max(entries[i].lower for i in alive)
+        for i in alive:
+            if entries[i].upper < best_lower:
+                entries[i].status = "eliminated"
+    else:
+        # 配对差值取值在 [-1, 1], 区间宽度为 2
+        losers = set()
+        for a, b in itertools.combinations(alive, 2):
+            stats = paired[(a, b)]
+            n = stats.count
+            r = bernstein_radius(stats, delta / (tests * n * (n + 1)), 2.0) if n else math.inf
+            pair_radius[(a, b)] = r
+            if stats.mean - r > 0:
+                losers.add(b)
+            elif stats.mean + r < 0:
+                losers.add(a)
+        for i in losers:
+            entries[i].status = "eliminated"
+
+    alive = [i for i, e in enumerate(entries) if e.status != "eliminated"]
+    if len(alive) == 1:
+        entries[alive[0]].status = "best"
+        return
+    for i in alive:
+        e = entries[i]
+        if e.status != "racing":
+            continue
+        tied = paired is not None and all(pair_radius.get((min(i, j), max(i, j)), math.inf) <= epsilon
+                                          for j in alive if j != i)
+        if e.radius <= epsilon or tied:
+            e.status = "settled"
+        elif e.stats.count >= max_samples:
+            e.status = "budget"
+
+
+# --- 阵容比较 ---
+
+def lineup_sampler(config):
+    """按 config 中的我方阵容模拟一次系列赛, 赢为 1 输为 0 (可用于独立采样或公共随机数)"""
+    def sample(rng, opp_lineup=None, uniforms=None):
+        return 1.0 if series_won(play_series(config, rng, opp_lineup, uniforms)) else 0.0
+    return sample
+
+
+def race_lineups(matrix, lineups, pool_names, opp_count=6, common_random=True, stratified=False,
+                 antithetic=False, seed=0, **kwargs):
+    """
+    比较多套我方阵容 (卡组名称列表) 对随机对方阵容的系列赛胜率。
+    默认使用公共随机数 (各阵容面对相同的对方阵容与随机数), 可另外开启分层/对偶抽样。
+    """
+    candidates = [(" / ".join(lineup), lineup_sampler(SimulationConfig(matrix, lineup, pool_names, opp_count)))
+                  for lineup in lineups]
+    draws = SeriesDraws(pool_names, opp_count, seed, stratified, antithetic) if common_random else None
+    return race(candidates, seed=seed, draws=draws, **kwargs)
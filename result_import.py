@@ -0,0 +1,269 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config_cache import atomic_write_json, load_json_cached
+from deck_pool import load_deck_pool
+from matchup_fit import COUNTS_FILE, MatchupCounts, MatchupFitter, load_fitter, parse_winner, write_matrix
+
+# --- 大规模比赛结果导入 ---
+# 导出文件 (CSV / JSONL, 可达数 GB) 按字节区间切成若干分片, 各分片在进程池中流式读取:
+#   每读 CHUNK_ROWS 行, 先按原始 (A, B, 胜者) 字符串计数, 再对这批中出现过的不同名称统一做卡组名称映射,
+#   最后累加到按卡组对的胜负计数中。内存只与卡组对数量有关, 与文件大小无关。
+# 名称映射: 先查别名表 (deck_aliases.json, {"别名": "卡组资源池中的名称"}), 再按规整后的名称
+# (忽略大小写、空白、全/半角括号与常见标点) 匹配卡组资源池; 无法映射的名称单独计数并报告, 不计入矩阵。
+# 约定每条记录占一行 (CSV 字段内不含换行)。
+
+ALIAS_FILE = "deck_aliases.json"
+CHUNK_ROWS = 100000
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+
+_PUNCTUATION = re.compile(r"[\s()（）\[\]【】「」<>《》·・\-_—/\\|,，.。:：'\"“”]+")
+
+
+def normalize_name(name):
+    return _PUNCTUATION.sub("", name).casefold()
+
+
+def validate_aliases(data):
+    if not isinstance(data, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in data.items()):
+        raise ValueError("别名表应为 {\"别名\": \"卡组名称\"} 对象")
+    return data
+
+
+def load_aliases(filepath=ALIAS_FILE):
+    """读取别名表; 文件不存在时返回空表"""
+    try:
+        return load_json_cached(filepath, validate_aliases, tag="aliases")
+    except FileNotFoundError:
+        return {}
+
+
+class DeckNameResolver:
+    """把导出文件中的原始名称映射到卡组资源池名称 (结果按原始名称缓存)"""
+
+    def __init__(self, pool_names, aliases=None):
+        self.by_normalized = {normalize_name(n): n for n in pool_names}
+        for alias, target in (aliases or {}).items():
+            canonical = self.by_normalized.get(normalize_name(target))
+            if canonical is None:
+                raise ValueError(f"别名 '{alias}' 指向的卡组 '{target}' 不在卡组资源池中")
+            self.by_normalized[normalize_name(alias)] = canonical
+        self._cache = {}
+
+    def resolve(self, raw):
+        """返回卡组资源池中的名称, 无法映射时返回 None"""
+        try:
+            return self._cache[raw]
+        except KeyError:
+            name = self._cache[raw] = self.by_normalized.get(normalize_name(raw))
+            return name
+
+
+class ImportResult:
+    def __init__(self, counts=None, unmapped=None, rows=0, skipped=0):
+        self.counts = counts or MatchupCounts()
+        self.unmapped = unmapped or Counter()  # 原始名称 -> 出现次数
+        self.rows = rows
+        self.skipped = skipped  # 无法解析或无法映射的行
+
+    def merge(self, other):
+        self.counts.merge(other.counts)
+        self.unmapped.update(other.unmapped)
+        self.rows += other.rows
+        self.skipped += other.skipped
+        return self
+
+    def to_dict(self):
+        return {"counts": self.counts.to_dict(), "unmapped": dict(self.unmapped), "rows": self.rows,
+                "skipped": self.skipped}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(MatchupCounts.from_dict(data["counts"]), Counter(data["unmapped"]), data["rows"], data["skipped"])
+
+    def summary(self, top=10):
+        lines = [f"读取 {self.rows} 行, 计入 {self.counts.total_games} 局, 跳过 {self.skipped} 行"]
+        if self.unmapped:
+            names = "、".join(f"{n} ({c})" for n, c in self.unmapped.most_common(top))
+            lines.append(f"无法映射的卡组名称 {len(self.unmapped)} 个: {names}")
+        return "\n".join(lines)
+
+
+# --- 分片 ---
+
+def read_header(path):
+    """CSV 表头 (列名列表); JSONL 返回 None"""
+    if path.endswith(".jsonl"):
+        return None
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return next(csv.reader([f.readline()]), [])
+
+
+def plan_shards(paths, shard_bytes=DEFAULT_SHARD_BYTES):
+    """把每个文件切成约 shard_bytes 大小的字节区间: [(路径, 起点, 终点)]"""
+    shards = []
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, max(size, 1), shard_bytes):
+            shards.append((path, start, min(start + shard_bytes, size)))
+    return shards
+
+
+def _iter_lines(path, start, end):
+    """读取起点落在 [start, end) 内的所有整行 (跨区间的行归属于起点所在的分片)"""
+    with open(path, 'rb') as f:
+        if start > 0:
+            f.seek(start - 1)
+            pos = start - 1 + len(f.readline())
+        else:
+            pos = 0
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+
+def _flush(raw_counts, resolver, result):
+    for (raw_a, raw_b, raw_winner), n in raw_counts.items():
+        deck_a = resolver.resolve(raw_a)
+        deck_b = resolver.resolve(raw_b)
+        if deck_a is None or deck_b is None:
+            for raw, deck in ((raw_a, deck_a), (raw_b, deck_b)):
+                if deck is None:
+                    result.unmapped[raw] += n
+            result.skipped += n
+            continue
+        try:
+            a_won = parse_winner(raw_a, raw_b, raw_winner)
+        except ValueError:
+            # 胜者列可能使用另一种别名写法, 映射后再与双方卡组比较
+            winner = resolver.resolve(raw_winner)
+            if winner is None or winner not in (deck_a, deck_b):
+                result.skipped += n
+                continue
+            a_won = int(winner == deck_a)
+        result.counts.add(deck_a, deck_b, a_won * n, n)
+    raw_counts.clear()
+
+
+def import_shard(path, start, end, header, pool_names, aliases, columns=("deck_a", "deck_b", "winner")):
+    """工作进程入口: 导入一个分片, 返回 ImportResult 的字典形式"""
+    resolver = DeckNameResolver(pool_names, aliases)
+    result = ImportResult()
+    raw_counts = Counter()
+    fields, width = columns, 0
+    if header is not None:
+        try:
+            fields = [header.index(c) for c in columns]
+        except ValueError:
+            raise ValueError(f"{path} 缺少列: {', '.join(c for c in columns if c not in header)}") from None
+        width = max(fields) + 1
+
+    batch = []
+    lines = _iter_lines(path, start, end)
+    if header is not None and start == 0:
+        next(lines, None)  # 表头
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= CHUNK_ROWS:
+            _parse_batch(batch, header, fields, width, raw_counts, result)
+            _flush(raw_counts, resolver, result)
+            batch = []
+    _parse_batch(batch, header, fields, width, raw_counts, result)
+    _flush(raw_counts, resolver, result)
+    return result.to_dict()
+
+
+def _parse_batch(batch, header, fields, width, raw_counts, result):
+    """把一批原始行解析为 (A, B, 胜者) 字符串计数; fields 为 CSV 列序号或 JSONL 字段名"""
+    text = [line.decode('utf-8-sig', errors='replace') for line in batch]
+    a, b, w = fields
+    if header is not None:
+        for row in csv.reader(text):
+            if not row:
+                continue
+            result.rows += 1
+            if len(row) < width:
+                result.skipped += 1
+                continue
+            raw_counts[(row[a].strip(), row[b].strip(), row[w].strip())] += 1
+    else:
+        for line in text:
+            if not line.strip():
+                continue
+            result.rows += 1
+            try:
+                row = json.loads(line)
+                raw_counts[(str(row[a]).strip(), str(row[b]).strip(), str(row[w]).strip())] += 1
+            except (ValueError, KeyError, TypeError):
+                result.skipped += 1
+
+
+def import_results(paths, pool_names, aliases=None, workers=None, shard_bytes=DEFAULT_SHARD_BYTES, job=None):
+    """把多个导出文件导入为按卡组对的胜负计数 (ImportResult); 分片在进程池中并行"""
+    headers = {path: read_header(path) for path in paths}
+    shards = plan_shards(paths, shard_bytes)
+    result = ImportResult()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(shards) == 1:
+        for done, (path, start, end) in enumerate(shards, 1):
+            result.merge(ImportResult.from_dict(import_shard(path, start, end, headers[path], pool_names, aliases)))
+            if job is not None:
+                job.check_cancelled()
+                job.report_progress(done, len(shards))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(import_shard, path, start, end, headers[path], pool_names, aliases)
+                   for path, start, end in shards]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                result.merge(ImportResult.from_dict(future.result()))
+                if job is not None:
+                    job.check_cancelled()
+                    job.report_progress(done, len(shards))
+        finally:
+            for future in futures:
+                future.cancel()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入比赛结果导出文件并更新对战矩阵")
+    parser.add_argument("exports", nargs="+", help="导出文件 (CSV 或 JSONL)")
+    parser.add_argument("--aliases", default=ALIAS_FILE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-mb", type=int, default=DEFAULT_SHARD_BYTES // (1024 * 1024))
+    parser.add_argument("--counts", default=COUNTS_FILE, help="累计计数文件 (增量更新)")
+    parser.add_argument("--reset", action="store_true", help="忽略已有计数, 只使用本次导入的结果")
+    parser.add_argument("--out", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool_names = [d["name"] for d in load_deck_pool("deck_pool.json", check_icons=False)]
+        result = import_results(args.exports, pool_names, load_aliases(args.aliases), args.workers,
+                                args.shard_mb * 1024 * 1024)
+        fitter = MatchupFitter() if args.reset else load_fitter(args.counts)
+        fitter.update(result.counts, pool_names)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    atomic_write_json(args.counts, fitter.to_dict(), indent=None)
+    write_matrix(args.out, fitter.matrix_data(pool_names))
+    print(result.summary())
+    print(f"累计 {fitter.counts.total_games} 局 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
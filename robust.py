@@ -0,0 +1,291 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from config_cache import load_json_cached, validate_deck_list
+from deck_pool import load_deck_pool
+from matchup import load_matchup_matrix
+from series import PICK_COUNT, PickTable
+from solver import solve_bp
+
+# --- 最坏情况稳健的阵容搜索 (max-min) ---
+# 对我方阵容 M, 最坏对手为使 B/P 均衡胜率 V(M, O) 最小的对方阵容 O; 再在卡组池中寻找最坏情况最好的 M。
+# 剪枝用到两类界:
+#   - 每个 Pick 子博弈的纯策略 maxmin / minmax 是其博弈值的下/上界, 由此得到 V(M, O) 的区间 (无需解线性规划);
+#     区间下界不低于当前最坏值的 O 直接跳过, 区间上界已不高于外层当前最优值的 M 直接淘汰。
+#   - 外层搜索时先用此前找到的最坏对手 ("杀手阵容") 试探新候选, 多数候选在几次求解内即被淘汰。
+# 对方阵容组合数不超过 exhaustive_limit 时穷举 (结果精确), 否则从多个起点做单卡替换的局部搜索 (启发式)。
+
+EXHAUSTIVE_LIMIT = 3000
+DEFAULT_STARTS = 4
+MAX_KILLERS = 16
+
+
+def value_bounds(table):
+    """由各 (Ban, Ban) 子博弈的纯策略界得到 B/P 均衡值的 (下界, 上界)"""
+    lower = -math.inf
+    upper = -math.inf
+    values = table.values
+    rows_by_ban = [table.rows_without(y) for y in range(table.my_size)]
+    for x in range(table.opp_size):
+        cols = table.cols_without(x)
+        low_x = math.inf
+        high_x = math.inf
+        for rows in rows_by_ban:
+            maxmin = max(min(values[i][j] for j in cols) for i in rows)
+            minmax = min(max(values[i][j] for i in rows) for j in cols)
+            low_x = min(low_x, maxmin)
+            high_x = min(high_x, minmax)
+        lower = max(lower, low_x)
+        upper = max(upper, high_x)
+    return lower, upper
+
+
+class WorstCaseSearch:
+    """对给定我方阵容寻找最坏对手; 精确求解结果与杀手阵容在多次查询之间复用"""
+
+    def __init__(self, matrix, pool_names, opp_size, exhaustive_limit=EXHAUSTIVE_LIMIT, starts=DEFAULT_STARTS,
+                 seed=0):
+        self.matrix = matrix
+        self.pool_names = list(pool_names)
+        self.opp_size = opp_size
+        self.exhaustive = math.comb(len(self.pool_names), opp_size) <= exhaustive_limit
+        self.starts = starts
+        self.rng = random.Random(seed)
+        self.values = {}  # (我方阵容, 对方阵容) -> 精确值
+        self.killers = []
+        self.solves = 0
+        self.skipped = 0
+
+    def _key(self, my_names, opp_names):
+        return tuple(sorted(my_names)), tuple(sorted(opp_names))
+
+    def exact(self, my_names, opp_names, table=None):
+        key = self._key(my_names, opp_names)
+        value = self.values.get(key)
+        if value is None:
+            table = table or PickTable(self.matrix.local(key[0], key[1]))
+            value = self.values[key] = solve_bp(table.local, strategies=False, table=table).value
+            self.solves += 1
+        return value
+
+    def _threat_order(self, my_names):
+        """按对我方阵容的平均胜率从高到低排列卡组池"""
+        threat = {d: sum(1.0 - self.matrix.winrate(m, d) for m in my_names) for d in self.pool_names}
+        return sorted(self.pool_names, key=lambda d: -threat[d])
+
+    def _consider(self, my_names, opp_names, best, bound):
+        """
+        评估一个对方阵容: 返回 (值, 是否已低于 bound)。
+        区间下界不低于 best 时不精确求解, 返回 None。
+        """
+        key = self._key(my_names, opp_names)
+        if key in self.values:
+            value = self.values[key]
+            return value, bound is not None and value <= bound
+        table = PickTable(self.matrix.local(key[0], key[1]))
+        lower, upper = value_bounds(table)
+        if bound is not None and upper <= bound:
+            return upper, True
+        if lower >= best:
+            self.skipped += 1
+            return None
+        value = self.exact(my_names, opp_names, table)
+        return value, bound is not None and value <= bound
+
+    def _remember(self, opp_names):
+        opp = tuple(sorted(opp_names))
+        if opp in self.killers:
+            self.killers.remove(opp)
+        self.killers.insert(0, opp)
+        del self.killers[MAX_KILLERS:]
+
+    def worst_case(self, my_names, bound=None):
+        """
+        返回 (最坏值, 最坏对方阵容, 是否被剪枝)。
+        给出 bound 时, 一旦发现不高于 bound 的对手就提前返回 (此时的值只是该阵容最坏值的上界)。
+        """
+        best, best_opp = math.inf, None
+
+        def visit(opp):
+            nonlocal best, best_opp
+            result = self._consider(my_names, opp, best, bound)
+            if result is None:
+                return False
+            value, pruned = result
+            if value < best:
+                best, best_opp = value, tuple(opp)
+            if pruned:
+                self._remember(opp)
+            return pruned
+
+        for opp in list(self.killers):
+            if visit(opp):
+                return best, best_opp, True
+
+        order = self._threat_order(my_names)
+        if self.exhaustive:
+            for opp in itertools.combinations(order, self.opp_size):
+                if visit(opp):
+                    return best, best_opp, True
+        else:
+            starts = [order[:self.opp_size]]
+            head = order[:2 * self.opp_size]
+            starts += [self.rng.sample(head, self.opp_size) for _ in range(self.starts - 1)]
+            for start in starts:
+                current = list(start)
+                if visit(current):
+                    return best, best_opp, True
+                current_value = self.values.get(self._key(my_names, current), math.inf)
+                improved = True
+                while improved:
+                    improved = False
+                    for pos in range(self.opp_size):
+                        for deck in order:
+                            if deck in current:
+                                continue
+                            candidate = current[:pos] + [deck] + current[pos + 1:]
+                            if visit(candidate):
+                                return best, best_opp, True
+                            value = self.values.get(self._key(my_names, candidate))
+                            if value is not None and value < current_value - 1e-12:
+                                current, current_value, improved = candidate, value, True
+                                break
+                        if improved:
+                            break
+
+        if best_opp is not None:
+            self._remember(best_opp)
+        return best, best_opp, False
+
+
+class RobustResult:
+    def __init__(self, lineup, worst_value, worst_opponent, exact, evaluated, pruned, solves):
+        self.lineup = lineup
+        self.worst_value = worst_value
+        self.worst_opponent = worst_opponent
+        self.exact = exact  # 对方阵容是否穷举
+        self.evaluated = evaluated  # 评估过的我方阵容数
+        self.pruned = pruned  # 其中被剪枝淘汰的数量
+        self.solves = solves  # 精确求解的次数
+
+    def summary(self):
+        note = "穷举" if self.exact else "局部搜索"
+        return (f"我方阵容: {' / '.join(self.lineup)}\n"
+                f"最坏情况胜率: {self.worst_value:.2%} ({note})\n"
+                f"最坏对手: {' / '.join(self.worst_opponent)}\n"
+                f"评估 {self.evaluated} 套阵容, 剪枝 {self.pruned} 套, 精确求解 {self.solves} 次")
+
+
+# --- 外层: 我方阵容的局部搜索 ---
+
+_SEARCH = None
+
+
+def _evaluate_candidate(matrix, pool_names, opp_size, exhaustive_limit, seed, lineup, bound, killers):
+    """工作进程入口: 带 bound 评估一个我方候选阵容; 搜索对象在同一进程的多次调用之间复用"""
+    global _SEARCH
+    key = (matrix.version, tuple(pool_names), opp_size, exhaustive_limit)
+    if _SEARCH is None or _SEARCH[0] != key:
+        _SEARCH = (key, WorstCaseSearch(matrix, pool_names, opp_size, exhaustive_limit, seed=seed))
+    search = _SEARCH[1]
+    for opp in reversed(killers):
+        search._remember(opp)
+    solves = search.solves
+    value, opp, pruned = search.worst_case(lineup, bound)
+    return lineup, value, opp, pruned, search.solves - solves
+
+
+def robust_lineup(matrix, pool_names, my_names, opp_size=6, optimize=True, exhaustive_limit=EXHAUSTIVE_LIMIT,
+                  seed=0, workers=1, max_rounds=50, job=None):
+    """
+    从 my_names 出发, 逐轮尝试把我方阵容中的一套换成卡组池中的另一套, 保留最坏情况胜率最高的阵容。
+    optimize=False 时只计算 my_names 的最坏对手。workers > 1 时同一轮的候选在进程池中并行评估。
+    """
+    pool_names = list(pool_names)
+    if len(my_names) <= PICK_COUNT:
+        raise ValueError(f"我方阵容至少需要 {PICK_COUNT + 1} 套卡组 (当前 {len(my_names)} 套)")
+    if not PICK_COUNT < opp_size <= len(pool_names):
+        raise ValueError(f"对方阵容卡组数应在 {PICK_COUNT + 1}-{len(pool_names)} 之间")
+    search = WorstCaseSearch(matrix, pool_names, opp_size, exhaustive_limit, seed=seed)
+    best_lineup = list(my_names)
+    best_value, best_opp, _ = search.worst_case(best_lineup)
+    evaluated, pruned, solves = 1, 0, search.solves
+    if not optimize:
+        return RobustResult(best_lineup, best_value, best_opp, search.exhaustive, evaluated, pruned, solves)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        for round_index in range(max_rounds):
+            candidates = [best_lineup[:pos] + [deck] + best_lineup[pos + 1:]
+                          for pos in range(len(best_lineup)) for deck in pool_names if deck not in best_lineup]
+            improved = None
+            if pool is None:
+                for done, lineup in enumerate(candidates, 1):
+                    value, opp, was_pruned = search.worst_case(lineup, best_value)
+                    evaluated += 1
+                    pruned += was_pruned
+                    if not was_pruned and value > best_value:
+                        best_value, best_opp, improved = value, opp, lineup
+                    if job is not None:
+                        job.check_cancelled()
+                        job.report_progress(done, len(candidates), f"第 {round_index + 1} 轮")
+                solves = search.solves
+            else:
+                killers = list(search.killers)
+                futures = [pool.submit(_evaluate_candidate, matrix, pool_names, opp_size, exhaustive_limit, seed,
+                                       lineup, best_value, killers) for lineup in candidates]
+                for done, future in enumerate(futures, 1):
+                    lineup, value, opp, was_pruned, used = future.result()
+                    evaluated += 1
+                    pruned += was_pruned
+                    solves += used
+                    if opp is not None:
+                        search._remember(opp)
+                    if not was_pruned and value > best_value:
+                        best_value, best_opp, improved = value, opp, lineup
+                    if job is not None:
+                        job.check_cancelled()
+                        job.report_progress(done, len(candidates), f"第 {round_index + 1} 轮")
+            if improved is None:
+                break
+            best_lineup = improved
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return RobustResult(best_lineup, best_value, best_opp, search.exhaustive, evaluated, pruned, solves)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="最坏情况稳健的阵容搜索")
+    parser.add_argument("--my", nargs="*", default=None, help="我方阵容 (默认读取 my_decks.json)")
+    parser.add_argument("--opp-size", type=int, default=6, help="对方阵容卡组数 (与界面滑块一致, 4-6)")
+    parser.add_argument("--no-optimize", action="store_true", help="只计算当前阵容的最坏对手")
+    parser.add_argument("--exhaustive-limit", type=int, default=EXHAUSTIVE_LIMIT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool_names = [d["name"] for d in load_deck_pool("deck_pool.json", check_icons=False)]
+        my_names = args.my or [d["name"] for d in load_json_cached("my_decks.json", validate_deck_list)]
+        matrix = load_matchup_matrix(args.matrix, pool_names)
+        result = robust_lineup(matrix, pool_names, my_names, args.opp_size, not args.no_optimize,
+                               args.exhaustive_limit, args.seed, args.workers)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
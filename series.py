@@ -0,0 +1,69 @@
+import itertools
+
+# --- 系列赛胜率 ---
+# 双方各出战 3 套卡组, 随机 1v1 配对 (与 display_random_matchups 一致), 各打一局, 先赢 2 局者胜。
+
+PICK_COUNT = 3
+_PERMUTATIONS = list(itertools.permutations(range(PICK_COUNT)))
+
+
+def series_win_prob(p1, p2, p3):
+    """三局中至少赢两局的概率"""
+    return p1 * p2 + p1 * p3 + p2 * p3 - 2.0 * p1 * p2 * p3
+
+
+def pairing_series_prob(local, my_triple, opp_triple):
+    """按给定配对 (my_triple[k] 对 opp_triple[k]) 计算系列赛胜率; local 为阵容间胜率子矩阵"""
+    a, b, c = my_triple
+    x, y, z = opp_triple
+    return series_win_prob(local[a][x], local[b][y], local[c][z])
+
+
+def lineup_series_prob(local, my_triple, opp_triple):
+    """随机配对下的系列赛胜率 (6 种配对的平均)"""
+    a, b, c = my_triple
+    ra, rb, rc = local[a], local[b], local[c]
+    total = 0.0
+    for i, j, k in _PERMUTATIONS:
+        total += series_win_prob(ra[opp_triple[i]], rb[opp_triple[j]], rc[opp_triple[k]])
+    return total / len(_PERMUTATIONS)
+
+
+def triple_mask(triple):
+    mask = 0
+    for pos in triple:
+        mask |= 1 << pos
+    return mask
+
+
+class PickTable:
+    """
+    一次性计算两套完整阵容之间所有出战组合的系列赛胜率。
+    之后任意 Ban 组合下的 Pick 子博弈都只是这张表的行列筛选, 无需重新计算。
+    """
+
+    def __init__(self, local):
+        self.local = local
+        self.my_size = len(local)
+        self.opp_size = len(local[0]) if local else 0
+        self.my_triples = list(itertools.combinations(range(self.my_size), PICK_COUNT))
+        self.opp_triples = list(itertools.combinations(range(self.opp_size), PICK_COUNT))
+        self.my_masks = [triple_mask(t) for t in self.my_triples]
+        self.opp_masks = [triple_mask(t) for t in self.opp_triples]
+        self.values = [[lineup_series_prob(local, a, b) for b in self.opp_triples] for a in self.my_triples]
+
+    def rows_without(self, my_ban):
+        """不含被Ban卡组 (位置 my_ban, None 表示不Ban) 的我方组合序号"""
+        if my_ban is None:
+            return list(range(len(self.my_triples)))
+        bit = 1 << my_ban
+        return [i for i, m in enumerate(self.my_masks) if not m & bit]
+
+    def cols_without(self, opp_ban):
+        if opp_ban is None:
+            return list(range(len(self.opp_triples)))
+        bit = 1 << opp_ban
+        return [j for j, m in enumerate(self.opp_masks) if not m & bit]
+
+    def submatrix(self, rows, cols):
+        return [[self.values[i][j] for j in cols] for i in rows]
@@ -0,0 +1,302 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from config_cache import load_json_cached, validate_deck_list, atomic_write_json
+from deck_pool import load_deck_pool
+from matchup import load_matchup_matrix
+from series import PICK_COUNT, series_win_prob
+from stats import RunningStats, Histogram, DeckCounters
+
+# --- 批量对局模拟 ---
+# 流程与界面一致: 随机生成对方阵容 -> 双方各 Ban 1 套 -> 各选 3 套 -> 随机 1v1 配对, 三局两胜。
+# 结果只进入流式统计 (SimulationResult), 内存占用与模拟局数无关; 分块在多进程中运行并定期写盘。
+
+DEFAULT_CHUNK = 20000
+FLUSH_INTERVAL = 30.0  # 秒
+
+
+class SimulationConfig:
+    """一次模拟的固定输入 (会被传给工作进程, 须可 pickle)"""
+
+    def __init__(self, matrix, my_names, pool_names, opp_count=6):
+        self.matrix = matrix
+        self.my_names = list(my_names)
+        self.pool_names = list(pool_names)
+        self.opp_count = opp_count
+
+    def fingerprint(self):
+        """用于校验断点文件是否属于同一组输入"""
+        return "|".join([self.matrix.version, ",".join(self.my_names), ",".join(self.pool_names),
+                         str(self.opp_count)])
+
+
+class SimulationResult:
+    """
+    series: 系列赛胜负 (1/0) 的均值方差
+    win_prob: 给定双方出战与配对后, 系列赛胜率的分布
+    games_won: 每个系列赛我方赢下的局数 (0-3)
+    my_decks / opp_decks: 按卡组累计的 Ban/Pick/胜场
+    """
+
+    def __init__(self):
+        self.series = RunningStats()
+        self.win_prob = Histogram(0.0, 1.0, 20)
+        self.games_won = Histogram(0, PICK_COUNT + 1, PICK_COUNT + 1)
+        self.my_decks = DeckCounters()
+        self.opp_decks = DeckCounters()
+
+    def merge(self, other):
+        self.series.merge(other.series)
+        self.win_prob.merge(other.win_prob)
+        self.games_won.merge(other.games_won)
+        self.my_decks.merge(other.my_decks)
+        self.opp_decks.merge(other.opp_decks)
+        return self
+
+    def to_dict(self):
+        return {"series": self.series.to_dict(), "win_prob": self.win_prob.to_dict(),
+                "games_won": self.games_won.to_dict(), "my_decks": self.my_decks.to_dict(),
+                "opp_decks": self.opp_decks.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls()
+        result.series = RunningStats.from_dict(data["series"])
+        result.win_prob = Histogram.from_dict(data["win_prob"])
+        result.games_won = Histogram.from_dict(data["games_won"])
+        result.my_decks = DeckCounters.from_dict(data["my_decks"])
+        result.opp_decks = DeckCounters.from_dict(data["opp_decks"])
+        return result
+
+    def summary(self):
+        s = self.series
+        if not s.count:
+            return "尚无结果"
+        return (f"{s.count} 局系列赛, 胜率 {s.mean:.2%} ± {1.96 * s.stderr:.2%}, "
+                f"单系列胜率中位数 {self.win_prob.quantile(0.5):.1%}")
+
+
+def play_series(config, rng, opp_lineup=None, uniforms=None):
+    """
+    模拟一次完整的 B/P 与系列赛 (双方均按随机 AI 行动)。
+    opp_lineup / uniforms (三局的均匀随机数) 可由外部给出, 用于公共随机数比较 (见 SeriesDraws)。
+    返回 (对方阵容, 我方被Ban, 对方被Ban, 我方出战, 对方出战, 各局胜率, 各局胜负), 出战按配对顺序排列。
+    """
+    winrate = config.matrix.winrate
+    my_lineup = config.my_names
+    if opp_lineup is None:
+        opp_lineup = rng.sample(config.pool_names, config.opp_count)
+
+    opp_ban = rng.randrange(len(opp_lineup))
+    my_ban = rng.randrange(len(my_lineup))
+    my_picks = rng.sample([d for i, d in enumerate(my_lineup) if i != my_ban], PICK_COUNT)
+    opp_picks = rng.sample([d for i, d in enumerate(opp_lineup) if i != opp_ban], PICK_COUNT)
+    # rng.sample 的结果已是随机顺序, 直接按位置配对即等价于界面上的 shuffle
+
+    probs = [winrate(a, b) for a, b in zip(my_picks, opp_picks)]
+    if uniforms is None:
+        uniforms = [rng.random() for _ in probs]
+    wins = [u < p for u, p in zip(uniforms, probs)]
+    return opp_lineup, my_lineup[my_ban], opp_lineup[opp_ban], my_picks, opp_picks, probs, wins
+
+
+def record_series(result, outcome):
+    """把一次系列赛的结果累加到 result"""
+    _, my_banned, opp_banned, my_picks, opp_picks, probs, wins = outcome
+    won = sum(wins) * 2 > PICK_COUNT
+
+    result.series.add(1.0 if won else 0.0)
+    result.win_prob.add(series_win_prob(*probs))
+    result.games_won.add(sum(wins))
+    result.my_decks.add(my_banned, banned=1)
+    result.opp_decks.add(opp_banned, banned=1)
+    for deck, w in zip(my_picks, wins):
+        result.my_decks.add(deck, picked=1, series_won=int(won), games=1, games_won=int(w))
+    for deck, w in zip(opp_picks, wins):
+        result.opp_decks.add(deck, picked=1, series_won=int(not won), games=1, games_won=int(not w))
+
+
+def series_won(outcome):
+    return sum(outcome[-1]) * 2 > PICK_COUNT
+
+
+def chunk_rng(seed, chunk_index):
+    """每个分块独立、可复现的随机数流, 与分块在哪个进程、以什么顺序运行无关"""
+    return random.Random(f"{seed}:{chunk_index}")
+
+
+class SeriesDraws:
+    """
+    公共随机数: 第 i 次系列赛的随机输入只取决于 (seed, i), 不同候选取同一个 i 时面对相同的
+    对方阵容、相同的 Ban/Pick/配对随机数和相同的每局随机数, 比较时噪声大部分相互抵消。
+    stratified: 对方阵容分层抽样, 每轮把资源池随机排列后切成若干阵容, 各卡组出现次数均衡。
+    antithetic: 相邻两次 (2k, 2k+1) 使用同一阵容与行动随机数, 每局随机数取 u 与 1-u。
+    """
+
+    def __init__(self, pool_names, opp_count, seed=0, stratified=False, antithetic=False):
+        self.pool_names = list(pool_names)
+        self.opp_count = opp_count
+        self.seed = seed
+        self.stratified = stratified
+        self.antithetic = antithetic
+        self.per_block = max(1, len(self.pool_names) // opp_count)
+        self._block = (None, None)
+
+    def _stratified_lineup(self, k):
+        block, slot = divmod(k, self.per_block)
+        if self._block[0] != block:
+            order = list(self.pool_names)
+            random.Random(f"{self.seed}:block:{block}").shuffle(order)
+            self._block = (block, order)
+        order = self._block[1]
+        return order[slot * self.opp_count:(slot + 1) * self.opp_count]
+
+    def draw(self, i):
+        """返回 (行动随机数生成器, 对方阵容, 三局的均匀随机数)"""
+        k, mirrored = divmod(i, 2) if self.antithetic else (i, 0)
+        rng = random.Random(f"{self.seed}:draw:{k}")
+        uniforms = [rng.random() for _ in range(PICK_COUNT)]
+        if mirrored:
+            uniforms = [1.0 - u for u in uniforms]
+        if self.stratified:
+            opp_lineup = self._stratified_lineup(k)
+        else:
+            opp_lineup = rng.sample(self.pool_names, self.opp_count)
+        return rng, opp_lineup, uniforms
+
+
+def run_chunk(config, seed, chunk_index, count):
+    """工作进程入口: 模拟一个分块, 返回可合并的统计 (dict)"""
+    rng = chunk_rng(seed, chunk_index)
+    result = SimulationResult()
+    for _ in range(count):
+        record_series(result, play_series(config, rng))
+    return result.to_dict()
+
+
+def _load_checkpoint(path, header):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("header") != header:
+        return None
+    return SimulationResult.from_dict(data["result"]), set(data["done_chunks"])
+
+
+def _save_checkpoint(path, header, result, done_chunks):
+    atomic_write_json(path, {"header": header, "done_chunks": sorted(done_chunks), "result": result.to_dict()},
+                      indent=None)
+
+
+def run_simulation(config, total, seed=0, chunk_size=DEFAULT_CHUNK, workers=None, checkpoint=None,
+                   flush_interval=FLUSH_INTERVAL, job=None):
+    """
+    模拟 total 次系列赛。分块在进程池中运行 (同时在途的分块数有上限), 结果按完成顺序合并;
+    给出 checkpoint 时每隔 flush_interval 秒写盘, 再次运行相同参数时从断点继续。
+    job 为 jobs.Job 时汇报进度并响应取消。
+    """
+    if total < 0 or chunk_size < 1:
+        raise ValueError("系列赛数不能为负, 分块大小至少为 1")
+    chunk_count = (total + chunk_size - 1) // chunk_size
+    sizes = [min(chunk_size, total - i * chunk_size) for i in range(chunk_count)]
+    header = {"fingerprint": config.fingerprint(), "seed": seed, "chunk_size": chunk_size, "total": total}
+
+    result, done_chunks = SimulationResult(), set()
+    if checkpoint:
+        restored = _load_checkpoint(checkpoint, header)
+        if restored:
+            result, done_chunks = restored
+    pending = [i for i in range(chunk_count) if i not in done_chunks]
+
+    last_flush = time.monotonic()
+
+    def finish_chunk(index, data):
+        nonlocal last_flush
+        result.merge(SimulationResult.from_dict(data))
+        done_chunks.add(index)
+        if job is not None:
+            job.report_progress(len(done_chunks), chunk_count, result.summary())
+        if checkpoint and time.monotonic() - last_flush >= flush_interval:
+            _save_checkpoint(checkpoint, header, result, done_chunks)
+            last_flush = time.monotonic()
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for index in pending:
+            finish_chunk(index, run_chunk(config, seed, index, sizes[index]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            queue = iter(pending)
+            in_flight = {}
+            try:
+                while True:
+                    while len(in_flight) < workers * 2:
+                        index = next(queue, None)
+                        if index is None:
+                            break
+                        in_flight[pool.submit(run_chunk, config, seed, index, sizes[index])] = index
+                    if not in_flight:
+                        break
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        finish_chunk(in_flight.pop(future), future.result())
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    if checkpoint:
+        _save_checkpoint(checkpoint, header, result, done_chunks)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量模拟 B/P 对局 (双方随机AI)")
+    parser.add_argument("--series", type=int, default=100000, help="模拟的系列赛数")
+    parser.add_argument("--opp-count", type=int, default=6, help="对方阵容卡组数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="每个分块的系列赛数")
+    parser.add_argument("--checkpoint", default=None, help="断点文件 (定期写入, 可续跑)")
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = load_deck_pool("deck_pool.json", check_icons=False)
+        my_decks = load_json_cached("my_decks.json", validate_deck_list)
+        matrix = load_matchup_matrix(args.matrix)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: 读取配置失败: {e}", file=sys.stderr)
+        return 1
+
+    if len(my_decks) <= PICK_COUNT:
+        print(f"错误: 我方阵容至少需要 {PICK_COUNT + 1} 套卡组 (当前 {len(my_decks)} 套)", file=sys.stderr)
+        return 1
+    if not PICK_COUNT < args.opp_count <= len(pool):
+        print(f"错误: 对方阵容卡组数应在 {PICK_COUNT + 1}-{len(pool)} 之间", file=sys.stderr)
+        return 1
+
+    config = SimulationConfig(matrix, [d["name"] for d in my_decks], [d["name"] for d in pool], args.opp_count)
+    try:
+        result = run_simulation(config, args.series, seed=args.seed, chunk_size=args.chunk, workers=args.workers,
+                                checkpoint=args.checkpoint)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(result.summary())
+    for name in config.my_names:
+        c = result.my_decks.get(name)
+        rate = c["games_won"] / c["games"] if c["games"] else 0.0
+        print(f"  {name}: 被Ban {c['banned']}, 出战 {c['picked']}, 单局胜率 {rate:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
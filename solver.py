@@ -0,0 +1,143 @@
+from series import PickTable
+
+# --- B/P 求解 ---
+# 对局流程与界面一致: 我方先 Ban 对方 1 套, 对方看到后 Ban 我方 1 套,
+# 之后双方同时 (互不可见) 各选 3 套出战。Pick 阶段是零和矩阵博弈, 用单纯形法精确求解;
+# Ban 阶段对方是后手, 取最小值即可。
+
+EPS = 1e-12
+
+
+def _pivot(tableau, objective, basis, row, col):
+    pivot_row = tableau[row]
+    pv = pivot_row[col]
+    pivot_row = [v / pv for v in pivot_row]
+    tableau[row] = pivot_row
+    for i, r in enumerate(tableau):
+        if i != row:
+            f = r[col]
+            if f != 0.0:
+                tableau[i] = [a - f * b for a, b in zip(r, pivot_row)]
+    f = objective[col]
+    objective[:] = [a - f * b for a, b in zip(objective, pivot_row)]
+    basis[row] = col
+
+
+def _pure_solution(payoff):
+    """有鞍点时直接返回纯策略解, 否则返回 None"""
+    row_mins = [min(r) for r in payoff]
+    best_row = max(range(len(payoff)), key=row_mins.__getitem__)
+    n = len(payoff[0])
+    col_maxs = [max(r[j] for r in payoff) for j in range(n)]
+    best_col = min(range(n), key=col_maxs.__getitem__)
+    if row_mins[best_row] < col_maxs[best_col] - EPS:
+        return None
+    row_strategy = [0.0] * len(payoff)
+    col_strategy = [0.0] * n
+    row_strategy[best_row] = 1.0
+    col_strategy[best_col] = 1.0
+    return payoff[best_row][best_col], row_strategy, col_strategy
+
+
+def solve_matrix_game(payoff):
+    """
+    求解零和矩阵博弈 (行玩家最大化), 返回 (博弈值, 行玩家混合策略, 列玩家混合策略)。
+    把收益平移为正数后, 对列玩家的线性规划 max Σy s.t. Ay ≤ 1 用单纯形法 (Bland 规则) 求解,
+    行玩家策略取自最终单纯形表中松弛变量的检验数。
+    """
+    pure = _pure_solution(payoff)
+    if pure is not None:
+        return pure
+
+    m = len(payoff)
+    n = len(payoff[0])
+    shift = 1.0 - min(min(r) for r in payoff)
+    tableau = [[v + shift for v in payoff[i]] + [1.0 if k == i else 0.0 for k in range(m)] + [1.0]
+               for i in range(m)]
+    objective = [-1.0] * n + [0.0] * (m + 1)
+    basis = [n + i for i in range(m)]
+
+    while True:
+        col = next((j for j in range(n + m) if objective[j] < -EPS), None)
+        if col is None:
+            break
+        row = None
+        best_ratio = 0.0
+        for i in range(m):
+            a = tableau[i][col]
+            if a > EPS:
+                ratio = tableau[i][-1] / a
+                if row is None or ratio < best_ratio - EPS or (ratio <= best_ratio + EPS and basis[i] < basis[row]):
+                    row, best_ratio = i, ratio
+        _pivot(tableau, objective, basis, row, col)
+
+    total = objective[-1]
+    col_strategy = [0.0] * n
+    for i, b in enumerate(basis):
+        if b < n:
+            col_strategy[b] = tableau[i][-1] / total
+    row_strategy = [max(objective[n + i], 0.0) / total for i in range(m)]
+    return 1.0 / total - shift, row_strategy, col_strategy
+
+
+class BPSolution:
+    """
+    一组对局 (我方阵容 vs 对方阵容) 的 B/P 求解结果, 卡组用阵容内的位置表示。
+    pick_values[x][y]: 我方 Ban 对方位置 x、对方 Ban 我方位置 y 后, Pick 子博弈的系列赛胜率。
+    pick_strategies[(x, y)]: (我方 [(组合, 概率)], 对方 [(组合, 概率)]), 只保留概率大于 0 的组合。
+    """
+
+    def __init__(self, pick_values, pick_strategies=None):
+        self.pick_values = pick_values
+        self.pick_strategies = pick_strategies or {}
+        self.opp_size = len(pick_values)
+        self.my_size = len(pick_values[0]) if pick_values else 0
+
+        self.opp_ban_replies = [min(range(self.my_size), key=row.__getitem__) for row in pick_values]
+        self.ban_values = [row[y] for row, y in zip(pick_values, self.opp_ban_replies)]
+        self.best_ban = max(range(self.opp_size), key=self.ban_values.__getitem__)
+        self.value = self.ban_values[self.best_ban]
+
+    def to_dict(self):
+        return {
+            "pick_values": self.pick_values,
+            "pick_strategies": [[x, y, [[list(t), p] for t, p in mine], [[list(t), p] for t, p in theirs]]
+                                for (x, y), (mine, theirs) in self.pick_strategies.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        strategies = {}
+        for x, y, mine, theirs in data.get("pick_strategies", []):
+            strategies[(x, y)] = ([(tuple(t), p) for t, p in mine], [(tuple(t), p) for t, p in theirs])
+        return cls(data["pick_values"], strategies)
+
+
+def _support(triples, indices, probs):
+    return [(triples[i], p) for i, p in zip(indices, probs) if p > EPS]
+
+
+def solve_bp(local, strategies=True, table=None):
+    """
+    求解一组对局; local 为阵容间单局胜率子矩阵 (行为我方)。
+    所有出战组合的胜率只在 PickTable 中计算一次, 各 Ban 组合只是对这张表取子矩阵。
+    """
+    table = table or PickTable(local)
+    my_size, opp_size = table.my_size, table.opp_size
+    rows_by_ban = [table.rows_without(y) for y in range(my_size)]
+
+    pick_values = []
+    pick_strategies = {}
+    for x in range(opp_size):
+        cols = table.cols_without(x)
+        row_values = []
+        for y in range(my_size):
+            rows = rows_by_ban[y]
+            value, row_probs, col_probs = solve_matrix_game(table.submatrix(rows, cols))
+            row_values.append(value)
+            if strategies:
+                pick_strategies[(x, y)] = (_support(table.my_triples, rows, row_probs),
+                                           _support(table.opp_triples, cols, col_probs))
+        pick_values.append(row_values)
+
+    return BPSolution(pick_values, pick_strategies)
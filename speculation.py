@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# --- AI 应对的预计算 ---
+
+
+class SpeculativeAI:
+    """
+    在玩家思考时, 于后台线程池中预先计算 AI 对玩家每一种可能操作的应对。
+    结果按状态键缓存, 玩家真正操作后直接取出; 撤回/重置时取消过期的任务。
+    AI 函数会在工作线程中调用, 只能使用传入的参数, 不能操作界面组件。
+    """
+
+    def __init__(self, executor=None, max_workers=2):
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers,
+                                                       thread_name_prefix="ai-speculate")
+        self.futures = {}  # 状态键 -> Future
+
+    def speculate(self, key, fn, *args):
+        """为某个状态提交预计算 (已提交过的状态不重复计算)"""
+        if key not in self.futures:
+            self.futures[key] = self.executor.submit(fn, *args)
+
+    def result(self, key, fn, *args):
+        """取出预计算结果; 没有预计算或计算失败时在当前线程同步计算"""
+        future = self.futures.get(key)
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                pass
+        return fn(*args)
+
+    def retain(self, keep):
+        """只保留 keep(key) 为真的状态, 其余任务取消并丢弃"""
+        for key in [k for k in self.futures if not keep(k)]:
+            self.futures.pop(key).cancel()
+
+    def cancel_all(self):
+        self.retain(lambda key: False)
@@ -0,0 +1,58 @@
+import importlib
+import os
+import sys
+import time
+
+# --- 启动耗时统计 & 延迟导入 ---
+
+_PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """记录启动各阶段耗时, 用于输出启动报告"""
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = bool(os.environ.get("BP_PROFILE_STARTUP")) or "--profile-startup" in sys.argv
+        self.enabled = enabled
+        self.start = _PROCESS_START
+        self.last = self.start
+        self.marks = []
+
+    def mark(self, label):
+        """记录从上一个标记到现在的耗时"""
+        now = time.perf_counter()
+        self.marks.append((label, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.start
+
+    def report(self):
+        lines = ["启动耗时报告:"]
+        for label, seconds in self.marks:
+            lines.append(f"  {label:<16} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'合计':<16} {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def finish(self, label="首次绘制"):
+        """记录最后一个阶段, 开启统计时输出报告"""
+        self.mark(label)
+        if self.enabled:
+            print(self.report(), file=sys.stderr)
+
+
+class LazyModule:
+    """首次访问属性时才真正导入模块"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
@@ -0,0 +1,188 @@
+import math
+
+# --- 流式统计 ---
+# 大规模模拟不保存逐局结果, 只维护固定大小的累计量; 各工作进程的结果可以合并, 也可以序列化后写盘。
+
+
+class RunningStats:
+    """在线均值/方差 (Welford), 合并用 Chan 等人的并行公式"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """样本方差"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stderr(self):
+        return math.sqrt(self.variance / self.count) if self.count > 1 else math.inf
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        if stats.count:
+            stats.min, stats.max = data["min"], data["max"]
+        return stats
+
+
+class Histogram:
+    """[lo, hi) 上的等宽直方图, 越界值计入两端的 underflow/overflow; 另记录精确的最小/最大值"""
+
+    def __init__(self, lo=0.0, hi=1.0, bins=20):
+        self.lo = lo
+        self.hi = hi
+        self.bins = bins
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._scale = bins / (hi - lo)
+
+    def add(self, x, weight=1):
+        if weight:
+            if x < self.min:
+                self.min = x
+            if x > self.max:
+                self.max = x
+        if x < self.lo:
+            self.underflow += weight
+        elif x >= self.hi:
+            # 上端点并入最后一格 (胜率 100% 等)
+            if x == self.hi:
+                self.counts[-1] += weight
+            else:
+                self.overflow += weight
+        else:
+            self.counts[int((x - self.lo) * self._scale)] += weight
+
+    def merge(self, other):
+        if (other.lo, other.hi, other.bins) != (self.lo, self.hi, self.bins):
+            raise ValueError("直方图的区间或分格数不一致, 无法合并")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def total(self):
+        return sum(self.counts) + self.underflow + self.overflow
+
+    def edges(self):
+        width = (self.hi - self.lo) / self.bins
+        return [self.lo + i * width for i in range(self.bins + 1)]
+
+    def quantile(self, q):
+        """按格内均匀分布估计分位数, 结果限制在实际出现过的 [最小值, 最大值] 内 (全部样本相同时即为该值)"""
+        if not self.total:
+            return self.lo
+        return min(max(self._interpolate(q), self.min), self.max)
+
+    def _interpolate(self, q):
+        target = q * self.total
+        seen = self.underflow
+        if target <= seen:
+            return self.lo
+        width = (self.hi - self.lo) / self.bins
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= target:
+                return self.lo + (i + (target - seen) / c) * width
+            seen += c
+        return self.hi
+
+    def to_dict(self):
+        return {"lo": self.lo, "hi": self.hi, "bins": self.bins, "counts": self.counts,
+                "underflow": self.underflow, "overflow": self.overflow,
+                "min": self.min if self.total else None, "max": self.max if self.total else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data["lo"], data["hi"], data["bins"])
+        hist.counts = list(data["counts"])
+        hist.underflow, hist.overflow = data["underflow"], data["overflow"]
+        if hist.total:
+            # 旧版断点文件没有 min/max, 退回区间端点 (不限制)
+            hist.min = data["min"] if data.get("min") is not None else hist.lo
+            hist.max = data["max"] if data.get("max") is not None else hist.hi
+        return hist
+
+
+class DeckCounters:
+    """按卡组名称累计的计数 (字段固定, 内存只与卡组数有关)"""
+
+    FIELDS = ("banned", "picked", "series_won", "games", "games_won")
+
+    def __init__(self):
+        self.counts = {}  # name -> [banned, picked, series_won, games, games_won]
+
+    def _row(self, name):
+        row = self.counts.get(name)
+        if row is None:
+            row = self.counts[name] = [0] * len(self.FIELDS)
+        return row
+
+    def add(self, name, banned=0, picked=0, series_won=0, games=0, games_won=0):
+        row = self._row(name)
+        row[0] += banned
+        row[1] += picked
+        row[2] += series_won
+        row[3] += games
+        row[4] += games_won
+
+    def merge(self, other):
+        for name, counts in other.counts.items():
+            row = self._row(name)
+            for i, c in enumerate(counts):
+                row[i] += c
+        return self
+
+    def get(self, name):
+        return dict(zip(self.FIELDS, self.counts.get(name, [0] * len(self.FIELDS))))
+
+    def to_dict(self):
+        return {name: list(row) for name, row in self.counts.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        counters = cls()
+        counters.counts = {name: list(row) for name, row in data.items()}
+        return counters
@@ -0,0 +1,201 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+from series import PICK_COUNT
+from symmetry import solve_bp_symmetric
+
+# --- AI 策略插件 ---
+# 策略按名称注册 (@register_strategy), 每次调用处理一批决策状态 (StateBatch), 返回等长的决策列表:
+#   ban(rng, batch)  -> 每个状态要 Ban 的对方卡组位置
+#   pick(rng, batch) -> 每个状态己方出战卡组的位掩码 (PICK_COUNT 位)
+# 状态只包含胜率子矩阵与位掩码, 与界面组件无关; 界面以大小为 1 的批次调用, 模拟/联赛一次传入整块。
+# rng 为 random.Random 实例或 random 模块。
+# 可选实现 ban_policy(batch) / pick_policy(batch), 返回每个状态的决策概率分布 ({位置或位掩码: 概率}),
+# 供 exploitability 精确计算最优反制; 未实现时由采样估计。
+
+
+def positions_mask(positions):
+    mask = 0
+    for pos in positions:
+        mask |= 1 << pos
+    return mask
+
+
+def mask_positions(mask):
+    positions = []
+    pos = 0
+    while mask:
+        if mask & 1:
+            positions.append(pos)
+        mask >>= 1
+        pos += 1
+    return positions
+
+
+def enemy_view(local):
+    """对方视角的胜率子矩阵 (转置并取 1 - p)"""
+    return [[1.0 - local[i][j] for i in range(len(local))] for j in range(len(local[0]))]
+
+
+class StateBatch:
+    """
+    一批决策状态, 各字段为等长列表:
+    locals[k]: 己方视角的胜率子矩阵 (行为己方阵容, 列为对方阵容)
+    own_available[k] / enemy_available[k]: 双方未被 Ban 的卡组位掩码
+    keys[k]: 标识该组对局的可哈希值 (例如双方阵容的卡组序号), 相同 key 的状态共享求解结果
+    """
+
+    def __init__(self, locals, own_available, enemy_available, keys=None):
+        self.locals = locals
+        self.own_available = own_available
+        self.enemy_available = enemy_available
+        self.keys = keys if keys is not None else [tuple(map(tuple, local)) for local in locals]
+
+    def __len__(self):
+        return len(self.locals)
+
+    def own_banned(self, k):
+        """己方被 Ban 的位置 (尚未被 Ban 时为 None)"""
+        missing = mask_positions(((1 << len(self.locals[k])) - 1) & ~self.own_available[k])
+        return missing[0] if missing else None
+
+    def enemy_banned(self, k):
+        missing = mask_positions(((1 << len(self.locals[k][0])) - 1) & ~self.enemy_available[k])
+        return missing[0] if missing else None
+
+
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    """类装饰器: 以 name 注册策略"""
+    def decorator(cls):
+        cls.name = name
+        STRATEGIES[name] = cls
+        return cls
+    return decorator
+
+
+def create_strategy(name):
+    try:
+        return STRATEGIES[name]()
+    except KeyError:
+        raise ValueError(f"未知的AI策略: {name}") from None
+
+
+@register_strategy("random")
+class RandomStrategy:
+    """与原有 ai_logic_ban / ai_logic_pick 相同: 均匀随机"""
+
+    def ban(self, rng, batch):
+        return [rng.choice(mask_positions(m)) for m in batch.enemy_available]
+
+    def pick(self, rng, batch):
+        return [positions_mask(rng.sample(mask_positions(m), PICK_COUNT)) for m in batch.own_available]
+
+    def ban_policy(self, batch):
+        policies = []
+        for m in batch.enemy_available:
+            positions = mask_positions(m)
+            policies.append({pos: 1.0 / len(positions) for pos in positions})
+        return policies
+
+    def pick_policy(self, batch):
+        policies = []
+        for m in batch.own_available:
+            triples = list(itertools.combinations(mask_positions(m), PICK_COUNT))
+            policies.append({positions_mask(t): 1.0 / len(triples) for t in triples})
+        return policies
+
+
+@register_strategy("greedy")
+class GreedyStrategy:
+    """Ban 掉对己方平均威胁最大的卡组, 选出对对方剩余卡组平均胜率最高的 3 套"""
+
+    def ban(self, rng, batch):
+        decisions = []
+        for local, own, enemy in zip(batch.locals, batch.own_available, batch.enemy_available):
+            rows = [local[i] for i in mask_positions(own)]
+            decisions.append(max(mask_positions(enemy), key=lambda j: sum(1.0 - row[j] for row in rows)))
+        return decisions
+
+    def pick(self, rng, batch):
+        decisions = []
+        for local, own, enemy in zip(batch.locals, batch.own_available, batch.enemy_available):
+            cols = mask_positions(enemy)
+            ranked = sorted(mask_positions(own), key=lambda i: -sum(local[i][j] for j in cols))
+            decisions.append(positions_mask(ranked[:PICK_COUNT]))
+        return decisions
+
+    def ban_policy(self, batch):
+        return [{pos: 1.0} for pos in self.ban(None, batch)]
+
+    def pick_policy(self, batch):
+        return [{mask: 1.0} for mask in self.pick(None, batch)]
+
+
+@register_strategy("nash")
+class NashStrategy:
+    """
+    按 B/P 求解结果行动: 先手 Ban 取最坏情况最优的 Ban, 后手取给定对方 Ban 后最优的 Ban;
+    Pick 按子博弈均衡混合策略抽样。批次内相同 key 的对局只求解一次, 最近的结果跨批次缓存。
+    """
+
+    cache_size = 256
+
+    def __init__(self):
+        self._solutions = OrderedDict()
+        self._lock = threading.Lock()  # 界面会在多个预测线程中调用同一实例
+
+    def solution(self, key, local):
+        with self._lock:
+            solution = self._solutions.get(key)
+            if solution is not None:
+                self._solutions.move_to_end(key)
+                return solution
+        solution = solve_bp_symmetric(local)
+        with self._lock:
+            self._solutions[key] = solution
+            if len(self._solutions) > self.cache_size:
+                self._solutions.popitem(last=False)
+        return solution
+
+    def ban(self, rng, batch):
+        decisions = []
+        for k, (local, key) in enumerate(zip(batch.locals, batch.keys)):
+            solution = self.solution(key, local)
+            own_banned = batch.own_banned(k)
+            candidates = mask_positions(batch.enemy_available[k])
+            if own_banned is None:
+                values = solution.ban_values
+                decisions.append(max(candidates, key=values.__getitem__))
+            else:
+                values = solution.pick_values
+                decisions.append(max(candidates, key=lambda x: values[x][own_banned]))
+        return decisions
+
+    def ban_policy(self, batch):
+        return [{pos: 1.0} for pos in self.ban(None, batch)]
+
+    def pick_policy(self, batch):
+        policies = []
+        for k, (local, key) in enumerate(zip(batch.locals, batch.keys)):
+            mine, _ = self.solution(key, local).pick_strategies[(batch.enemy_banned(k), batch.own_banned(k))]
+            policies.append({positions_mask(triple): p for triple, p in mine})
+        return policies
+
+    def pick(self, rng, batch):
+        decisions = []
+        for k, (local, key) in enumerate(zip(batch.locals, batch.keys)):
+            solution = self.solution(key, local)
+            mine, _ = solution.pick_strategies[(batch.enemy_banned(k), batch.own_banned(k))]
+            r = rng.random()
+            choice = mine[-1][0]
+            for triple, p in mine:
+                r -= p
+                if r < 0:
+                    choice = triple
+                    break
+            decisions.append(positions_mask(choice))
+        return decisions
@@ -0,0 +1,177 @@
+import hashlib
+import marshal
+import os
+import sqlite3
+import threading
+import time
+
+from config_cache import CACHE_DIR
+from solver import BPSolution
+from symmetry import solve_bp_symmetric
+
+# --- 已求解子博弈的磁盘缓存 ---
+# 键: (我方阵容, 对方阵容, 对战矩阵版本) 的规范哈希; 阵容先按矩阵序号排序, 与卡组的排列顺序无关。
+# 值: BPSolution.to_dict() 的 marshal 序列化 (按规范顺序保存, 取出时再映射回调用方的顺序)。
+# SQLite WAL 模式, 多个进程可同时读写; 超出条目数/字节数上限时淘汰最久未使用的条目。
+
+CACHE_FORMAT = "bp1"  # 求解结果格式变化时修改, 旧条目自然失效
+DEFAULT_PATH = os.path.join(CACHE_DIR, "subgames.sqlite")
+TOUCH_INTERVAL = 60.0  # 同一条目的最近使用时间最多每分钟更新一次, 减少写锁争用
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subgames (
+    key TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subgames_last_used ON subgames (last_used);
+"""
+
+
+def _deck_token(matrix, name):
+    """矩阵内的卡组用序号表示, 矩阵外的卡组 (胜率均按50%计) 用名称表示"""
+    index = matrix.index.get(name)
+    return f"{index:06d}" if index is not None else f"~{name}"
+
+
+def canonical_order(matrix, names):
+    """阵容的规范顺序: 返回原位置列表, 第 k 个元素是规范顺序中第 k 套卡组的原位置"""
+    tokens = [_deck_token(matrix, name) for name in names]
+    return sorted(range(len(names)), key=tokens.__getitem__)
+
+
+def lineup_key(matrix, my_names, opp_names):
+    """(我方阵容, 对方阵容, 矩阵版本) 的规范哈希"""
+    my_tokens = sorted(_deck_token(matrix, name) for name in my_names)
+    opp_tokens = sorted(_deck_token(matrix, name) for name in opp_names)
+    text = "|".join([CACHE_FORMAT, matrix.version, ",".join(my_tokens), ",".join(opp_tokens)])
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def reorder_solution(solution, my_order, opp_order):
+    """把规范顺序下的解映射回原顺序 (my_order/opp_order 见 canonical_order)"""
+    my_size, opp_size = len(my_order), len(opp_order)
+    pick_values = [[0.0] * my_size for _ in range(opp_size)]
+    for cx, row in enumerate(solution.pick_values):
+        target = pick_values[opp_order[cx]]
+        for cy, value in enumerate(row):
+            target[my_order[cy]] = value
+
+    def remap(support, order):
+        return [(tuple(sorted(order[i] for i in triple)), p) for triple, p in support]
+
+    strategies = {}
+    for (cx, cy), (mine, theirs) in solution.pick_strategies.items():
+        strategies[(opp_order[cx], my_order[cy])] = (remap(mine, my_order), remap(theirs, opp_order))
+    return BPSolution(pick_values, strategies)
+
+
+class SubgameCache:
+    """
+    已求解 B/P 子博弈的持久缓存。每个线程使用各自的 SQLite 连接, 可在后台任务和进程池中直接使用。
+    max_entries / max_bytes 为 LRU 上限 (None 表示不限)。
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=20000, max_bytes=256 * 1024 * 1024, timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """取出缓存的数据 (不存在时返回 None), 并更新最近使用时间"""
+        conn = self._connect()
+        row = conn.execute("SELECT payload, last_used FROM subgames WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        payload, last_used = row
+        try:
+            data = marshal.loads(payload)
+        except (EOFError, ValueError, TypeError):
+            conn.execute("DELETE FROM subgames WHERE key = ?", (key,))
+            return None
+        now = time.time()
+        if now - last_used > TOUCH_INTERVAL:
+            try:
+                conn.execute("UPDATE subgames SET last_used = ? WHERE key = ?", (now, key))
+            except sqlite3.OperationalError:
+                pass  # 其他进程长时间持有写锁时放弃更新, 不影响读取
+        return data
+
+    def put(self, key, data):
+        payload = marshal.dumps(data)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO subgames (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                         (key, payload, len(payload), time.time()))
+            self._evict(conn)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _evict(self, conn):
+        """超出上限时按最近使用时间淘汰, 一次淘汰到上限的 90%, 避免每次写入都触发"""
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM subgames").fetchone()
+        over_entries = self.max_entries is not None and count > self.max_entries
+        over_bytes = self.max_bytes is not None and total > self.max_bytes
+        if not over_entries and not over_bytes:
+            return
+
+        target_count = int(self.max_entries * 0.9) if self.max_entries is not None else count
+        target_bytes = int(self.max_bytes * 0.9) if self.max_bytes is not None else total
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM subgames ORDER BY last_used"):
+            if count <= target_count and total <= target_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM subgames WHERE key = ?", victims)
+
+    def stats(self):
+        """(条目数, 总字节数)"""
+        return self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM subgames").fetchone()
+
+    def clear(self):
+        self._connect().execute("DELETE FROM subgames")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def solve_bp(self, matrix, my_names, opp_names):
+        """带缓存的 B/P 求解: 命中时直接返回, 否则按规范顺序 (归并等价卡组后) 求解并写入缓存"""
+        my_order = canonical_order(matrix, my_names)
+        opp_order = canonical_order(matrix, opp_names)
+        key = lineup_key(matrix, my_names, opp_names)
+
+        data = self.get(key)
+        if data is not None:
+            solution = BPSolution.from_dict(data)
+        else:
+            local = matrix.local([my_names[i] for i in my_order], [opp_names[i] for i in opp_order])
+            solution = solve_bp_symmetric(local)
+            try:
+                self.put(key, solution.to_dict())
+            except sqlite3.Error as e:
+                print(f"警告: 写入子博弈缓存失败: {e}")
+        return reorder_solution(solution, my_order, opp_order)
@@ -0,0 +1,245 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config_cache import load_json_cached, validate_deck_list
+from deck_pool import load_deck_pool
+from league import play_tables
+from matchup import load_matchup_matrix
+from meta import META_FILE, load_meta, sample_lineup
+from series import PICK_COUNT
+from strategies import STRATEGIES, create_strategy, enemy_view
+from symmetry import solve_bp_symmetric
+
+# --- 瑞士轮赛事模拟 ---
+# 每场赛事: 我方 (0 号选手, 固定阵容) 与 players-1 名从环境分布抽取阵容的选手进行 rounds 轮瑞士轮,
+# 每轮按战绩排序配对 (尽量避免重复对手, 人数为奇数时排名最低且未轮空过的选手轮空记胜),
+# 最终按 (胜场, 对手胜率 OMW%, 随机) 排名, 取前 top_cut 名晋级。
+#   - 其余各桌同一轮一次性批量对局: 每个阶段对策略只调用一次 (league.play_tables), 先后手随机;
+#   - 我方所在的桌按双方 B/P 均衡胜率 (先/后手各求解一次) 抽取胜负, 结果按对方阵容缓存, 跨赛事复用。
+# 多场赛事分块在进程池中并行, 汇总晋级概率与我方战绩分布。
+
+DEFAULT_PLAYERS = 256
+DEFAULT_TOP_CUT = 8
+DEFAULT_FIELD_STRATEGY = "greedy"
+MIN_OMW = 1.0 / 3.0
+
+
+def default_rounds(players):
+    return max(1, math.ceil(math.log2(players)))
+
+
+class EquilibriumTable:
+    """我方阵容对各对方阵容的 (先手, 后手) 系列赛均衡胜率, 按对方阵容缓存"""
+
+    def __init__(self, matrix, my_names):
+        self.matrix = matrix
+        self.my_names = list(my_names)
+        self.values = {}
+
+    def value(self, opp_names, first):
+        key = tuple(sorted(opp_names))
+        values = self.values.get(key)
+        if values is None:
+            local = self.matrix.local(self.my_names, key)
+            values = self.values[key] = (solve_bp_symmetric(local, strategies=False).value,
+                                         1.0 - solve_bp_symmetric(enemy_view(local), strategies=False).value)
+        return values[0] if first else values[1]
+
+
+def pair_round(order, opponents, had_bye):
+    """
+    按排名顺序配对: 每名选手与其后第一位未交过手的选手配对 (都交过手则取紧随其后的一位)。
+    返回 (配对列表, 轮空选手或 None)。
+    """
+    order = list(order)
+    bye = None
+    if len(order) % 2:
+        bye = next((p for p in reversed(order) if not had_bye[p]), order[-1])
+        order.remove(bye)
+    pairs = []
+    while order:
+        a = order.pop(0)
+        idx = next((k for k, b in enumerate(order) if b not in opponents[a]), 0)
+        pairs.append((a, order.pop(idx)))
+    return pairs, bye
+
+
+def run_event(matrix, my_names, pool_names, weights, players, rounds, top_cut, opp_size, field_strategy,
+              equilibrium, rng):
+    """模拟一场赛事, 返回 (我方胜场, 我方是否晋级)"""
+    lineups = [list(my_names)] + [sample_lineup(pool_names, weights, opp_size, rng) for _ in range(players - 1)]
+    wins = [0] * players
+    opponents = [set() for _ in range(players)]
+    had_bye = [False] * players
+
+    for _ in range(rounds):
+        tiebreak = [rng.random() for _ in range(players)]
+        order = sorted(range(players), key=lambda p: (-wins[p], tiebreak[p]))
+        pairs, bye = pair_round(order, opponents, had_bye)
+        if bye is not None:
+            wins[bye] += 1
+            had_bye[bye] = True
+
+        # 先后手随机: 交换后 a 为先手
+        pairs = [(a, b) if rng.random() < 0.5 else (b, a) for a, b in pairs]
+        field = [(a, b) for a, b in pairs if a != 0 and b != 0]
+        results = play_tables(matrix, [lineups[a] for a, _ in field], [lineups[b] for _, b in field],
+                              field_strategy, field_strategy, rng)
+        for (a, b), a_won in zip(field, results):
+            wins[a if a_won else b] += 1
+        for a, b in pairs:
+            if a == 0 or b == 0:
+                opp = b if a == 0 else a
+                if rng.random() < equilibrium.value(lineups[opp], first=(a == 0)):
+                    wins[0] += 1
+                else:
+                    wins[opp] += 1
+            opponents[a].add(b)
+            opponents[b].add(a)
+
+    def omw(p):
+        rates = [max(MIN_OMW, wins[o] / rounds) for o in opponents[p]]
+        return sum(rates) / len(rates) if rates else 0.0
+
+    tiebreak = [rng.random() for _ in range(players)]
+    standings = sorted(range(players), key=lambda p: (-wins[p], -omw(p), tiebreak[p]))
+    return wins[0], standings.index(0) < top_cut
+
+
+_EQUILIBRIUM = None
+
+
+def run_event_chunk(matrix, my_names, pool_names, weights, players, rounds, top_cut, opp_size, field_strategy,
+                    seed, chunk_index, count):
+    """工作进程入口: 模拟 count 场赛事, 返回 (晋级次数, 我方胜场分布)"""
+    global _EQUILIBRIUM
+    key = (matrix.version, tuple(my_names))
+    if _EQUILIBRIUM is None or _EQUILIBRIUM[0] != key:
+        _EQUILIBRIUM = (key, EquilibriumTable(matrix, my_names))
+    rng = random.Random(f"{seed}:swiss:{chunk_index}")
+    strategy = create_strategy(field_strategy)
+    cut = 0
+    records = Counter()
+    for _ in range(count):
+        my_wins, made_cut = run_event(matrix, my_names, pool_names, weights, players, rounds, top_cut, opp_size,
+                                      strategy, _EQUILIBRIUM[1], rng)
+        cut += made_cut
+        records[my_wins] += 1
+    return cut, dict(records)
+
+
+class SwissResult:
+    def __init__(self, events, top_cut_count, records, rounds, top_cut):
+        self.events = events
+        self.top_cut_count = top_cut_count
+        self.records = records  # 我方胜场 -> 赛事数
+        self.rounds = rounds
+        self.top_cut = top_cut
+
+    @property
+    def top_cut_prob(self):
+        return self.top_cut_count / self.events if self.events else 0.0
+
+    @property
+    def stderr(self):
+        p = self.top_cut_prob
+        return math.sqrt(p * (1.0 - p) / self.events) if self.events else 0.0
+
+    def summary(self):
+        lines = [f"{self.events} 场赛事, {self.rounds} 轮瑞士轮, 前 {self.top_cut} 名晋级",
+                 f"晋级概率: {self.top_cut_prob:.2%} ± {1.96 * self.stderr:.2%}",
+                 "我方战绩分布:"]
+        for wins in range(self.rounds, -1, -1):
+            count = self.records.get(wins, 0)
+            lines.append(f"  {wins}-{self.rounds - wins}: {count / self.events:.2%}")
+        return "\n".join(lines)
+
+
+def simulate_swiss(matrix, my_names, pool_names, weights=None, players=DEFAULT_PLAYERS, rounds=None,
+                   top_cut=DEFAULT_TOP_CUT, events=2000, opp_size=6, field_strategy=DEFAULT_FIELD_STRATEGY, seed=0,
+                   workers=None, chunk=50, job=None):
+    """模拟 events 场瑞士轮赛事, 分块在进程池中并行"""
+    pool_names = list(pool_names)
+    if len(my_names) <= PICK_COUNT or opp_size <= PICK_COUNT:
+        raise ValueError(f"双方阵容至少需要 {PICK_COUNT + 1} 套卡组")
+    if opp_size > len(pool_names):
+        raise ValueError(f"卡组资源池只有 {len(pool_names)} 套卡组, 不够组成 {opp_size} 套的阵容")
+    if players < 2 or not 1 <= top_cut <= players:
+        raise ValueError("参赛人数至少为 2, 晋级名额应在 1 到参赛人数之间")
+    if events < 1 or chunk < 1:
+        raise ValueError("赛事数与分块大小至少为 1")
+    create_strategy(field_strategy)  # 提前检查策略名称
+    rounds = rounds or default_rounds(players)
+    weights = weights or [1.0] * len(pool_names)
+    tasks = [(index, min(chunk, events - start)) for index, start in enumerate(range(0, events, chunk))]
+    args = (matrix, list(my_names), pool_names, weights, players, rounds, top_cut, opp_size, field_strategy, seed)
+
+    cut = 0
+    records = Counter()
+
+    def collect(chunk_cut, chunk_records):
+        nonlocal cut
+        cut += chunk_cut
+        records.update({int(w): c for w, c in chunk_records.items()})
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for done, (index, count) in enumerate(tasks, 1):
+            collect(*run_event_chunk(*args, index, count))
+            if job is not None:
+                job.check_cancelled()
+                job.report_progress(done, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(run_event_chunk, *args, index, count) for index, count in tasks]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    collect(*future.result())
+                    if job is not None:
+                        job.report_progress(done, len(tasks))
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    return SwissResult(events, cut, records, rounds, top_cut)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="瑞士轮赛事模拟: 我方阵容的晋级概率")
+    parser.add_argument("--my", nargs="*", default=None, help="我方阵容 (默认读取 my_decks.json)")
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS)
+    parser.add_argument("--rounds", type=int, default=None, help="瑞士轮轮数 (默认 ceil(log2(人数)))")
+    parser.add_argument("--top-cut", type=int, default=DEFAULT_TOP_CUT)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--opp-size", type=int, default=6)
+    parser.add_argument("--meta", default=META_FILE)
+    parser.add_argument("--field-strategy", default=DEFAULT_FIELD_STRATEGY,
+                        help=f"其余各桌使用的 AI 策略 ({', '.join(STRATEGIES)})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=50)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    args = parser.parse_args(argv)
+
+    try:
+        pool_names = [d["name"] for d in load_deck_pool("deck_pool.json", check_icons=False)]
+        my_names = args.my or [d["name"] for d in load_json_cached("my_decks.json", validate_deck_list)]
+        matrix = load_matchup_matrix(args.matrix, pool_names)
+        result = simulate_swiss(matrix, my_names, pool_names, load_meta(args.meta, pool_names), args.players,
+                                args.rounds, args.top_cut, args.events, args.opp_size, args.field_strategy,
+                                args.seed, args.workers, args.chunk)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import itertools
+
+from series import PICK_COUNT, lineup_series_prob
+from solver import BPSolution, solve_matrix_game, EPS
+
+# --- 等价卡组归并 ---
+# 胜率行 (我方) / 胜率列 (对方) 相同 (在容差内) 的卡组可以互换: Ban 掉其中任意一套得到的子博弈相同,
+# 类别组成相同的出战组合胜率也相同。先把卡组归为等价类, 每个类别组合只求解一次,
+# 混合策略再平均分配回该组合对应的具体卡组。
+
+DEFAULT_TOL = 1e-9
+
+
+def equivalence_classes(vectors, tol=DEFAULT_TOL):
+    """按向量逐项差不超过 tol 归类, 返回每个向量的类别编号 (按首次出现顺序编号)"""
+    representatives = []
+    class_of = []
+    for v in vectors:
+        for c, r in enumerate(representatives):
+            if all(abs(a - b) <= tol for a, b in zip(v, r)):
+                class_of.append(c)
+                break
+        else:
+            class_of.append(len(representatives))
+            representatives.append(v)
+    return class_of
+
+
+class SymmetricLineups:
+    """一组对局的等价类划分, 以及按类别组合记忆的出战胜率"""
+
+    def __init__(self, local, tol=DEFAULT_TOL):
+        self.local = local
+        self.my_size = len(local)
+        self.opp_size = len(local[0]) if local else 0
+        self.my_class = equivalence_classes(local, tol)
+        self.opp_class = equivalence_classes([list(col) for col in zip(*local)], tol)
+        self._values = {}
+        self._groups = {}
+
+    @property
+    def my_class_count(self):
+        return max(self.my_class) + 1 if self.my_class else 0
+
+    @property
+    def opp_class_count(self):
+        return max(self.opp_class) + 1 if self.opp_class else 0
+
+    @staticmethod
+    def _class_representatives(class_of):
+        """每个类别的第一套卡组位置"""
+        reps = {}
+        for pos, c in enumerate(class_of):
+            reps.setdefault(c, pos)
+        return reps
+
+    def _triple_groups(self, team, ban):
+        """排除被Ban卡组后, 按类别组成分组的出战组合: {类别签名: [组合...]} (按 (阵营, Ban) 缓存)"""
+        key = (team, ban)
+        groups = self._groups.get(key)
+        if groups is None:
+            class_of = self.my_class if team == "my" else self.opp_class
+            groups = {}
+            for triple in itertools.combinations([i for i in range(len(class_of)) if i != ban], PICK_COUNT):
+                signature = tuple(sorted(class_of[i] for i in triple))
+                groups.setdefault(signature, []).append(triple)
+            self._groups[key] = groups
+        return groups
+
+    def _value(self, my_group, opp_group):
+        key = (my_group[0], opp_group[0])
+        value = self._values.get(key)
+        if value is None:
+            value = self._values[key] = lineup_series_prob(self.local, my_group[1][0], opp_group[1][0])
+        return value
+
+    def solve(self, strategies=True):
+        """与 solver.solve_bp 结果相同 (容差内), 但每个 (Ban类别, Ban类别) 只求解一次归并后的矩阵博弈"""
+        my_reps = self._class_representatives(self.my_class)
+        opp_reps = self._class_representatives(self.opp_class)
+        my_groups = {c: list(self._triple_groups("my", pos).items()) for c, pos in my_reps.items()}
+        opp_groups = {c: list(self._triple_groups("opp", pos).items()) for c, pos in opp_reps.items()}
+
+        class_results = {}
+        for cx, x in opp_reps.items():
+            cols = opp_groups[cx]
+            for cy, y in my_reps.items():
+                rows = my_groups[cy]
+                payoff = [[self._value(r, c) for c in cols] for r in rows]
+                class_results[(cx, cy)] = (solve_matrix_game(payoff), rows, cols)
+
+        pick_values = []
+        pick_strategies = {}
+        for x in range(self.opp_size):
+            row_values = []
+            for y in range(self.my_size):
+                (value, row_probs, col_probs), rows, cols = class_results[(self.opp_class[x], self.my_class[y])]
+                row_values.append(value)
+                if strategies:
+                    pick_strategies[(x, y)] = (self._expand("my", rows, row_probs, y),
+                                               self._expand("opp", cols, col_probs, x))
+            pick_values.append(row_values)
+        return BPSolution(pick_values, pick_strategies)
+
+    def _expand(self, team, groups, probs, ban):
+        """类别组合的概率平均分配给具体组合 (按实际被Ban的卡组取组合, 它可能不是类别代表)"""
+        actual = self._triple_groups(team, ban)
+        support = []
+        for (signature, _), p in zip(groups, probs):
+            if p <= EPS:
+                continue
+            triples = actual[signature]
+            share = p / len(triples)
+            support.extend((t, share) for t in triples)
+        return support
+
+
+def solve_bp_symmetric(local, strategies=True, tol=DEFAULT_TOL):
+    """先归并等价卡组再求解 B/P; 没有等价卡组时与 solve_bp 的计算量相当"""
+    return SymmetricLineups(local, tol).solve(strategies)
@@ -0,0 +1,260 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from deck_pool import load_deck_pool
+from lineup_store import LineupStore
+from matchup import load_matchup_matrix
+from meta import META_FILE, load_meta, sample_lineup
+from series import PICK_COUNT
+from symmetry import solve_bp_symmetric
+
+# --- 团体赛阵容联合优化 ---
+# 团队 P 名选手各带一套阵容, 同一卡组不得被两名队友同时使用。每名选手对环境 (从 meta 分布抽取的固定一组
+# 对方阵容, 各候选共用) 的期望系列赛胜率 p_i 为其对每个对方阵容的 B/P 均衡胜率 (我方先手 Ban, 与 robust 一致)
+# 的平均; 团体赛胜率 = 队内过半选手获胜的概率 (各选手独立)。
+# 搜索: 蛇形选卡得到初始分配, 然后逐轮尝试 "换入一套未用卡组" 与 "两名队友交换一套卡组" 两类操作。
+#   - 选手阵容的胜率按阵容缓存, 不同候选分配中出现的同一阵容只计算一次;
+#   - 每轮先按廉价估计 (卡组对环境的平均单局胜率 × 该选手对团体胜率的边际贡献) 排序操作,
+#     按批精确评估, 某批中出现改进即采用最优者, 否则继续下一批;
+#   - 一批中尚未缓存的阵容在进程池中并行计算。
+
+DEFAULT_PLAYERS = 3
+DEFAULT_FIELD = 32
+DEFAULT_MOVES = 48
+EVAL_CHUNK = 4
+
+
+def team_win_prob(probs):
+    """各选手独立获胜概率为 probs 时, 过半选手获胜的概率"""
+    dist = [1.0]  # dist[k]: 已考虑的选手中恰好 k 人获胜的概率
+    for p in probs:
+        new = [0.0] * (len(dist) + 1)
+        for k, q in enumerate(dist):
+            new[k] += q * (1.0 - p)
+            new[k + 1] += q * p
+        dist = new
+    return sum(dist[len(probs) // 2 + 1:])
+
+
+def marginal_gains(probs):
+    """团体胜率对每名选手胜率的偏导 (团体胜率关于 p_i 是线性的)"""
+    gains = []
+    for i in range(len(probs)):
+        high = team_win_prob(probs[:i] + [1.0] + probs[i + 1:])
+        low = team_win_prob(probs[:i] + [0.0] + probs[i + 1:])
+        gains.append(high - low)
+    return gains
+
+
+def evaluate_lineups(matrix, field, lineups):
+    """工作进程入口: 每套阵容对环境中各对方阵容的平均 B/P 均衡胜率"""
+    return [sum(solve_bp_symmetric(matrix.local(lineup, opp), strategies=False).value for opp in field) / len(field)
+            for lineup in lineups]
+
+
+class LineupEvaluator:
+    """选手阵容 -> 对环境的期望胜率, 按 (排序后的) 阵容缓存; 缺失的阵容批量并行计算"""
+
+    def __init__(self, matrix, field, workers=1):
+        self.matrix = matrix
+        self.field = [list(opp) for opp in field]
+        self.cache = {}
+        self.pool = None
+        if workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def prefetch(self, lineups, job=None):
+        missing = list(dict.fromkeys(tuple(sorted(l)) for l in lineups if tuple(sorted(l)) not in self.cache))
+        chunks = [missing[i:i + EVAL_CHUNK] for i in range(0, len(missing), EVAL_CHUNK)]
+        if self.pool is None:
+            for chunk in chunks:
+                self.cache.update(zip(chunk, evaluate_lineups(self.matrix, self.field, chunk)))
+                if job is not None:
+                    job.check_cancelled()
+        else:
+            futures = [self.pool.submit(evaluate_lineups, self.matrix, self.field, chunk) for chunk in chunks]
+            try:
+                for chunk, future in zip(chunks, futures):
+                    self.cache.update(zip(chunk, future.result()))
+                    if job is not None:
+                        job.check_cancelled()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def value(self, lineup):
+        key = tuple(sorted(lineup))
+        if key not in self.cache:
+            self.prefetch([key])
+        return self.cache[key]
+
+
+class TeamResult:
+    def __init__(self, lineups, probs, rounds, evaluated):
+        self.lineups = lineups
+        self.probs = probs
+        self.team_prob = team_win_prob(probs)
+        self.rounds = rounds
+        self.evaluated = evaluated  # 精确评估过的不同阵容数
+
+    def summary(self, player_names=None):
+        names = player_names or [f"选手{i + 1}" for i in range(len(self.lineups))]
+        lines = [f"{name}: {' / '.join(lineup)}  期望胜率 {p:.2%}"
+                 for name, lineup, p in zip(names, self.lineups, self.probs)]
+        lines.append(f"团体赛胜率: {self.team_prob:.2%} ({self.rounds} 轮改进, 评估 {self.evaluated} 套阵容)")
+        return "\n".join(lines)
+
+
+def sample_field(pool_names, weights, opp_size, count, seed):
+    rng = random.Random(f"{seed}:field")
+    return [sample_lineup(pool_names, weights, opp_size, rng) for _ in range(count)]
+
+
+def _snake_draft(strength, players, size):
+    """按卡组强度蛇形选卡: 0..P-1, P-1..0, ..."""
+    order = sorted(strength, key=lambda d: -strength[d])
+    lineups = [[] for _ in range(players)]
+    turn = 0
+    for deck in order[:players * size]:
+        round_index, pos = divmod(turn, players)
+        lineups[pos if round_index % 2 == 0 else players - 1 - pos].append(deck)
+        turn += 1
+    return lineups
+
+
+def _moves(lineups, free, strength, gains):
+    """所有候选操作及其廉价估计: (估计值, 选手 i, 位置 a, 选手 j 或 None, 位置 b 或新卡组)"""
+    moves = []
+    for i, lineup in enumerate(lineups):
+        for a, old in enumerate(lineup):
+            for deck in free:
+                moves.append((gains[i] * (strength[deck] - strength[old]), i, a, None, deck))
+    for i in range(len(lineups)):
+        for j in range(i + 1, len(lineups)):
+            for a, deck_a in enumerate(lineups[i]):
+                for b, deck_b in enumerate(lineups[j]):
+                    delta = strength[deck_b] - strength[deck_a]
+                    moves.append((gains[i] * delta - gains[j] * delta, i, a, j, b))
+    moves.sort(key=lambda m: -m[0])
+    return moves
+
+
+def _apply(lineups, move):
+    _, i, a, j, b = move
+    result = [list(l) for l in lineups]
+    if j is None:
+        result[i][a] = b
+    else:
+        result[i][a], result[j][b] = lineups[j][b], lineups[i][a]
+    return result
+
+
+def optimize_team(matrix, pool_names, players=DEFAULT_PLAYERS, size=None, opp_size=6, weights=None,
+                  field_size=DEFAULT_FIELD, moves_per_batch=DEFAULT_MOVES, seed=0, workers=1, max_rounds=100,
+                  job=None):
+    """为 players 名选手各选一套 size 卡组的阵容 (互不重复), 最大化团体赛胜率"""
+    pool_names = list(pool_names)
+    if players < 1 or field_size < 1:
+        raise ValueError("选手数与环境阵容数至少为 1")
+    size = size or min(6, len(pool_names) // players)
+    if size <= PICK_COUNT:
+        raise ValueError(f"每名选手至少需要 {PICK_COUNT + 1} 套卡组")
+    if players * size > len(pool_names):
+        raise ValueError(f"卡组资源池只有 {len(pool_names)} 套卡组, 不够 {players} 名选手各带 {size} 套")
+    if opp_size <= PICK_COUNT or opp_size > len(pool_names):
+        raise ValueError(f"对方阵容卡组数应在 {PICK_COUNT + 1}-{len(pool_names)} 之间")
+    weights = weights or [1.0] * len(pool_names)
+    field = sample_field(pool_names, weights, opp_size, field_size, seed)
+
+    # 卡组对环境的平均单局胜率, 仅用于初始分配与操作排序
+    strength = {d: sum(matrix.winrate(d, o) for opp in field for o in opp) / (len(field) * opp_size)
+                for d in pool_names}
+    lineups = _snake_draft(strength, players, size)
+
+    rounds = 0
+    with LineupEvaluator(matrix, field, workers) as evaluator:
+        evaluator.prefetch(lineups, job)
+        probs = [evaluator.value(l) for l in lineups]
+        while rounds < max_rounds:
+            used = {d for l in lineups for d in l}
+            free = [d for d in pool_names if d not in used]
+            moves = _moves(lineups, free, strength, marginal_gains(probs))
+            best = None
+            for start in range(0, len(moves), moves_per_batch):
+                batch = [_apply(lineups, m) for m in moves[start:start + moves_per_batch]]
+                evaluator.prefetch([l for candidate in batch for l in candidate], job)
+                for candidate in batch:
+                    candidate_probs = [evaluator.value(l) for l in candidate]
+                    gain = team_win_prob(candidate_probs) - team_win_prob(probs)
+                    if gain > 1e-9 and (best is None or gain > best[0]):
+                        best = (gain, candidate, candidate_probs)
+                if job is not None:
+                    job.report_progress(min(start + moves_per_batch, len(moves)), len(moves),
+                                        f"第 {rounds + 1} 轮, 团体胜率 {team_win_prob(probs):.2%}")
+                if best is not None:
+                    break
+            if best is None:
+                break
+            _, lineups, probs = best
+            rounds += 1
+        evaluated = len(evaluator.cache)
+
+    return TeamResult(lineups, probs, rounds, evaluated)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="团体赛阵容联合优化 (队友之间卡组不重复)")
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS)
+    parser.add_argument("--names", nargs="*", default=None, help="选手名称 (保存阵容方案时使用)")
+    parser.add_argument("--size", type=int, default=None, help="每名选手的卡组数 (默认不超过 6 且卡组资源池够用)")
+    parser.add_argument("--opp-size", type=int, default=6)
+    parser.add_argument("--field", type=int, default=DEFAULT_FIELD, help="环境中抽取的对方阵容数")
+    parser.add_argument("--meta", default=META_FILE)
+    parser.add_argument("--moves", type=int, default=DEFAULT_MOVES, help="每批精确评估的操作数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--matrix", default="matchup_matrix.json")
+    parser.add_argument("--event", default=None, help="把各选手阵容保存为该赛事的阵容方案")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = load_deck_pool("deck_pool.json", check_icons=False)
+        pool_names = [d["name"] for d in pool]
+        if args.names and len(args.names) != args.players:
+            raise ValueError(f"选手名称数量 ({len(args.names)}) 与选手数 ({args.players}) 不一致")
+        matrix = load_matchup_matrix(args.matrix, pool_names)
+        result = optimize_team(matrix, pool_names, args.players, args.size, args.opp_size,
+                               load_meta(args.meta, pool_names), args.field, args.moves, args.seed,
+                               args.workers or os.cpu_count() or 1)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    names = args.names or [f"选手{i + 1}" for i in range(args.players)]
+    print(result.summary(names))
+    if args.event:
+        store = LineupStore()
+        for name, lineup in zip(names, result.lineups):
+            store.save(f"{args.event} - {name}", [pool[pool.index_of(d)] for d in lineup], player=name,
+                       event=args.event)
+        print(f"已保存到阵容方案 (赛事: {args.event})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())